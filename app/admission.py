@@ -0,0 +1,190 @@
+# app/admission.py（准入控制：限制并发推理数和排队长度，按请求截止时间提前拒绝，过载时快速失败）
+import collections
+import math
+import threading
+import time
+
+from app.metrics import Histogram
+
+# 排队等待时间分桶上界（毫秒）
+QUEUE_WAIT_BUCKETS_MS = [0.1, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+SHED_REASONS = ("queue_full", "deadline", "deadline_expired", "queue_timeout")
+
+
+class AdmissionRejected(Exception):
+    """请求未被准入：status为返回的HTTP状态码，retry_after为建议的重试间隔（秒）"""
+
+    def __init__(self, status, reason, message, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    """排队中的请求：give_up为最晚开始执行的时刻，放行时由release设置admitted并唤醒"""
+
+    __slots__ = ("give_up", "event", "admitted")
+
+    def __init__(self, give_up):
+        self.give_up = give_up
+        self.event = threading.Event()
+        self.admitted = False
+
+
+class AdmissionController:
+    """
+    最多max_concurrency个请求同时执行推理，其余按到达顺序排队，队列最多max_queue个：
+    - 队列已满：立即返回503（实例过载）
+    - 按当前排队数和平均执行耗时估算，截止时间前完成不了：立即返回429，不做注定超时的工作
+    - 排队到截止时间（未指定时为queue_timeout秒）仍未轮到：返回503
+    请求执行完调用release，执行槽直接交给队首仍有时间的请求（不经过重新竞争）。
+    平均执行耗时用指数移动平均（权重ewma_alpha）持续更新
+    """
+
+    def __init__(
+        self, max_concurrency=4, max_queue=64, queue_timeout=1.0, ewma_alpha=0.1
+    ):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_queue = max(0, int(max_queue))
+        self.queue_timeout = float(queue_timeout)
+        self.ewma_alpha = ewma_alpha
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_BUCKETS_MS)
+        self._lock = threading.Lock()
+        self._waiters = collections.deque()
+        self._active = 0
+        self._service_seconds = None  # 平均执行耗时，首个请求完成前未知
+        self._admitted = 0
+        self._queued = 0
+        self._shed = dict.fromkeys(SHED_REASONS, 0)
+
+    def admit(self, deadline=None):
+        """
+        申请执行槽（deadline为perf_counter时间轴上的截止时刻，None表示不限），
+        返回开始执行的时刻，传给release；未准入时抛AdmissionRejected
+        """
+        now = time.perf_counter()
+        with self._lock:
+            if deadline is not None and deadline <= now:
+                raise self._reject(503, "deadline_expired", "请求到达时已超过截止时间")
+            if self._active < self.max_concurrency and not self._waiters:
+                self._active += 1
+                self._admitted += 1
+                self.queue_wait_ms.observe(0.0)
+                return now
+            if len(self._waiters) >= self.max_queue:
+                raise self._reject(
+                    503, "queue_full", f"服务繁忙：排队请求已达上限{self.max_queue}"
+                )
+            service = self._service_seconds or 0.0
+            if deadline is not None:
+                # 前面每个排队请求平均占用 service/并发数 秒，自己还要执行service秒
+                finish = now + (len(self._waiters) + 1) * service / self.max_concurrency
+                if finish + service > deadline:
+                    raise self._reject(
+                        429,
+                        "deadline",
+                        f"预计{(finish + service - now) * 1000:.1f}ms后才能完成，"
+                        f"超过截止时间（剩余{(deadline - now) * 1000:.1f}ms）",
+                    )
+                give_up = deadline - service
+            else:
+                give_up = now + self.queue_timeout
+            waiter = _Waiter(give_up)
+            self._waiters.append(waiter)
+            self._queued += 1
+
+        waiter.event.wait(max(0.0, give_up - now))
+        with self._lock:
+            if not waiter.admitted:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                raise self._reject(
+                    503, "queue_timeout", "排队超时：截止时间前未轮到执行"
+                )
+            self._admitted += 1
+            start = time.perf_counter()
+            self.queue_wait_ms.observe((start - now) * 1000)
+        return start
+
+    def release(self, start):
+        """请求执行完毕：更新平均执行耗时，执行槽交给队首仍有时间的请求（没有则空出）"""
+        now = time.perf_counter()
+        elapsed = now - start
+        with self._lock:
+            if self._service_seconds is None:
+                self._service_seconds = elapsed
+            else:
+                self._service_seconds += self.ewma_alpha * (
+                    elapsed - self._service_seconds
+                )
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if waiter.give_up > now:
+                    waiter.admitted = True
+                    waiter.event.set()
+                    return
+                # 已来不及的请求留给它自己超时返回，不占执行槽
+            self._active -= 1
+
+    def _reject(self, status, reason, message):
+        """调用方持有锁：计数并构造拒绝异常，重试间隔按排空当前队列的时间估算"""
+        self._shed[reason] += 1
+        drain = (
+            len(self._waiters) * (self._service_seconds or 0.0) / self.max_concurrency
+        )
+        return AdmissionRejected(status, reason, message, max(1, math.ceil(drain)))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": True,
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "queue_timeout_seconds": self.queue_timeout,
+                "active": self._active,
+                "queue_depth": len(self._waiters),
+                "admitted": self._admitted,
+                "queued": self._queued,
+                "shed": dict(self._shed),
+                "service_ms_ewma": (
+                    self._service_seconds * 1000
+                    if self._service_seconds is not None
+                    else None
+                ),
+                "queue_wait_ms": self.queue_wait_ms.snapshot(),
+            }
+
+    def render(self):
+        """Prometheus文本格式的准入控制指标（追加在/metrics输出之后）"""
+        stats = self.stats()
+        lines = [
+            "# HELP iris_admission_active 正在执行推理的请求数",
+            "# TYPE iris_admission_active gauge",
+            f"iris_admission_active {stats['active']}",
+            "# HELP iris_admission_queue_depth 排队等待执行的请求数",
+            "# TYPE iris_admission_queue_depth gauge",
+            f"iris_admission_queue_depth {stats['queue_depth']}",
+            "# HELP iris_admission_admitted_total 准入执行的请求数",
+            "# TYPE iris_admission_admitted_total counter",
+            f"iris_admission_admitted_total {stats['admitted']}",
+            "# HELP iris_admission_shed_total 按原因统计的拒绝请求数",
+            "# TYPE iris_admission_shed_total counter",
+        ]
+        for reason, count in stats["shed"].items():
+            lines.append(f'iris_admission_shed_total{{reason="{reason}"}} {count}')
+        wait = stats["queue_wait_ms"]
+        lines += [
+            "# HELP iris_admission_queue_wait_seconds 排队等待时间",
+            "# TYPE iris_admission_queue_wait_seconds histogram",
+        ]
+        for bound, count in wait["buckets"].items():
+            le = bound if bound == "+Inf" else repr(float(bound) / 1000)
+            lines.append(
+                f'iris_admission_queue_wait_seconds_bucket{{le="{le}"}} {count}'
+            )
+        lines += [
+            f"iris_admission_queue_wait_seconds_sum {wait['sum'] / 1000}",
+            f"iris_admission_queue_wait_seconds_count {wait['count']}",
+        ]
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,102 @@
+# app/batching.py（微批处理：把并发的单条/predict请求合并成一个矩阵打分）
+import os
+import queue
+import threading
+import time
+import numpy as np
+
+from app.metrics import Histogram
+
+
+class _Slot:
+    """单个请求的等待槽：调用方阻塞在event上，批处理线程填入结果后唤醒"""
+
+    __slots__ = ("features", "enqueued", "event", "label", "handle", "error")
+
+    def __init__(self, features):
+        self.features = features
+        self.enqueued = time.perf_counter()
+        self.event = threading.Event()
+        self.label = None
+        self.handle = None
+        self.error = None
+
+
+class MicroBatcher:
+    """
+    单条请求进入队列，由后台线程攒批：
+    达到max_batch_size或最早一条等待超过max_wait_ms就立即打分，结果分别回给各自调用方
+    """
+
+    def __init__(self, get_handle, max_batch_size=32, max_wait_ms=2.0):
+        # get_handle() 返回当前模型句柄，每批取一次（兼容热更新）
+        self._get_handle = get_handle
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000
+        self.batch_sizes = Histogram([1, 2, 4, 8, 16, 32, 64, 128, 256])
+        # 排队等待时间（毫秒）
+        self.queue_wait_ms = Histogram([0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100])
+        self._start_worker()
+        # fork出的子进程（app/serve.py）不会继承线程，需要重新启动批处理线程
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._start_worker)
+
+    def _start_worker(self):
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(
+            target=self._run, name="micro-batcher", daemon=True
+        )
+        self._worker.start()
+
+    def submit(self, features, timeout=5.0):
+        """提交单条特征并等待结果，返回 (标签, 打分所用的模型句柄)"""
+        slot = _Slot(features)
+        self._queue.put(slot)
+        if not slot.event.wait(timeout):
+            raise TimeoutError(f"微批处理等待超时（{timeout}s）")
+        if slot.error is not None:
+            raise slot.error
+        return slot.label, slot.handle
+
+    def _collect(self):
+        """阻塞取到第一条后，在剩余等待时间内尽量凑满一批"""
+        batch = [self._queue.get()]
+        deadline = batch[0].enqueued + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            start = time.perf_counter()
+            try:
+                handle = self._get_handle()
+                labels = handle.scorer.predict(
+                    np.array([slot.features for slot in batch], dtype=np.float64)
+                )
+                for slot, label in zip(batch, labels):
+                    slot.label, slot.handle = label, handle
+            except Exception as e:
+                for slot in batch:
+                    slot.error = e
+            self.batch_sizes.observe(len(batch))
+            for slot in batch:
+                self.queue_wait_ms.observe((start - slot.enqueued) * 1000)
+                slot.event.set()
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queue_depth": self._queue.qsize(),
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+        }
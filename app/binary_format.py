@@ -0,0 +1,83 @@
+# app/binary_format.py（二进制批量请求/响应格式：16字节头 + 行优先的定长数值矩阵）
+#
+# 请求（Content-Type: application/octet-stream）：
+#   头部 <4sBBHQ：魔数b"IRIS"、格式版本、数据类型码、列数（特征数）、行数
+#   数据：行数×列数个小端float32/float64，列顺序固定为
+#         sepal_length, sepal_width, petal_length, petal_width
+# 响应：同样的头部（列数为1），数据为每行的预测标签（int8，类别超出范围时用int32）
+import struct
+
+import numpy as np
+
+MAGIC = b"IRIS"
+FORMAT_VERSION = 1
+MIME_TYPE = "application/octet-stream"
+HEADER = struct.Struct("<4sBBHQ")
+HEADER_SIZE = HEADER.size  # 16字节，float64数据自然按8字节对齐
+DTYPE_CODES = {
+    1: np.dtype("<f4"),
+    2: np.dtype("<f8"),
+    3: np.dtype("i1"),
+    4: np.dtype("<i4"),
+}
+CODE_FOR_DTYPE = {dtype: code for code, dtype in DTYPE_CODES.items()}
+
+
+class BinaryFormatError(ValueError):
+    """二进制请求体格式错误（魔数/版本/类型/长度不符）"""
+
+
+def encode(array):
+    """二维数组（或一维标签数组）编码为 头部 + 行优先数据"""
+    array = np.asarray(array)
+    if array.ndim == 1:
+        array = array.reshape(-1, 1)
+    dtype = array.dtype.newbyteorder("<") if array.dtype.itemsize > 1 else array.dtype
+    code = CODE_FOR_DTYPE.get(dtype)
+    if code is None:
+        raise BinaryFormatError(f"不支持的数据类型：{array.dtype}")
+    data = np.ascontiguousarray(array, dtype=dtype)
+    return HEADER.pack(MAGIC, FORMAT_VERSION, code, data.shape[1], data.shape[0]) + (
+        data.tobytes()
+    )
+
+
+def decode(buffer, n_columns=None, kinds="f"):
+    """
+    按头部把缓冲区直接包装成 (行数, 列数) 的只读数组（不拷贝、不解析）；
+    n_columns不为None时校验列数，kinds限制数据类型种类（"f"浮点，"i"整数）
+    """
+    view = memoryview(buffer)
+    if len(view) < HEADER_SIZE:
+        raise BinaryFormatError(f"请求体过短：{len(view)}字节，头部需{HEADER_SIZE}字节")
+    magic, version, code, columns, rows = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise BinaryFormatError(f"魔数不符：{magic!r}，预期{MAGIC!r}")
+    if version != FORMAT_VERSION:
+        raise BinaryFormatError(
+            f"格式版本不支持：{version}（当前支持{FORMAT_VERSION}）"
+        )
+    dtype = DTYPE_CODES.get(code)
+    if dtype is None or dtype.kind not in kinds:
+        raise BinaryFormatError(f"数据类型码不支持：{code}")
+    if n_columns is not None and columns != n_columns:
+        raise BinaryFormatError(f"列数需为{n_columns}，实际为{columns}")
+    expected = HEADER_SIZE + rows * columns * dtype.itemsize
+    if len(view) != expected:
+        raise BinaryFormatError(
+            f"数据长度不符：头部声明{rows}行×{columns}列{dtype.name}"
+            f"（共{expected}字节），实际{len(view)}字节"
+        )
+    array = np.frombuffer(view, dtype=dtype, count=rows * columns, offset=HEADER_SIZE)
+    return array.reshape(rows, columns)
+
+
+def encode_labels(labels):
+    """预测标签 → 二进制响应：标签都在int8范围内时每行1字节，否则4字节"""
+    labels = np.asarray(labels)
+    small = labels.size == 0 or (labels.min() >= -128 and labels.max() <= 127)
+    return encode(labels.astype(np.int8 if small else np.int32))
+
+
+def decode_labels(buffer):
+    return decode(buffer, n_columns=1, kinds="i")[:, 0]
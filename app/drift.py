@@ -0,0 +1,209 @@
+# app/drift.py（线上特征漂移监控：请求线程只入队，后台线程按批累计统计并定期快照）
+import collections
+import os
+import threading
+import time
+
+import numpy as np
+
+from ml.drift import RunningStats, compare
+
+
+class _Window:
+    """一段时间内的统计：整体 + 按预测类别（内存只与特征数、类别数、分箱数有关）"""
+
+    __slots__ = ("started_at", "overall", "by_class")
+
+    def __init__(self, edges):
+        self.started_at = time.time()
+        self.overall = RunningStats(edges)
+        self.by_class = {}
+
+    def update(self, X, labels, edges):
+        self.overall.update(X)
+        for label in np.unique(labels).tolist():
+            stats = self.by_class.get(str(label))
+            if stats is None:
+                stats = self.by_class[str(label)] = RunningStats(edges)
+            stats.update(X[labels == label])
+
+
+class DriftMonitor:
+    """
+    请求线程只在锁内检查额度、登记行数并做一次deque.append（不计算），记录 (特征行, 预测标签)；
+    后台线程每poll_interval秒取出队列中的记录，每次最多fold_rows行拼成矩阵合并进
+    累计统计和当前窗口（逐批Welford合并，均值/方差与逐条更新一致），
+    积压再多临时内存也只有一个切片大小；
+    当前窗口每snapshot_interval秒封存为快照，保留最近max_snapshots个。
+    队列按条数（queue_size）和行数（max_queued_rows）双重限制：超出时丢弃新记录并计数，
+    批量请求只保留额度内的前几行；非有限值（NaN/inf）的行不计入统计
+    """
+
+    def __init__(
+        self,
+        reference,
+        queue_size=100000,
+        max_queued_rows=1000000,
+        fold_rows=65536,
+        snapshot_interval=60.0,
+        max_snapshots=60,
+        poll_interval=0.2,
+    ):
+        self.reference = reference
+        self.edges = np.asarray(reference["edges"], dtype=np.float64)
+        self.queue_size = max(1, int(queue_size))
+        self.max_queued_rows = max(1, int(max_queued_rows))
+        self.fold_rows = max(1, int(fold_rows))
+        self.snapshot_interval = float(snapshot_interval)
+        self.poll_interval = poll_interval
+        self._snapshots = collections.deque(maxlen=max(1, int(max_snapshots)))
+        self._total = _Window(self.edges)
+        self._window = _Window(self.edges)
+        self._dropped = 0
+        self._dropped_rows = 0
+        self._nonfinite = 0
+        self._fold_seconds = 0.0
+        self._start_worker()
+        # fork出的子进程（app/serve.py）不会继承线程，需要重新启动
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._start_worker)
+
+    def _start_worker(self):
+        self._lock = threading.Lock()  # 入队、登记/取出行数、合并统计和读取报告时使用
+        # 不设maxlen：条数上限在锁内检查，deque自身不会静默挤掉已入队的记录
+        self._queue = collections.deque()
+        self._queued_rows = 0
+        self._carry = (
+            None  # 上次切片剩下的大批量记录（只由后台线程读写，行数仍计入_queued_rows）
+        )
+        self._thread = threading.Thread(target=self._run, name="drift", daemon=True)
+        self._thread.start()
+
+    def observe(self, rows, labels):
+        """记录一批已打分的特征行及预测标签（单条请求rows只有一行），返回是否入队"""
+        n_rows = len(rows)
+        with self._lock:
+            room = self.max_queued_rows - self._queued_rows
+            if len(self._queue) >= self.queue_size or room <= 0:
+                self._dropped += 1
+                self._dropped_rows += n_rows
+                return False
+            if n_rows > room:
+                # 超出行数额度的批量请求只保留前room行（拷贝出来，不让切片持有整批数据）
+                self._dropped_rows += n_rows - room
+                rows, labels = np.array(rows[:room]), np.array(labels[:room])
+                n_rows = room
+            self._queued_rows += n_rows
+            self._queue.append((rows, labels))
+        return True
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+            self.fold()
+
+    def fold(self):
+        """把队列中的记录合并进统计，到期时封存当前窗口（只由后台线程调用，测试中可直接调用）"""
+        while True:
+            rows, labels = self._take()
+            if not rows:
+                break
+            start = time.perf_counter()
+            X = np.concatenate(rows).reshape(-1, self.edges.shape[0])
+            y = np.concatenate(labels)
+            finite = np.isfinite(X).all(axis=1)
+            with self._lock:
+                if not finite.all():
+                    self._nonfinite += int(np.count_nonzero(~finite))
+                    X, y = X[finite], y[finite]
+                self._total.update(X, y, self.edges)
+                self._window.update(X, y, self.edges)
+                self._fold_seconds += time.perf_counter() - start
+        with self._lock:
+            if time.time() - self._window.started_at >= self.snapshot_interval:
+                self._snapshot()
+
+    def _take(self):
+        """
+        从队列取出最多fold_rows行，返回 (行块列表, 标签块列表)；
+        大批量记录切开后剩余部分留在后台线程自己的_carry中，下次优先取出（不放回共享队列）
+        """
+        rows, labels, taken = [], [], 0
+        while taken < self.fold_rows:
+            if self._carry is not None:
+                (batch_rows, batch_labels), self._carry = self._carry, None
+            else:
+                try:
+                    batch_rows, batch_labels = self._queue.popleft()
+                except IndexError:
+                    break
+            # 二进制批量请求提交的是整块数组，按块保存，不逐行展开
+            batch_rows = np.asarray(batch_rows, dtype=np.float64).reshape(
+                -1, self.edges.shape[0]
+            )
+            batch_labels = np.asarray(batch_labels)
+            room = self.fold_rows - taken
+            if len(batch_rows) > room:
+                self._carry = (batch_rows[room:], batch_labels[room:])
+                batch_rows, batch_labels = batch_rows[:room], batch_labels[:room]
+            rows.append(batch_rows)
+            labels.append(batch_labels)
+            taken += len(batch_rows)
+        if taken:
+            with self._lock:
+                self._queued_rows -= taken
+        return rows, labels
+
+    def _snapshot(self):
+        """调用方持有锁：封存当前窗口（空窗口也封存，便于看出流量中断）"""
+        window = self._window
+        self._snapshots.append(
+            {
+                "started_at": window.started_at,
+                "ended_at": time.time(),
+                "overall": window.overall,
+                "by_class": window.by_class,
+            }
+        )
+        self._window = _Window(self.edges)
+
+    def report(self, species_map=None, snapshots=5):
+        """
+        累计统计和最近snapshots个窗口快照分别与参考统计对比（快照按时间倒序）；
+        对比在调用线程中进行，只在拷贝引用时持锁
+        """
+        with self._lock:
+            total = self._total
+            recent = list(self._snapshots)[-snapshots:] if snapshots else []
+            counters = {
+                "dropped": self._dropped,
+                "dropped_rows": self._dropped_rows,
+                "queued_rows": self._queued_rows,
+                "nonfinite_rows": self._nonfinite,
+                "fold_seconds_total": self._fold_seconds,
+            }
+            # 累计统计仍在更新，拷贝后在锁外对比（快照封存后不再变化，不用拷贝）
+            overall = total.overall.copy()
+            by_class = {k: v.copy() for k, v in total.by_class.items()}
+        return dict(
+            counters,
+            enabled=True,
+            queue_depth=len(self._queue),
+            queue_size=self.queue_size,
+            max_queued_rows=self.max_queued_rows,
+            snapshot_interval_seconds=self.snapshot_interval,
+            since=time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(total.started_at)),
+            cumulative=compare(self.reference, overall, by_class, species_map),
+            snapshots=[
+                dict(
+                    compare(self.reference, s["overall"], s["by_class"], species_map),
+                    started_at=time.strftime(
+                        "%Y-%m-%dT%H:%M:%S", time.localtime(s["started_at"])
+                    ),
+                    ended_at=time.strftime(
+                        "%Y-%m-%dT%H:%M:%S", time.localtime(s["ended_at"])
+                    ),
+                )
+                for s in reversed(recent)
+            ],
+        )
@@ -1,17 +1,69 @@
-from flask import Flask, request, jsonify
+from flask import (
+    Blueprint,
+    Flask,
+    Response,
+    g,
+    request,
+    jsonify,
+    stream_with_context,
+)
 from flask_cors import CORS  # 导入跨域模块（已存在，新增调用）
-import mlflow.sklearn
-import pandas as pd
+import json
+import numpy as np
 import os
+import sys
+import time
 import yaml
+from time import perf_counter
 from dotenv import load_dotenv
 
+# 项目根目录加入模块搜索路径（兼容 python app/main.py 直接启动）
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from ml.registry import (
+    DEFAULT_MODEL_NAME,
+    REGISTRY_INDEX_PATH,
+    find_latest_mlruns_model,
+    find_serving_artifact,
+    resolve_model_entry,
+    resolve_production_model_path,
+)
+from ml.scoring import LinearScorer, load_artifact, DEFAULT_ARTIFACT_PATH
+from ml.lut import DEFAULT_LUT_PATH, LutScorer, compile_lut, load_lut
+from ml.drift import DEFAULT_REFERENCE_PATH, load_reference
+from app.admission import AdmissionController, AdmissionRejected
+from app.batching import MicroBatcher
+from app.binary_format import (
+    HEADER_SIZE as BINARY_HEADER_SIZE,
+    MIME_TYPE as BINARY_MIME_TYPE,
+    BinaryFormatError,
+    decode,
+    encode_labels,
+)
+from app.metrics import Metrics
+from app.model_cache import ModelCache, ModelNotFoundError
+from app.request_log import RequestLogger
+from app.shadow import ShadowEvaluator
+from app.drift import DriftMonitor
+from app.model_manager import CANARY_SAMPLES, ModelHandle, ModelManager
+
 # 加载环境变量
 load_dotenv()
 
-# 初始化Flask app → 新增跨域配置 CORS(app)
-app = Flask(__name__)
-CORS(app)  # 关键：启用跨域，允许所有源访问（测试环境安全，解决前端fetch问题）
+# 启动模式：mlflow（默认，通过MLflow反序列化模型）
+# 或 artifact（只读取精简.npz产物，不导入mlflow/pandas，冷启动更快、内存更小）
+SERVING_MODE = os.getenv("SERVING_MODE", "mlflow").strip().lower()
+# artifact模式下精简产物不存在时是否退回加载MLflow模型（默认不退回，启动失败并提示先导出产物）
+SERVING_ARTIFACT_FALLBACK = os.getenv("SERVING_ARTIFACT_FALLBACK", "0").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# 所有接口注册在蓝图上，由create_app()创建Flask应用时挂载
+bp = Blueprint("iris", __name__)
 
 
 # --------------------------
@@ -37,62 +89,36 @@ def load_label_map():
     return {0: "setosa", 1: "versicolor", 2: "virginica"}
 
 
-SPECIES_MAP = load_label_map()
-
-
 # --------------------------
 # 核心修复：模型路径验证+自动重试
 # --------------------------
 def get_valid_model_path():
     """
-    验证模型路径是否存在，若不存在则：
-    1. 尝试从mlruns目录查找最新模型
-    2. 若找不到则提示用户重新训练
+    验证模型路径是否存在，依次尝试：
+    1. 注册表索引ml/registry/index.json（O(1)查找），兼容current_model.md
+    2. .env中的MODEL_PATH
+    3. 索引缺失时才遍历mlruns目录查找最新模型
+    4. 若找不到则提示用户重新训练
     """
-    # 1. 优先从current_model.md读取
-    current_model_file = os.path.join(
-        os.path.dirname(__file__), "../ml/registry/current_model.md"
-    )
-    candidate_paths = []
-    if os.path.exists(current_model_file):
-        try:
-            with open(current_model_file, "r", encoding="utf-8") as f:
-                for line in f:
-                    if "模型路径：" in line:
-                        path = line.split("：")[-1].strip()
-                        candidate_paths.append(path)
-        except Exception as e:
-            print(f"读取current_model.md失败：{e}")
+    # 1. 注册表索引 / current_model.md（与ml/registry.py共用同一解析逻辑）
+    model_path = resolve_production_model_path(scan_mlruns=False)
+    if model_path:
+        print(f"找到有效模型路径：{model_path}")
+        return model_path
 
-    # 2. 从.env添加候选路径
+    # 2. 从.env读取（处理路径格式，兼容Windows反斜杠）
     env_path = os.getenv("MODEL_PATH")
-    if env_path:
-        candidate_paths.append(env_path)
-
-    # 3. 验证候选路径是否存在
-    for path in candidate_paths:
-        # 处理路径格式（兼容Windows反斜杠）
-        normalized_path = os.path.normpath(path)
-        if os.path.exists(normalized_path):
-            print(f"找到有效模型路径：{normalized_path}")
-            return normalized_path
-
-    # 4. 自动查找mlruns目录下的最新模型（最后修改的模型）
-    mlruns_root = os.path.join(os.path.dirname(__file__), "../mlruns")
-    if os.path.exists(mlruns_root):
-        print(f"在{mlruns_root}中查找最新模型...")
-        # 递归查找所有模型目录（特征：包含MLmodel文件）
-        model_dirs = []
-        for root, dirs, files in os.walk(mlruns_root):
-            if "MLmodel" in files:  # MLflow模型的标志文件
-                model_dirs.append((root, os.path.getmtime(root)))  # (路径, 修改时间)
-        # 按修改时间排序，取最新的
-        if model_dirs:
-            latest_model = sorted(model_dirs, key=lambda x: x[1], reverse=True)[0][0]
-            print(f"自动找到最新模型：{latest_model}")
-            return latest_model
-
-    # 5. 所有方法都失败，提示用户重新训练
+    if env_path and os.path.exists(os.path.normpath(env_path)):
+        print(f"找到有效模型路径：{os.path.normpath(env_path)}")
+        return os.path.normpath(env_path)
+
+    # 3. 自动查找mlruns目录下的最新模型（最后修改的模型）
+    latest_model = find_latest_mlruns_model()
+    if latest_model:
+        print(f"自动找到最新模型：{latest_model}")
+        return latest_model
+
+    # 4. 所有方法都失败，提示用户重新训练
     raise FileNotFoundError(
         """
     未找到有效模型路径！请执行以下步骤：
@@ -106,60 +132,903 @@ def get_valid_model_path():
 # --------------------------
 # 加载模型（确保路径有效）
 # --------------------------
-try:
+def load_serving_artifact():
+    """精简模式：从SERVING_ARTIFACT_PATH读取.npz产物，标签映射随产物一起加载"""
+    artifact_path = get_serving_artifact_path()
+    scorer, meta = load_artifact(artifact_path)
+    print(f"找到精简模型：{artifact_path}（sha256：{meta['checksum'][:12]}）")
+    return artifact_path, scorer, meta
+
+
+def get_serving_artifact_path():
+    return os.path.join(
+        PROJECT_ROOT, os.getenv("SERVING_ARTIFACT_PATH") or DEFAULT_ARTIFACT_PATH
+    )
+
+
+def describe_model_version(model_path):
+    """用注册表索引中的 名称:v版本 标识模型，索引外的模型用目录名"""
+    entry = resolve_model_entry()
+    if entry and os.path.normpath(
+        os.path.join(PROJECT_ROOT, entry["path"])
+    ) == os.path.normpath(os.path.abspath(model_path)):
+        return f"{entry['name']}:v{entry['version']}"
+    return os.path.basename(os.path.dirname(os.path.normpath(model_path)))
+
+
+def load_mlflow_handle():
+    """从MLflow模型目录加载当前注册的模型"""
+    import mlflow.sklearn  # 用到时才导入，精简模式不承担其导入开销
+
     model_path = get_valid_model_path()
     model = mlflow.sklearn.load_model(model_path)
-    print("✅ 模型加载成功")
-except Exception as e:
-    print(f"❌ 模型加载失败：{str(e)}")
-    raise  # 启动失败，必须解决模型问题
+    # 预测热路径只用纯NumPy打分器，避免DataFrame构造和sklearn输入校验开销
+    scorer = LinearScorer.from_model(model)
+    return ModelHandle(
+        scorer, load_label_map(), describe_model_version(model_path), model_path
+    )
+
+
+def load_model_handle():
+    """
+    按SERVING_MODE加载当前注册的模型，返回ModelHandle（启动和热更新共用）；
+    artifact模式下精简产物不存在（未训练导出或未随仓库分发）时直接失败，
+    设置SERVING_ARTIFACT_FALLBACK=1后才退回MLflow模型
+    """
+    if SERVING_MODE == "artifact" and not SERVING_ARTIFACT_FALLBACK:
+        artifact_path = get_serving_artifact_path()
+        if not os.path.exists(artifact_path):
+            raise FileNotFoundError(
+                f"精简产物不存在：{artifact_path}，请先运行 python ml/train.py 导出，"
+                "或设置SERVING_ARTIFACT_FALLBACK=1退回加载MLflow模型"
+            )
+    if SERVING_MODE == "artifact" and os.path.exists(get_serving_artifact_path()):
+        artifact_path, scorer, meta = load_serving_artifact()
+        handle = ModelHandle(
+            scorer,
+            meta["species_map"],
+            f"artifact:{meta['checksum'][:12]}",
+            artifact_path,
+        )
+    else:
+        if SERVING_MODE == "artifact":
+            print(
+                f"⚠️ 精简产物不存在：{get_serving_artifact_path()}，退回加载MLflow模型"
+            )
+        handle = load_mlflow_handle()
+    if PREDICT_LUT_ENABLED:
+        handle.scorer = attach_lut(handle.scorer)
+    return handle
 
 
 # --------------------------
-# API接口（保持不变）
+# 查表预测（可选）：PREDICT_LUT=1时，0.1cm格点上的单条/批量标签预测直接查预先编译的表，
+# 超出网格范围或不在格点上的输入回退到模型；概率仍由模型计算
 # --------------------------
-@app.route("/predict", methods=["POST"])
+PREDICT_LUT_ENABLED = os.getenv("PREDICT_LUT", "0").lower() in ("1", "true", "yes")
+
+
+def attach_lut(scorer):
+    """给打分器套上查表层：优先读取与当前模型匹配的查表产物（ml/lut.py编译），否则现场编译"""
+    # 相对路径按项目根目录解析（与启动时的工作目录无关）
+    lut_path = os.path.join(
+        PROJECT_ROOT, os.getenv("PREDICT_LUT_PATH") or DEFAULT_LUT_PATH
+    )
+    if os.path.exists(lut_path):
+        try:
+            table = load_lut(lut_path)
+            lut_scorer = LutScorer(scorer, table)  # 模型已变化时抛ValueError
+            print(f"已加载查表产物：{lut_path}（{table.cells}格，{table.nbytes}字节）")
+            return lut_scorer
+        except (OSError, ValueError, KeyError) as e:
+            print(f"查表产物不可用（{e}），按当前模型重新编译")
+    start = perf_counter()
+    table = compile_lut(scorer)
+    print(
+        f"查表已编译：{table.cells}格，{table.nbytes}字节，"
+        f"耗时{perf_counter() - start:.2f}s"
+    )
+    return LutScorer(scorer, table)
+
+
+def registry_fingerprint():
+    """注册表状态指纹：索引、current_model.md、精简产物的修改时间，任一变化即触发重载"""
+    paths = [
+        REGISTRY_INDEX_PATH,
+        os.path.join(PROJECT_ROOT, "ml", "registry", "current_model.md"),
+    ]
+    if SERVING_MODE == "artifact":
+        paths.append(get_serving_artifact_path())
+    return tuple(os.path.getmtime(p) if os.path.exists(p) else None for p in paths)
+
+
+def warm_up_model(handle, rounds=3):
+    """
+    模型上线前预热：按单条、批量两条打分路径各跑几次（金丝雀样本作为输入），
+    让NumPy/BLAS等的懒初始化发生在上线之前，而不是落到第一个真实请求上
+    """
+    rows = [features for features, _ in CANARY_SAMPLES]
+    for _ in range(rounds):
+        for features in rows:
+            handle.scorer.predict_one(features)
+        score_rows(handle, rows)
+        handle.scorer.predict_with_proba(np.array(rows * 16))
+
+
+# 导入模块时不加载模型：create_app()启动后台加载，就绪状态见 /readyz
+model_manager = ModelManager(
+    load_model_handle, fingerprint=registry_fingerprint, warm_up=warm_up_model
+)
+
+
+# --------------------------
+# 多版本模型（按请求指定版本/阶段，A/B测试或客户固定版本；LRU缓存）
+# --------------------------
+def load_model_version(key):
+    """按 (模型名, 版本) 加载注册表中的指定版本，返回ModelHandle（供ModelCache调用）"""
+    name, version = key
+    entry = resolve_model_entry(name, version=version)
+    if entry is None:
+        raise ModelNotFoundError(f"模型版本不存在：{name} v{version}")
+    label = f"{name}:v{version}"
+    artifact_path = find_serving_artifact(entry) if SERVING_MODE == "artifact" else None
+    if artifact_path is not None:
+        scorer, meta = load_artifact(artifact_path)
+        handle = ModelHandle(scorer, meta["species_map"], label, artifact_path)
+    elif SERVING_MODE == "artifact" and not SERVING_ARTIFACT_FALLBACK:
+        raise ModelNotFoundError(f"{label}没有精简服务产物，artifact模式下无法加载")
+    else:
+        # mlflow模式，或该版本没有精简服务产物且允许退回：加载MLflow模型
+        import mlflow.sklearn
+
+        model_path = os.path.join(PROJECT_ROOT, entry["path"])
+        model = mlflow.sklearn.load_model(model_path)
+        handle = ModelHandle(
+            LinearScorer.from_model(model), load_label_map(), label, model_path
+        )
+    print(f"已加载模型版本：{label}")
+    return handle
+
+
+model_cache = ModelCache(
+    load_model_version,
+    max_entries=int(os.getenv("MODEL_CACHE_MAX_ENTRIES", 4)),
+    max_bytes=float(os.getenv("MODEL_CACHE_MAX_MB", 0)) * 1024 * 1024,
+)
+
+
+def requested_model_handle(data=None):
+    """
+    请求指定的模型版本：X-Model-Version / X-Model-Stage 请求头优先，
+    其次是请求体（JSON对象）中的 model_version / model_stage 字段；同时指定时以版本为准。
+    未指定时返回None，使用当前生效模型（热更新管理的那个）
+    """
+    version = request.headers.get("X-Model-Version")
+    stage = request.headers.get("X-Model-Stage")
+    if version is None and stage is None and isinstance(data, dict):
+        version, stage = data.get("model_version"), data.get("model_stage")
+    if version is None and stage is None:
+        return None
+    if version is None:
+        entry = resolve_model_entry(DEFAULT_MODEL_NAME, stage=stage)
+        if entry is None:
+            raise ModelNotFoundError(f"阶段{stage}下没有模型版本")
+        version = entry["version"]
+    version = str(version).strip().lstrip("vV")
+    return model_cache.get((DEFAULT_MODEL_NAME, version))
+
+
+def model_not_found(e):
+    return jsonify({"status": "fail", "error": str(e)}), 404
+
+
+# --------------------------
+# 影子模型（可选）：SHADOW_MODEL_VERSIONS列出的候选版本在后台对同样的输入打分，
+# 统计与主模型的一致率；主请求只入队不等待，队列满时丢弃影子任务
+# --------------------------
+SHADOW_MODEL_VERSIONS = [
+    v.strip().lstrip("vV")
+    for v in os.getenv("SHADOW_MODEL_VERSIONS", "").split(",")
+    if v.strip()
+]
+shadow = None
+if SHADOW_MODEL_VERSIONS:
+    shadow = ShadowEvaluator(
+        # 候选模型与按请求指定的版本共用同一个缓存，在worker线程中加载
+        lambda: [
+            model_cache.get((DEFAULT_MODEL_NAME, v)) for v in SHADOW_MODEL_VERSIONS
+        ],
+        workers=int(os.getenv("SHADOW_WORKERS", 1)),
+        queue_size=int(os.getenv("SHADOW_QUEUE_SIZE", 10000)),
+        max_queued_rows=int(os.getenv("SHADOW_MAX_QUEUED_ROWS", 100000)),
+        sample_rate=float(os.getenv("SHADOW_SAMPLE_RATE", 1.0)),
+    )
+    print(
+        f"已启用影子模型：v{', v'.join(SHADOW_MODEL_VERSIONS)}"
+        f"（{shadow.workers}个worker，队列上限{shadow.queue_size}）"
+    )
+
+# --------------------------
+# 请求日志（可选）：REQUEST_LOG_ENABLED=1时记录请求体和预测结果，供重新训练和流量回放；
+# 请求线程只入队，写线程批量gzip压缩写出，按大小/时间轮转
+# --------------------------
+request_logger = None
+if os.getenv("REQUEST_LOG_ENABLED", "0").lower() in ("1", "true", "yes"):
+    request_logger = RequestLogger(
+        os.path.join(PROJECT_ROOT, os.getenv("REQUEST_LOG_DIR", "logs/requests")),
+        max_bytes=float(os.getenv("REQUEST_LOG_MAX_MB", 64)) * 1024 * 1024,
+        max_age=float(os.getenv("REQUEST_LOG_MAX_AGE_SECONDS", 3600)),
+        queue_size=int(os.getenv("REQUEST_LOG_QUEUE_SIZE", 100000)),
+        max_queued_records=int(os.getenv("REQUEST_LOG_MAX_QUEUED_RECORDS", 1000000)),
+    )
+    print(f"已启用请求日志：{request_logger.directory}")
+
+
+def close_background():
+    """
+    进程退出前写出后台队列中待落盘的数据（目前只有请求日志）；
+    正常退出时由atexit调用，app/serve.py的worker用os._exit退出，需显式调用
+    """
+    if request_logger is not None:
+        request_logger.close()
+
+
+# --------------------------
+# 特征漂移监控（可选）：DRIFT_ENABLED=1时在线累计 /predict、/predict/batch 输入的
+# 逐特征统计（整体及按预测类别），定期快照，与训练时保存的参考统计对比
+# --------------------------
+drift_monitor = None
+if os.getenv("DRIFT_ENABLED", "0").lower() in ("1", "true", "yes"):
+    try:
+        drift_monitor = DriftMonitor(
+            load_reference(
+                os.path.join(
+                    PROJECT_ROOT,
+                    os.getenv("DRIFT_REFERENCE_PATH") or DEFAULT_REFERENCE_PATH,
+                )
+            ),
+            queue_size=int(os.getenv("DRIFT_QUEUE_SIZE", 100000)),
+            max_queued_rows=int(os.getenv("DRIFT_MAX_QUEUED_ROWS", 1000000)),
+            snapshot_interval=float(os.getenv("DRIFT_SNAPSHOT_SECONDS", 60)),
+            max_snapshots=int(os.getenv("DRIFT_MAX_SNAPSHOTS", 60)),
+        )
+        print(f"已启用漂移监控：每{drift_monitor.snapshot_interval:g}秒快照一次")
+    except (OSError, ValueError) as e:
+        print(f"⚠️ 漂移监控未启用：{e}")
+
+# 微批处理（可选）：并发的单条/predict请求合并成一个矩阵打分，高并发下提升吞吐
+micro_batcher = None
+if os.getenv("MICROBATCH_ENABLED", "0").lower() in ("1", "true", "yes"):
+    micro_batcher = MicroBatcher(
+        lambda: model_manager.current,
+        max_batch_size=int(os.getenv("MICROBATCH_MAX_SIZE", 32)),
+        max_wait_ms=float(os.getenv("MICROBATCH_MAX_WAIT_MS", 2)),
+    )
+    print(
+        f"已启用微批处理：批大小≤{micro_batcher.max_batch_size}，"
+        f"最长等待{micro_batcher.max_wait * 1000:g}ms"
+    )
+
+# 准入控制（可选）：限制同时推理的请求数和排队长度，按截止时间提前拒绝，过载时快速失败
+admission = None
+if os.getenv("ADMISSION_ENABLED", "0").lower() in ("1", "true", "yes"):
+    admission = AdmissionController(
+        max_concurrency=int(os.getenv("ADMISSION_MAX_CONCURRENCY", 2)),
+        max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", 64)),
+        queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", 1000)) / 1000,
+    )
+    print(
+        f"已启用准入控制：并发≤{admission.max_concurrency}，"
+        f"排队≤{admission.max_queue}"
+    )
+# 请求未带X-Deadline-Ms时使用的截止时间（毫秒），0表示不限（排队最多ADMISSION_QUEUE_TIMEOUT_MS）
+DEFAULT_DEADLINE_MS = float(os.getenv("ADMISSION_DEFAULT_DEADLINE_MS", 0))
+
+
+# --------------------------
+# 指标采集（METRICS_ENABLED=1时记录各阶段耗时，/metrics导出）
+# --------------------------
+metrics = Metrics(
+    enabled=os.getenv("METRICS_ENABLED", "0").lower() in ("1", "true", "yes")
+)
+metrics.register("predict", ["parse", "validate", "model", "serialize"])
+metrics.register("batch", ["parse", "validate", "model", "serialize"])
+# 流式接口边读边返回，各阶段交错进行，只记录整体耗时（total）
+metrics.register("stream", [])
+
+
+# --------------------------
+# 特征校验（单条与批量共用）
+# --------------------------
+FEATURE_COLUMNS = ["sepal_length", "sepal_width", "petal_length", "petal_width"]
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", 10000))
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", 1000))
+# 二进制批量请求没有逐条解析开销，单独设置行数上限
+BINARY_MAX_ROWS = int(os.getenv("BINARY_MAX_ROWS", 1000000))
+
+
+def validate_features(data):
+    """
+    校验单条特征记录，返回 (特征列表, 错误信息)：
+    校验通过时错误信息为None，特征按FEATURE_COLUMNS顺序排列
+    """
+    if not isinstance(data, dict):
+        return None, "记录需为JSON对象"
+    missing_params = [p for p in FEATURE_COLUMNS if p not in data]
+    if missing_params:
+        return None, f"缺少参数：{', '.join(missing_params)}"
+    try:
+        return [float(data[k]) for k in FEATURE_COLUMNS], None
+    except (TypeError, ValueError):
+        return None, "参数需为数字"
+
+
+def score_rows(handle, rows):
+    """对合法特征行做一次矩阵打分，返回逐行结果（批量与流式接口共用）"""
+    species_map = handle.species_map
+    pred_labels, probas = handle.scorer.predict_with_proba(np.array(rows))
+    classes = handle.scorer.classes
+    return [
+        {
+            "status": "success",
+            "predicted_species": species_map[pred_label],
+            "label": int(pred_label),
+            "probabilities": {species_map[c]: float(p) for c, p in zip(classes, proba)},
+        }
+        for pred_label, proba in zip(pred_labels, probas)
+    ]
+
+
+# --------------------------
+# 健康检查（存活/就绪）
+# --------------------------
+# 模型就绪前也可访问的接口（其余接口返回503）
+UNGATED_ENDPOINTS = {
+    "iris.healthz",
+    "iris.readyz",
+    "iris.admin_model",
+    "iris.admin_reload",  # 首次加载失败后可通过重载恢复
+    "iris.admin_batching",
+    "iris.admin_request_log",
+    "iris.admin_admission",
+}
+# 需要准入控制的接口（流式接口长时间占用连接，不计入推理并发）
+ADMISSION_ENDPOINTS = {"iris.predict", "iris.predict_batch"}
+
+
+@bp.before_request
+def require_model_ready():
+    """模型未就绪时拒绝需要模型的请求（503 + Retry-After），不让流量打到冷worker上"""
+    if model_manager.current is None and request.endpoint not in UNGATED_ENDPOINTS:
+        error = (
+            f"模型加载失败：{model_manager.load_error}"
+            if model_manager.state == "failed"
+            else "模型加载中，请稍后重试"
+        )
+        return jsonify({"status": "fail", "error": error}), 503, {"Retry-After": "1"}
+    return None
+
+
+@bp.before_request
+def admit_request():
+    """
+    准入控制：请求头X-Deadline-Ms为客户端愿意等待的剩余时间（毫秒），
+    截止时间前完成不了的请求直接返回429/503和Retry-After，不排队做无用功
+    """
+    if admission is None or request.endpoint not in ADMISSION_ENDPOINTS:
+        return None
+    deadline_ms = request.headers.get("X-Deadline-Ms")
+    try:
+        deadline_ms = float(deadline_ms) if deadline_ms is not None else None
+    except ValueError:
+        return jsonify({"status": "fail", "error": "X-Deadline-Ms需为毫秒数"}), 400
+    if deadline_ms is None and DEFAULT_DEADLINE_MS > 0:
+        deadline_ms = DEFAULT_DEADLINE_MS
+    deadline = perf_counter() + deadline_ms / 1000 if deadline_ms is not None else None
+    try:
+        g.admission_start = admission.admit(deadline)
+    except AdmissionRejected as e:
+        body = {"status": "fail", "error": str(e), "reason": e.reason}
+        return jsonify(body), e.status, {"Retry-After": str(e.retry_after)}
+    return None
+
+
+@bp.teardown_request
+def release_admission(exc):
+    start = g.pop("admission_start", None)
+    if start is not None:
+        admission.release(start)
+
+
+def health_body():
+    return {
+        "state": model_manager.state,
+        "serving_mode": SERVING_MODE,
+        "uptime_seconds": round(time.time() - model_manager.started_at, 3),
+        "load_seconds": model_manager.load_seconds,
+        "version": model_manager.current.version if model_manager.current else None,
+        "error": model_manager.load_error,
+    }
+
+
+@bp.route("/healthz", methods=["GET"])
+def healthz():
+    """存活检查：进程能响应即为存活；启动加载失败时返回500，让编排系统重启进程"""
+    body = health_body()
+    return jsonify(body), 500 if model_manager.state == "failed" else 200
+
+
+@bp.route("/readyz", methods=["GET"])
+def readyz():
+    """就绪检查：模型加载、金丝雀校验和预热都完成后返回200，此前返回503"""
+    body = health_body()
+    return jsonify(body), 200 if model_manager.current is not None else 503
+
+
+# --------------------------
+# API接口
+# --------------------------
+@bp.route("/predict", methods=["POST"])
 def predict():
+    marks = [perf_counter()] if metrics.enabled else None  # 分阶段计时
     try:
         if not request.is_json:
+            metrics.finish("predict", marks, 400, "content_type")
             return jsonify({"status": "fail", "error": "需为application/json"}), 400
         data = request.json
+        if marks:
+            marks.append(perf_counter())
+
+        features, error = validate_features(data)
+        if marks:
+            marks.append(perf_counter())
+        if error:
+            if request_logger is not None:
+                request_logger.log("/predict", data, 400)
+            metrics.finish("predict", marks, 400, "validation")
+            return jsonify({"status": "fail", "error": error}), 400
+
+        # 指定了版本的请求直接用该版本打分（不进入微批处理，各批只用同一个模型）
+        pinned = requested_model_handle(data)
+        if pinned is None and micro_batcher is not None:
+            pred_label, handle = micro_batcher.submit(features)
+        else:
+            handle = pinned or model_manager.current  # 整个请求使用同一个模型句柄
+            pred_label = handle.scorer.predict_one(features)
+        if shadow is not None:
+            shadow.submit([features], [pred_label], handle.version)
+        if drift_monitor is not None:
+            drift_monitor.observe([features], [pred_label])
+        if request_logger is not None:
+            request_logger.log("/predict", data, 200, handle.version, pred_label)
+        if marks:
+            marks.append(perf_counter())
+        result = {
+            "status": "success",
+            "predicted_species": handle.species_map[pred_label],
+            "label": int(pred_label),
+        }
+        if pinned is not None:
+            result["model_version"] = handle.version
+        response = jsonify(result)
+        if marks:
+            marks.append(perf_counter())
+        metrics.finish("predict", marks, 200)
+        return response, 200
+
+    except ModelNotFoundError as e:
+        metrics.finish("predict", marks, 404, "model_not_found")
+        return model_not_found(e)
+    except Exception as e:
+        metrics.finish("predict", marks, 500, type(e).__name__)
+        return jsonify({"status": "fail", "error": str(e)}), 500
 
-        required_params = ["sepal_length", "sepal_width", "petal_length", "petal_width"]
-        missing_params = [p for p in required_params if p not in data]
-        if missing_params:
+
+@bp.route("/predict/batch", methods=["POST"])
+def predict_batch():
+    """
+    批量预测：请求体为特征记录组成的JSON数组，
+    所有合法记录拼成一个特征矩阵，只做一次矩阵运算得到标签和概率；
+    非法记录在对应位置返回错误，不影响其他记录。
+    请求体为application/octet-stream时按二进制格式处理（见predict_batch_binary）
+    """
+    marks = [perf_counter()] if metrics.enabled else None  # 分阶段计时
+    try:
+        if request.mimetype == BINARY_MIME_TYPE:
+            return predict_batch_binary(marks)
+        if not request.is_json:
+            metrics.finish("batch", marks, 400, "content_type")
             return (
                 jsonify(
                     {
                         "status": "fail",
-                        "error": f"缺少参数：{', '.join(missing_params)}",
+                        "error": f"需为application/json或{BINARY_MIME_TYPE}",
                     }
                 ),
                 400,
             )
+        records = request.json
+        if marks:
+            marks.append(perf_counter())
+        if not isinstance(records, list):
+            metrics.finish("batch", marks, 400, "validation")
+            return jsonify({"status": "fail", "error": "请求体需为JSON数组"}), 400
+        if len(records) > MAX_BATCH_SIZE:
+            metrics.finish("batch", marks, 413, "too_large")
+            return (
+                jsonify(
+                    {
+                        "status": "fail",
+                        "error": f"单次最多{MAX_BATCH_SIZE}条记录，实际{len(records)}条",
+                    }
+                ),
+                413,
+            )
+
+        results = [None] * len(records)
+        valid_rows, valid_index = [], []
+        for i, record in enumerate(records):
+            features, error = validate_features(record)
+            if error:
+                results[i] = {"index": i, "status": "fail", "error": error}
+            else:
+                valid_rows.append(features)
+                valid_index.append(i)
+        if marks:
+            marks.append(perf_counter())
+
+        pinned = requested_model_handle()  # 批量请求只能通过请求头指定版本
+        handle = pinned or model_manager.current
+        if valid_rows:
+            scored = score_rows(handle, valid_rows)
+            for i, result in zip(valid_index, scored):
+                results[i] = {"index": i, **result}
+            if shadow is not None or drift_monitor is not None:
+                labels = [result["label"] for result in scored]
+                if shadow is not None:
+                    shadow.submit(valid_rows, labels, handle.version)
+                if drift_monitor is not None:
+                    drift_monitor.observe(valid_rows, labels)
+        if marks:
+            marks.append(perf_counter())
+
+        body = {
+            "status": "success",
+            "total": len(records),
+            "succeeded": len(valid_rows),
+            "failed": len(records) - len(valid_rows),
+            "results": results,
+        }
+        if pinned is not None:
+            body["model_version"] = handle.version
+        if request_logger is not None:
+            labels = [result.get("label") for result in results]
+            request_logger.log("/predict/batch", records, 200, handle.version, labels)
+        response = jsonify(body)
+        if marks:
+            marks.append(perf_counter())
+        metrics.finish("batch", marks, 200)
+        return response, 200
+
+    except ModelNotFoundError as e:
+        metrics.finish("batch", marks, 404, "model_not_found")
+        return model_not_found(e)
+    except Exception as e:
+        metrics.finish("batch", marks, 500, type(e).__name__)
+        return jsonify({"status": "fail", "error": str(e)}), 500
 
-        try:
-            features = {k: float(data[k]) for k in required_params}
-        except ValueError:
-            return jsonify({"status": "fail", "error": "参数需为数字"}), 400
 
-        input_df = pd.DataFrame([features])
-        pred_label = model.predict(input_df)[0]
+def read_binary_body():
+    """
+    读取二进制请求体；超过BINARY_MAX_ROWS行float64矩阵的大小时返回None，
+    有Content-Length时先按长度拒绝、不读请求体，没有时最多读到上限多一个字节
+    """
+    limit = BINARY_HEADER_SIZE + BINARY_MAX_ROWS * len(FEATURE_COLUMNS) * 8
+    if request.content_length is not None:
+        if request.content_length > limit:
+            return None
+        return request.get_data(cache=False)
+    body = request.stream.read(limit + 1)
+    return None if len(body) > limit else body
+
+
+def predict_batch_binary(marks):
+    """
+    二进制批量预测（格式见app/binary_format.py）：请求体直接包装成特征矩阵（不拷贝、不解析），
+    只返回预测标签，不含概率和逐行状态；任一行非有限值时整批返回400。
+    响应格式按Accept协商：默认二进制标签数组，Accept为application/json时返回JSON
+    """
+    body = read_binary_body()
+    if body is None:
+        metrics.finish("batch", marks, 413, "too_large")
+        return (
+            jsonify(
+                {
+                    "status": "fail",
+                    "error": f"请求体超过{BINARY_MAX_ROWS}行float64矩阵的大小",
+                }
+            ),
+            413,
+        )
+    try:
+        X = decode(body, n_columns=len(FEATURE_COLUMNS))
+    except BinaryFormatError as e:
+        metrics.finish("batch", marks, 400, "binary_format")
+        return jsonify({"status": "fail", "error": str(e)}), 400
+    if marks:
+        marks.append(perf_counter())
+    if len(X) > BINARY_MAX_ROWS:
+        metrics.finish("batch", marks, 413, "too_large")
         return (
             jsonify(
                 {
-                    "status": "success",
-                    "predicted_species": SPECIES_MAP[pred_label],
-                    "label": int(pred_label),
+                    "status": "fail",
+                    "error": f"单次最多{BINARY_MAX_ROWS}行，实际{len(X)}行",
                 }
             ),
-            200,
+            413,
         )
+    if not np.isfinite(X).all():
+        bad = int(np.flatnonzero(~np.isfinite(X).all(axis=1))[0])
+        metrics.finish("batch", marks, 400, "validation")
+        return (
+            jsonify({"status": "fail", "error": f"第{bad}行含非有限值（NaN/inf）"}),
+            400,
+        )
+    if marks:
+        marks.append(perf_counter())
 
-    except Exception as e:
-        return jsonify({"status": "fail", "error": str(e)}), 500
+    pinned = requested_model_handle()
+    handle = pinned or model_manager.current
+    labels = handle.scorer.predict(X) if len(X) else np.empty(0, dtype=np.int64)
+    if len(X) and (shadow is not None or drift_monitor is not None):
+        # X是请求体的视图，拷贝一份再入队，后台队列不持有整个请求体
+        rows = np.array(X)
+        if shadow is not None:
+            shadow.submit(rows, labels, handle.version)
+        if drift_monitor is not None:
+            drift_monitor.observe(rows, labels)
+    if marks:
+        marks.append(perf_counter())
+
+    if request_logger is not None:
+        # 二进制请求体不写入日志，只记录行数
+        request_logger.log(
+            "/predict/batch", {"format": "binary", "rows": len(X)}, 200, handle.version
+        )
+    best = request.accept_mimetypes.best_match(
+        [BINARY_MIME_TYPE, "application/json"], default=BINARY_MIME_TYPE
+    )
+    if best == "application/json":
+        species_map = handle.species_map
+        body = {
+            "status": "success",
+            "total": len(X),
+            "labels": labels.tolist(),
+            "predicted_species": [species_map[label] for label in labels.tolist()],
+        }
+        if pinned is not None:
+            body["model_version"] = handle.version
+        response = jsonify(body)
+    else:
+        response = Response(encode_labels(labels), mimetype=BINARY_MIME_TYPE)
+        response.headers["X-Model-Version"] = str(handle.version)
+    if marks:
+        marks.append(perf_counter())
+    metrics.finish("batch", marks, 200)
+    return response, 200
+
+
+def iter_lines(stream, block_size=1 << 16):
+    """按固定大小块读取请求体并切分成行（逐字节readline在大请求体上太慢）"""
+    pending = b""
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            break
+        pending += block
+        lines = pending.split(b"\n")
+        pending = lines.pop()
+        yield from lines
+    if pending:
+        yield pending
+
+
+@bp.route("/predict/stream", methods=["POST"])
+def predict_stream():
+    """
+    流式预测：请求体为NDJSON（每行一条特征记录），
+    边读边按STREAM_CHUNK_SIZE行分块打分，结果以NDJSON逐块返回，内存占用与输入大小无关；
+    坏行（JSON解析失败/参数错误）在对应位置返回错误，不中断整个流
+    """
+    lines_in = iter_lines(request.stream)
+    marks = [perf_counter()] if metrics.enabled else None  # 只记录整体耗时
+    # 通过请求头指定版本时整个流都用该版本（开始响应前加载，版本不存在时直接返回404）
+    try:
+        pinned = requested_model_handle()
+    except ModelNotFoundError as e:
+        metrics.finish("stream", marks, 404, "model_not_found")
+        return model_not_found(e)
+
+    def generate():
+        line_no = 0
+        while True:
+            chunk = []  # (行号, 透传ID, 特征或None, 错误)
+            while len(chunk) < STREAM_CHUNK_SIZE:
+                raw = next(lines_in, None)
+                if raw is None:
+                    break
+                line_no += 1
+                if not raw.strip():
+                    continue
+                try:
+                    record = json.loads(raw)
+                except ValueError as e:
+                    chunk.append((line_no, None, None, f"JSON解析失败：{e}"))
+                    continue
+                record_id = (
+                    record.get("id", record.get("request_id"))
+                    if isinstance(record, dict)
+                    else None
+                )
+                features, error = validate_features(record)
+                chunk.append((line_no, record_id, features, error))
+            if not chunk:
+                if marks:
+                    marks.append(perf_counter())
+                metrics.finish("stream", marks, 200)
+                return
+
+            # 每块取一次模型句柄，块内所有合法行一次矩阵打分
+            valid_rows = [features for _, _, features, error in chunk if not error]
+            handle = pinned or model_manager.current
+            scored = iter(score_rows(handle, valid_rows) if valid_rows else [])
+            lines = []
+            for chunk_line, record_id, features, error in chunk:
+                result = {"line": chunk_line}
+                if record_id is not None:
+                    result["id"] = record_id
+                if error:
+                    result.update(status="fail", error=error)
+                else:
+                    result.update(next(scored))
+                lines.append(json.dumps(result))
+            yield "\n".join(lines) + "\n"
+
+    return Response(
+        stream_with_context(generate()), mimetype="application/x-ndjson", status=200
+    )
+
+
+# --------------------------
+# 模型管理接口（热更新）
+# --------------------------
+def check_admin_token():
+    """配置了ADMIN_TOKEN时，管理接口需携带X-Admin-Token请求头"""
+    token = os.getenv("ADMIN_TOKEN")
+    if token and request.headers.get("X-Admin-Token") != token:
+        return jsonify({"status": "fail", "error": "管理令牌无效"}), 403
+    return None
+
+
+@bp.route("/admin/reload", methods=["POST"])
+def admin_reload():
+    """触发模型重载：默认后台执行并立即返回202，?wait=1时等待结果"""
+    denied = check_admin_token()
+    if denied:
+        return denied
+    if request.args.get("wait") in ("1", "true"):
+        result = model_manager.reload(reason="admin")
+        code = 200 if result["status"] == "success" else 409
+        return jsonify(result), code
+    model_manager.reload_in_background(reason="admin")
+    active = model_manager.current
+    return (
+        jsonify({"status": "accepted", "active": active.version if active else None}),
+        202,
+    )
+
+
+@bp.route("/admin/model", methods=["GET"])
+def admin_model():
+    """当前生效模型版本、最近一次重载耗时、切换历史，以及多版本缓存状态"""
+    status = dict(model_manager.status(), cache=model_cache.stats())
+    handle = model_manager.current
+    if handle is not None and isinstance(handle.scorer, LutScorer):
+        status["lut"] = handle.scorer.stats()
+    return jsonify(status), 200
+
+
+@bp.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    """Prometheus文本格式指标：各阶段耗时直方图、请求/错误计数、当前模型版本"""
+    if not metrics.enabled:
+        return (
+            jsonify({"status": "fail", "error": "未启用指标采集（METRICS_ENABLED=1）"}),
+            404,
+        )
+    handle = model_manager.current
+    body = metrics.render(
+        model_info={
+            "version": handle.version,
+            "source": handle.source,
+            "serving_mode": SERVING_MODE,
+        }
+    )
+    if admission is not None:
+        body += admission.render()
+    return Response(body + model_cache.render(), mimetype="text/plain; version=0.0.4")
+
+
+@bp.route("/admin/shadow", methods=["GET"])
+def admin_shadow():
+    """影子模型与主模型的一致率、混淆计数（主模型品种 → 候选模型品种 → 次数）和队列丢弃数"""
+    if shadow is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify(shadow.stats(model_manager.current.species_map)), 200
+
+
+@bp.route("/admin/drift", methods=["GET"])
+def admin_drift():
+    """
+    线上输入与训练数据的分布对比：累计统计和最近几个窗口快照（?snapshots=N，默认5）的
+    逐特征均值偏移、直方图PSI、预测类别分布PSI和漂移等级（stable/warn/drift）
+    """
+    if drift_monitor is None:
+        return jsonify({"enabled": False}), 200
+    snapshots = request.args.get("snapshots", 5, type=int)
+    report = drift_monitor.report(model_manager.current.species_map, snapshots)
+    return jsonify(report), 200
+
+
+@bp.route("/admin/request_log", methods=["GET"])
+def admin_request_log():
+    """请求日志的写出条数/字节数、丢弃数、轮转次数和当前文件"""
+    if request_logger is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify(request_logger.stats()), 200
+
+
+@bp.route("/admin/admission", methods=["GET"])
+def admin_admission():
+    """准入控制：执行中/排队中的请求数、按原因的拒绝数、排队等待时间直方图和平均执行耗时"""
+    if admission is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify(admission.stats()), 200
+
+
+@bp.route("/admin/batching", methods=["GET"])
+def admin_batching():
+    """微批处理的批大小、排队等待时间直方图，用于调节批大小/等待时间"""
+    if micro_batcher is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify(dict(micro_batcher.stats(), enabled=True)), 200
+
+
+# --------------------------
+# 应用工厂
+# --------------------------
+def create_app(background=True):
+    """
+    创建Flask应用并启动模型加载（进程内只加载一次）：
+    background=True时模型在后台线程中加载+校验+预热，调用方可以立即监听端口，
+    就绪前需要模型的接口返回503；background=False时同步加载，失败直接抛出
+    """
+    flask_app = Flask(__name__)
+    CORS(flask_app)  # 关键：启用跨域，允许所有源访问（测试环境安全，解决前端fetch问题）
+    flask_app.register_blueprint(bp)
+    # 预热Flask自身（路由表编译、JSON序列化），不经过需要模型的接口
+    flask_app.test_client().get("/healthz")
+
+    print(f"开始加载模型（{SERVING_MODE}模式{'，后台执行' if background else ''}）")
+    # 轮询间隔（秒），0表示不自动检测，只能通过 POST /admin/reload 触发
+    model_manager.start(
+        watch_interval=float(os.getenv("MODEL_RELOAD_INTERVAL", 0)),
+        background=background,
+    )
+    return flask_app
 
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 5000))
-    app.run(host="0.0.0.0", port=port, debug=False)
\ No newline at end of file
+    create_app().run(host="0.0.0.0", port=port, debug=False)
@@ -0,0 +1,263 @@
+# app/metrics.py（请求分阶段耗时、请求/错误计数，按Prometheus文本格式导出）
+import bisect
+import itertools
+import threading
+
+import numpy as np
+
+# 阶段耗时分桶上界（秒）：1微秒 ~ 1秒
+STAGE_BUCKETS = [
+    1e-6,
+    2.5e-6,
+    5e-6,
+    1e-5,
+    2.5e-5,
+    5e-5,
+    1e-4,
+    2.5e-4,
+    5e-4,
+    1e-3,
+    2.5e-3,
+    5e-3,
+    1e-2,
+    2.5e-2,
+    0.1,
+    1.0,
+]
+# 每个线程攒够这么多条请求记录后批量折算进直方图
+FOLD_THRESHOLD = 256
+
+
+class Histogram:
+    """固定分桶直方图（Prometheus风格的累计上界），只由单个线程写入"""
+
+    __slots__ = ("bounds", "edges", "counts", "total", "sum")
+
+    def __init__(self, bounds):
+        self.bounds = list(bounds)
+        self.edges = np.asarray(self.bounds, dtype=np.float64)
+        self.counts = [0] * (len(self.bounds) + 1)  # 最后一个桶为+Inf
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += 1
+        self.sum += value
+
+    def observe_many(self, values):
+        """一次记录一组观测值（numpy向量化分桶）"""
+        index = np.searchsorted(self.edges, values, side="left")
+        counts = np.bincount(index, minlength=len(self.counts))
+        self.counts = [a + int(b) for a, b in zip(self.counts, counts)]
+        self.total += len(values)
+        self.sum += float(values.sum())
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+        self.sum += other.sum
+
+    def snapshot(self):
+        buckets, cumulative = {}, 0
+        for bound, count in zip(self.bounds + ["+Inf"], self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            "count": self.total,
+            "sum": self.sum,
+            "mean": self.sum / self.total if self.total else None,
+            "buckets": buckets,
+        }
+
+
+class _Aggregate:
+    """已折算的指标：(接口, 阶段)→直方图，(接口, 状态码)→请求数，(接口, 错误类型)→错误数"""
+
+    __slots__ = ("stages", "requests", "errors")
+
+    def __init__(self):
+        self.stages = {}
+        self.requests = {}
+        self.errors = {}
+
+    def merge(self, other):
+        for key, hist in other.stages.items():
+            if key not in self.stages:
+                self.stages[key] = Histogram(hist.bounds)
+            self.stages[key].merge(hist)
+        for key, count in other.requests.items():
+            self.requests[key] = self.requests.get(key, 0) + count
+        for key, count in other.errors.items():
+            self.errors[key] = self.errors.get(key, 0) + count
+
+
+class Metrics:
+    """
+    请求路径上只做两件事：在各阶段结束处追加一个perf_counter时间戳（marks列表），
+    请求结束时把 (接口, 状态码, 错误类型, marks) 追加到本线程的待折算列表——不加锁、不分桶；
+    每个线程攒够FOLD_THRESHOLD条后自己用numpy批量折算进直方图。
+    线程分片以 (已折算结果, 待折算列表) 元组整体替换，抓取线程读到的总是一致的一对，不会重复或遗漏。
+    只有线程第一次写入时加锁登记分片；werkzeug的threaded模式每个连接一个新线程，
+    登记时顺便把已退出线程的分片并入共享的“已退出”分片并移除，分片数只随存活线程数变化。
+
+    用法：
+        marks = [perf_counter()] if metrics.enabled else None
+        if marks:                         # 每个阶段结束处
+            marks.append(perf_counter())
+        metrics.finish("predict", marks, 200)     # 请求结束（marks为None时直接返回）
+    相邻时间戳之差依次记为register()登记的各阶段耗时，首尾之差记为total
+    """
+
+    def __init__(self, enabled=True, buckets=STAGE_BUCKETS):
+        self.enabled = enabled
+        self.buckets = list(buckets)
+        self._stage_names = {}
+        self._local = threading.local()
+        self._shards = []  # 每个存活线程一个 (线程, [(_Aggregate, 待折算列表)])
+        # 已退出线程的记录（结构同线程分片），只在持锁时读写
+        self._retired = [(_Aggregate(), [])]
+        self._shards_lock = threading.Lock()  # 只在线程首次写入和抓取时使用
+
+    def register(self, endpoint, stages):
+        """登记接口的阶段名称（按时间戳顺序）"""
+        self._stage_names[endpoint] = list(stages)
+
+    def finish(self, endpoint, marks, status, error_type=None):
+        if marks is None:
+            return
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        pending = shard[0][1]
+        pending.append((endpoint, status, error_type, marks))
+        if len(pending) >= FOLD_THRESHOLD:
+            aggregate = _Aggregate()
+            aggregate.merge(shard[0][0])
+            self._fold(aggregate, pending)
+            shard[0] = (aggregate, [])  # 整体替换，抓取线程不会看到中间状态
+
+    def _new_shard(self):
+        shard = self._local.shard = [(_Aggregate(), [])]
+        with self._shards_lock:
+            self._retire_dead_shards()
+            self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _retire_dead_shards(self):
+        """调用方持有锁：已退出线程不会再写入，其分片并入已退出分片后移除"""
+        alive = []
+        aggregate, pending = self._retired[0]
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+                continue
+            shard_aggregate, shard_pending = shard[0]
+            if shard_aggregate.requests:
+                aggregate.merge(shard_aggregate)
+            pending.extend(shard_pending)
+        self._shards = alive
+        if len(pending) >= FOLD_THRESHOLD:
+            self._fold(aggregate, pending)
+            self._retired[0] = (aggregate, [])
+
+    def _fold(self, aggregate, records):
+        """把一批请求记录折算进aggregate：同一接口/状态/阶段数的记录一起向量化分桶"""
+        groups = {}
+        for endpoint, status, error_type, marks in records:
+            key = (endpoint, status, error_type, len(marks))
+            group = groups.get(key)
+            if group is None:
+                groups[key] = [marks]
+            else:
+                group.append(marks)
+
+        for (endpoint, status, error_type, n_marks), rows in groups.items():
+            key = (endpoint, status)
+            aggregate.requests[key] = aggregate.requests.get(key, 0) + len(rows)
+            if error_type is not None:
+                key = (endpoint, error_type)
+                aggregate.errors[key] = aggregate.errors.get(key, 0) + len(rows)
+
+            matrix = np.fromiter(
+                itertools.chain.from_iterable(rows),
+                dtype=np.float64,
+                count=len(rows) * n_marks,
+            ).reshape(len(rows), n_marks)
+            names = self._stage_names.get(endpoint, [])[: n_marks - 1]
+            durations = np.diff(matrix, axis=1)
+            columns = [(name, durations[:, i]) for i, name in enumerate(names)]
+            columns.append(("total", matrix[:, -1] - matrix[:, 0]))
+            for stage, values in columns:
+                hist = aggregate.stages.get((endpoint, stage))
+                if hist is None:
+                    hist = aggregate.stages[(endpoint, stage)] = Histogram(self.buckets)
+                hist.observe_many(values)
+
+    def collect(self):
+        """合并所有线程分片（含尚未折算的记录），不修改各线程的数据"""
+        total = _Aggregate()
+        with self._shards_lock:
+            self._retire_dead_shards()
+            shards = [shard for _, shard in self._shards]
+            aggregate, pending = self._retired[0]
+            total.merge(aggregate)
+            self._fold(total, pending)
+        for shard in shards:
+            aggregate, pending = shard[0]
+            total.merge(aggregate)
+            self._fold(total, list(pending))
+        return total
+
+    def render(self, model_info=None):
+        """输出Prometheus文本格式（text/plain; version=0.0.4）"""
+        total = self.collect()
+        lines = [
+            "# HELP iris_stage_duration_seconds 请求各处理阶段耗时",
+            "# TYPE iris_stage_duration_seconds histogram",
+        ]
+        for (endpoint, stage), hist in sorted(total.stages.items()):
+            labels = f'endpoint="{endpoint}",stage="{stage}"'
+            cumulative = 0
+            for bound, count in zip(hist.bounds + ["+Inf"], hist.counts):
+                cumulative += count
+                lines.append(
+                    f'iris_stage_duration_seconds_bucket{{{labels},le="{bound}"}} '
+                    f"{cumulative}"
+                )
+            lines.append(f"iris_stage_duration_seconds_sum{{{labels}}} {hist.sum!r}")
+            lines.append(f"iris_stage_duration_seconds_count{{{labels}}} {hist.total}")
+
+        lines += [
+            "# HELP iris_requests_total 按接口和状态码统计的请求数",
+            "# TYPE iris_requests_total counter",
+        ]
+        for (endpoint, status), count in sorted(total.requests.items()):
+            lines.append(
+                f'iris_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}'
+            )
+
+        lines += [
+            "# HELP iris_errors_total 按接口和错误类型统计的错误数",
+            "# TYPE iris_errors_total counter",
+        ]
+        for (endpoint, error_type), count in sorted(total.errors.items()):
+            lines.append(
+                f'iris_errors_total{{endpoint="{endpoint}",type="{error_type}"}} '
+                f"{count}"
+            )
+
+        if model_info:
+            lines += [
+                "# HELP iris_model_info 当前生效的模型版本",
+                "# TYPE iris_model_info gauge",
+                "iris_model_info{"
+                + ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(model_info.items()))
+                + "} 1",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,157 @@
+# app/model_cache.py（多版本模型缓存：按请求选择模型版本，LRU淘汰 + 单飞加载）
+import collections
+import os
+import threading
+import time
+
+
+class ModelNotFoundError(LookupError):
+    """请求的模型版本/阶段在注册表中不存在（或当前模式下无法加载）"""
+
+
+class _Loading:
+    """正在加载的条目：同一个键并发未命中的请求都等在event上，共享这一次加载的结果"""
+
+    __slots__ = ("event", "handle", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.handle = None
+        self.error = None
+
+
+def handle_nbytes(handle):
+    """估算句柄占用的内存：打分器中各NumPy数组的字节数"""
+    return sum(getattr(value, "nbytes", 0) for value in vars(handle.scorer).values())
+
+
+class ModelCache:
+    """
+    按键（模型名, 版本）缓存已加载的ModelHandle：
+    - 条目数超过max_entries、或估算内存超过max_bytes时，淘汰最久未使用的条目（刚加载的不淘汰）
+    - 单飞加载：同一个键并发未命中时只有第一个请求调用loader，其余请求等待并共享结果
+    - 加载失败不缓存（下次请求重新加载），等待同一次加载的请求收到同一个异常
+    - 被淘汰的句柄仍被进行中的请求引用时照常可用，请求结束后随引用释放
+    """
+
+    def __init__(self, loader, max_entries=4, max_bytes=None, sizeof=handle_nbytes):
+        # loader(key) 返回ModelHandle
+        self._loader = loader
+        self._sizeof = sizeof
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max_bytes or None
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # 键 → (句柄, 字节数)，末尾为最近使用
+        self._loading = {}
+        self._bytes = 0
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "load_errors": 0,
+        }
+        self._load_seconds = 0.0
+        # fork出的子进程（app/serve.py）不继承线程，锁和加载中状态需要重建
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._loading = {}
+
+    def get(self, key):
+        """返回键对应的句柄：命中直接返回，未命中时加载（并发请求只加载一次）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return entry[0]
+            loading = self._loading.get(key)
+            leader = loading is None
+            if leader:
+                loading = self._loading[key] = _Loading()
+                self._counters["misses"] += 1
+            else:
+                self._counters["coalesced"] += 1
+
+        if not leader:
+            loading.event.wait()
+            if loading.error is not None:
+                raise loading.error
+            return loading.handle
+
+        start = time.perf_counter()
+        try:
+            handle = self._loader(key)
+            size = self._sizeof(handle)
+        except Exception as e:
+            with self._lock:
+                del self._loading[key]
+                self._counters["load_errors"] += 1
+            loading.error = e
+            loading.event.set()
+            raise
+        with self._lock:
+            del self._loading[key]
+            self._load_seconds += time.perf_counter() - start
+            self._entries[key] = (handle, size)
+            self._bytes += size
+            self._evict()
+        loading.handle = handle
+        loading.event.set()
+        return handle
+
+    def _evict(self):
+        """调用方持有锁；至少保留最近加载的一个条目"""
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            key, (_, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self._counters["evictions"] += 1
+            print(f"模型缓存已淘汰：{key}")
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            keys = list(self._entries)
+            cached_bytes = self._bytes
+            load_seconds = self._load_seconds
+        lookups = counters["hits"] + counters["misses"] + counters["coalesced"]
+        return dict(
+            counters,
+            entries=len(keys),
+            keys=[
+                ":v".join(map(str, key)) if isinstance(key, tuple) else str(key)
+                for key in keys
+            ],
+            bytes=cached_bytes,
+            max_entries=self.max_entries,
+            max_bytes=self.max_bytes,
+            hit_ratio=counters["hits"] / lookups if lookups else None,
+            load_seconds_total=load_seconds,
+        )
+
+    def render(self):
+        """Prometheus文本格式的缓存计数（追加在/metrics输出之后）"""
+        stats = self.stats()
+        lines = [
+            "# HELP iris_model_cache_events_total 多版本模型缓存的命中/未命中/合并等待/淘汰/加载失败次数",
+            "# TYPE iris_model_cache_events_total counter",
+        ]
+        for event in ("hits", "misses", "coalesced", "evictions", "load_errors"):
+            lines.append(
+                f'iris_model_cache_events_total{{event="{event}"}} {stats[event]}'
+            )
+        lines += [
+            "# HELP iris_model_cache_entries 缓存中的模型版本数",
+            "# TYPE iris_model_cache_entries gauge",
+            f"iris_model_cache_entries {stats['entries']}",
+            "# HELP iris_model_cache_bytes 缓存中模型的估算内存（字节）",
+            "# TYPE iris_model_cache_bytes gauge",
+            f"iris_model_cache_bytes {stats['bytes']}",
+        ]
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,258 @@
+# app/model_manager.py（模型热更新：后台加载+预热+金丝雀校验+原子切换）
+import collections
+import os
+import threading
+import time
+
+# 金丝雀样本：README中的典型特征及预期品种，新模型必须全部预测正确才会上线
+CANARY_SAMPLES = [
+    ([5.1, 3.5, 1.4, 0.2], "setosa"),
+    ([6.0, 2.8, 4.5, 1.5], "versicolor"),
+    ([6.5, 3.0, 5.5, 2.0], "virginica"),
+]
+
+
+class ModelHandle:
+    """一次加载得到的只读模型句柄；请求开始时取一次引用，整个请求都用它"""
+
+    __slots__ = ("scorer", "species_map", "version", "source", "loaded_at")
+
+    def __init__(self, scorer, species_map, version, source):
+        self.scorer = scorer
+        self.species_map = species_map
+        self.version = version
+        self.source = source
+        self.loaded_at = time.time()
+
+    def describe(self):
+        return {
+            "version": self.version,
+            "source": self.source,
+            "loaded_at": time.strftime(
+                "%Y-%m-%dT%H:%M:%S", time.localtime(self.loaded_at)
+            ),
+        }
+
+
+def check_canary(handle, samples=CANARY_SAMPLES):
+    """预热新模型并校验金丝雀样本，返回不通过的样本列表（空列表表示通过）"""
+    failures = []
+    labels = handle.scorer.predict([features for features, _ in samples])
+    for (features, expected), label in zip(samples, labels):
+        actual = handle.species_map.get(int(label))
+        if actual != expected:
+            failures.append(
+                {"features": features, "expected": expected, "actual": actual}
+            )
+    return failures
+
+
+class ModelManager:
+    """
+    持有当前生效的ModelHandle：
+    - 加载/预热/校验都在后台完成，通过后一次引用赋值完成切换（GIL保证原子性）
+    - 切换前已取得旧句柄的请求继续用旧模型跑完，不会中断
+    - 启动加载状态 state：starting → loading → ready / failed，ready事件在首个模型上线时置位
+    """
+
+    def __init__(self, loader, fingerprint=None, history_size=20, warm_up=None):
+        # loader() 返回新的ModelHandle；fingerprint() 返回注册表状态指纹，变化即触发重载；
+        # warm_up(handle) 在模型上线前预热（启动和热更新都会执行）
+        self._loader = loader
+        self._fingerprint = fingerprint or (lambda: None)
+        self._warm_up = warm_up or (lambda handle: None)
+        self._reload_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self.state = "starting"
+        self.ready = threading.Event()
+        self.load_seconds = None
+        self.load_error = None
+        self.started_at = time.time()
+        self._history = collections.deque(maxlen=history_size)
+        self._last_fingerprint = None
+        self._watcher = None
+        self._watch_interval = 0
+        self.current = None
+        # fork出的子进程（app/serve.py）不继承线程和锁状态，需要重建
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._reload_lock = threading.Lock()
+        if self._watcher is not None:
+            self._watcher = None
+            self.start_watcher(self._watch_interval)
+
+    def load_initial(self):
+        """启动时同步加载第一个模型：加载→金丝雀校验→预热→上线（失败直接抛出）"""
+        self.state = "loading"
+        start = time.perf_counter()
+        try:
+            self._last_fingerprint = self._fingerprint()
+            handle = self._loader()
+            failures = check_canary(handle)
+            if failures:
+                raise RuntimeError(f"模型未通过金丝雀校验：{failures}")
+            self._warm_up(handle)
+        except Exception as e:
+            self.load_seconds = time.perf_counter() - start
+            self.load_error = str(e)
+            self.state = "failed"
+            self._record("startup", None, self.load_seconds, False, error=str(e))
+            print(f"❌ 模型加载失败：{e}")
+            raise
+        self.load_seconds = time.perf_counter() - start
+        self.current = handle
+        self.state = "ready"
+        self.ready.set()
+        self._record("startup", handle, self.load_seconds, True)
+        print(
+            f"✅ 模型加载成功（版本：{handle.version}，耗时{self.load_seconds:.2f}s）"
+        )
+        return handle
+
+    def start(self, watch_interval=0, background=True):
+        """
+        启动时加载第一个模型，成功后按watch_interval开始监视注册表（多次调用只执行一次）：
+        background=True时在后台线程执行并立即返回，进度见state/ready；否则同步执行，失败抛出
+        """
+        with self._state_lock:
+            if self.state != "starting":
+                return None
+            self.state = "loading"
+            self._watch_interval = watch_interval
+
+        def run():
+            self.load_initial()
+            self.start_watcher(watch_interval)
+
+        if not background:
+            run()
+            return None
+
+        def run_in_background():
+            try:
+                run()
+            except Exception:
+                pass  # 失败原因已记录在load_error和history中
+
+        thread = threading.Thread(
+            target=run_in_background, name="model-startup", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def wait_ready(self, timeout=None):
+        """等待首个模型上线；加载失败或超时返回False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.ready.wait(0.05):
+            if self.state == "failed":
+                return False
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+        return True
+
+    def reload(self, reason="manual"):
+        """
+        加载新模型→金丝雀校验→原子切换；同一时间只允许一个重载任务。
+        首次加载失败（state为failed）后也可以重载，成功即转为ready并开始监视注册表
+        """
+        if self.current is None and self.state != "failed":
+            return {"status": "busy", "error": "首次加载尚未完成"}
+        if not self._reload_lock.acquire(blocking=False):
+            return {"status": "busy", "error": "已有重载任务在执行"}
+        try:
+            active = self.current.version if self.current else "无（模型未就绪）"
+            start = time.perf_counter()
+            fingerprint = self._fingerprint()
+            try:
+                handle = self._loader()
+                failures = check_canary(handle)
+                if not failures:
+                    self._warm_up(handle)
+            except Exception as e:
+                latency = time.perf_counter() - start
+                self._record(reason, None, latency, False, error=str(e))
+                print(f"❌ 模型重载失败：{e}，当前模型：{active}")
+                return {"status": "fail", "error": str(e)}
+            latency = time.perf_counter() - start
+            if failures:
+                error = f"金丝雀校验未通过：{failures}"
+                self._record(reason, handle, latency, False, error=error)
+                print(f"❌ 新模型{handle.version}{error}，当前模型：{active}")
+                return {"status": "fail", "error": error}
+
+            previous = self.current
+            self.current = handle  # 原子切换
+            self._last_fingerprint = fingerprint
+            self._record(reason, handle, latency, True, previous=previous)
+            print(f"✅ 模型已切换：{active} → {handle.version}（{latency:.3f}s）")
+            if previous is None:
+                # 从首次加载失败中恢复
+                self.load_error = None
+                self.state = "ready"
+                self.ready.set()
+                self.start_watcher(self._watch_interval)
+            return {"status": "success", "version": handle.version, "latency": latency}
+        finally:
+            self._reload_lock.release()
+
+    def reload_in_background(self, reason="manual"):
+        """后台线程执行重载，立即返回"""
+        thread = threading.Thread(
+            target=self.reload, args=(reason,), name="model-reload", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def start_watcher(self, interval):
+        """按interval秒轮询注册表指纹，发现变化就在后台重载"""
+        if interval <= 0 or self._watcher is not None:
+            return
+        self._watch_interval = interval
+
+        def watch():
+            while True:
+                time.sleep(interval)
+                try:
+                    fingerprint = self._fingerprint()
+                except Exception as e:
+                    print(f"检查注册表变化失败：{e}")
+                    continue
+                if fingerprint != self._last_fingerprint:
+                    print("检测到注册表变化，开始重载模型")
+                    self.reload(reason="registry_changed")
+                    # 重载失败也记下指纹，避免对同一坏版本反复重试
+                    self._last_fingerprint = fingerprint
+
+        self._watcher = threading.Thread(
+            target=watch, name="model-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def _record(self, reason, handle, latency, success, previous=None, error=None):
+        self._history.append(
+            {
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "reason": reason,
+                "success": success,
+                "version": handle.version if handle else None,
+                "previous_version": previous.version if previous else None,
+                "latency_seconds": round(latency, 6),
+                "error": error,
+            }
+        )
+
+    def status(self):
+        history = list(self._history)
+        return {
+            "state": self.state,
+            "load_seconds": self.load_seconds,
+            "load_error": self.load_error,
+            "active": self.current.describe() if self.current else None,
+            "reloading": self._reload_lock.locked(),
+            "last_reload_latency_seconds": (
+                history[-1]["latency_seconds"] if history else None
+            ),
+            "history": history,
+        }
@@ -0,0 +1,198 @@
+# app/request_log.py（请求/预测日志：请求线程只入队，单个写线程批量压缩写出并按大小/时间轮转）
+import atexit
+import collections
+import gzip
+import json
+import os
+import threading
+import time
+
+
+def _json_default(value):
+    """NumPy标量等非JSON原生类型：转成Python值"""
+    if hasattr(value, "item"):
+        return value.item()
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+
+class RequestLogger:
+    """
+    请求线程只在锁内检查额度并做一次deque.append（不做I/O），记录为
+    (时间戳, 接口, 请求体, 状态码, 模型版本, 预测标签) 元组，序列化也交给写线程；
+    写线程每flush_interval秒把队列中的记录拼成JSONL，整批gzip压缩后一次追加写入
+    （每批是一个gzip member，整个文件可直接用gzip.open/zcat读取）。
+    文件超过max_bytes或打开超过max_age秒后轮转到新文件。
+    队列按条数（queue_size）和记录数（max_queued_records，批量请求按请求体的行数计）
+    双重限制，超出时整条丢弃并计数（截断会让回放的请求体失真）；
+    写文件失败的记录另计入failed_records，不与入队时的丢弃混在一起。
+    写出的每行 {"endpoint", "body", ...} 可直接作为 benchmarks/load_test.py --replay 的输入。
+    """
+
+    def __init__(
+        self,
+        directory,
+        max_bytes=64 * 1024 * 1024,
+        max_age=3600,
+        queue_size=100000,
+        max_queued_records=1000000,
+        flush_interval=1.0,
+        compresslevel=6,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.queue_size = max(1, int(queue_size))
+        self.max_queued_records = max(1, int(max_queued_records))
+        self.flush_interval = flush_interval
+        self.compresslevel = compresslevel
+        self._counters = {
+            "written_records": 0,
+            "written_bytes": 0,
+            "dropped": 0,
+            "dropped_records": 0,
+            "rotations": 0,
+            "write_errors": 0,
+            "failed_records": 0,
+        }
+        self._last_error = None
+        self._start_writer()
+        atexit.register(self.close)
+        # fork出的子进程（app/serve.py）不会继承线程，各进程写各自的文件
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _start_writer(self):
+        self._lock = (
+            threading.Lock()
+        )  # 入队（额度检查与append）、登记/取出记录数和更新计数时使用
+        # 不设maxlen：条数上限在锁内检查，deque自身不会静默挤掉已入队的记录
+        self._queue = collections.deque()
+        self._queued_records = 0
+        self._stop = threading.Event()
+        self._file = None
+        self._file_path = None
+        self._file_bytes = 0
+        self._file_opened = 0.0
+        self._sequence = 0
+        self._writer = threading.Thread(
+            target=self._run, name="request-logger", daemon=True
+        )
+        self._writer.start()
+
+    def _after_fork(self):
+        self._close_file()  # 每批写入后都已flush，子进程直接关闭继承的句柄
+        self._start_writer()
+
+    def log(self, endpoint, body, status, version=None, labels=None):
+        """记录一次请求（请求体和标签保持原对象，序列化在写线程中进行），返回是否入队"""
+        n_records = len(body) if isinstance(body, list) else 1
+        with self._lock:
+            if (
+                len(self._queue) >= self.queue_size
+                or self._queued_records + n_records > self.max_queued_records
+            ):
+                self._counters["dropped"] += 1
+                self._counters["dropped_records"] += n_records
+                return False
+            self._queued_records += n_records
+            self._queue.append((time.time(), endpoint, body, status, version, labels))
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        """把队列中的记录序列化、压缩并写出（只由写线程或close调用）"""
+        lines, taken = [], 0
+        try:
+            while True:
+                ts, endpoint, body, status, version, labels = self._queue.popleft()
+                taken += len(body) if isinstance(body, list) else 1
+                record = {
+                    "ts": round(ts, 6),
+                    "endpoint": endpoint,
+                    "status": status,
+                    "model_version": version,
+                    "body": body,
+                    "predicted": labels,
+                }
+                lines.append(json.dumps(record, default=_json_default))
+        except IndexError:
+            pass
+        if taken:
+            with self._lock:
+                self._queued_records -= taken
+        # 达到大小/时间上限时关闭当前文件，下次有记录时再打开新文件（不产生空文件）
+        if self._file is not None and (
+            self._file_bytes >= self.max_bytes
+            or time.time() - self._file_opened >= self.max_age
+        ):
+            self._close_file()
+        if not lines:
+            return
+        payload = gzip.compress(
+            ("\n".join(lines) + "\n").encode("utf-8"), self.compresslevel
+        )
+        try:
+            if self._file is None:
+                self._open_file()
+            self._file.write(payload)
+            self._file.flush()
+            self._file_bytes += len(payload)
+            with self._lock:
+                self._counters["written_records"] += len(lines)
+                self._counters["written_bytes"] += len(payload)
+        except OSError as e:
+            with self._lock:
+                self._counters["write_errors"] += 1
+                self._counters["failed_records"] += len(lines)
+                self._last_error = str(e)
+            print(f"写请求日志失败：{e}")
+
+    def _open_file(self):
+        """打开新文件（文件名含时间、进程号和序号，多进程/同一秒内不冲突）"""
+        os.makedirs(self.directory, exist_ok=True)
+        if self._sequence:
+            with self._lock:
+                self._counters["rotations"] += 1
+        self._sequence += 1
+        name = (
+            f"requests-{time.strftime('%Y%m%d-%H%M%S')}"
+            f"-{os.getpid()}-{self._sequence}.jsonl.gz"
+        )
+        self._file_path = os.path.join(self.directory, name)
+        self._file = open(self._file_path, "ab")
+        self._file_bytes = 0
+        self._file_opened = time.time()
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        """停止写线程并写出剩余记录（进程退出时自动调用）"""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._writer.join(timeout=10)
+        self._close_file()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            last_error = self._last_error
+        return dict(
+            counters,
+            enabled=True,
+            queue_depth=len(self._queue),
+            queue_size=self.queue_size,
+            queued_records=self._queued_records,
+            max_queued_records=self.max_queued_records,
+            current_file=self._file_path,
+            last_error=last_error,
+        )
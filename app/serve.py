@@ -0,0 +1,208 @@
+# app/serve.py（生产启动器：预派生多进程 + 共享内存模型权重 + 进程守护）
+# 用法：python app/serve.py    （WORKERS未设置时按容器CPU配额自动确定进程数）
+import math
+import os
+import signal
+import socket
+import sys
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# 项目根目录加入模块搜索路径（兼容 python app/serve.py 直接启动）
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from ml.lut import LutScorer
+from ml.scoring import LinearScorer
+
+# 子进程启动后很快退出时，延迟重启，避免崩溃循环占满CPU
+RESTART_BACKOFF_SECONDS = 1.0
+MIN_UPTIME_SECONDS = 5.0
+
+
+# --------------------------
+# 进程数：按容器CPU配额自动确定
+# --------------------------
+def detect_cpu_count():
+    """依次读取cgroup v2/v1的CPU配额与CPU亲和性，取最小值（至少为1）"""
+    limits = []
+    try:
+        with open("/sys/fs/cgroup/cpu.max", "r") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            limits.append(math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        try:
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us", "r") as f:
+                quota = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us", "r") as f:
+                period = int(f.read())
+            if quota > 0 and period > 0:
+                limits.append(math.ceil(quota / period))
+        except (OSError, ValueError):
+            pass
+    if hasattr(os, "sched_getaffinity"):
+        limits.append(len(os.sched_getaffinity(0)))
+    else:
+        limits.append(os.cpu_count() or 1)
+    return max(1, min(limits))
+
+
+# --------------------------
+# 共享内存中的模型权重
+# --------------------------
+def share_scorer(scorer):
+    """
+    把打分器的coef/intercept/classes拷贝进一块共享内存，
+    返回 (共享内存块, 基于共享内存只读视图的新打分器)；
+    fork出的worker直接映射同一块物理内存，模型内存不随进程数增长
+    """
+    if isinstance(scorer, LutScorer):
+        # 查表层的打包数组只读，fork后各worker共享父进程的页面
+        shm, shared = share_scorer(scorer.scorer)
+        return shm, LutScorer(shared, scorer.table)
+    arrays = [
+        scorer.coef,
+        scorer.intercept,
+        np.ascontiguousarray(scorer.classes, dtype=np.int64),
+    ]
+    shm = shared_memory.SharedMemory(create=True, size=sum(a.nbytes for a in arrays))
+    views, offset = [], 0
+    for array in arrays:
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf, offset=offset)
+        view[...] = array
+        view.flags.writeable = False
+        views.append(view)
+        offset += array.nbytes
+    return shm, LinearScorer(views[0], views[1], views[2], ovr=scorer.ovr)
+
+
+# --------------------------
+# worker与守护进程
+# --------------------------
+def create_listen_socket(host, port, backlog=1024):
+    """父进程创建监听套接字，所有worker共享同一个fd接受连接"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def stop_worker(code, on_exit=None):
+    """
+    子进程退出：先调用on_exit写出后台队列中的数据（请求日志等），再直接_exit
+    （_exit不执行atexit，也不执行从父进程继承的清理，如释放共享内存）
+    """
+    if on_exit is not None:
+        try:
+            on_exit()
+        except Exception as e:
+            print(f"⚠️ worker {os.getpid()} 退出前清理失败：{e}")
+    os._exit(code)
+
+
+def run_worker(flask_app, sock, on_exit=None):
+    """子进程：在共享的监听套接字上运行多线程WSGI服务"""
+    from werkzeug.serving import make_server
+
+    signal.signal(signal.SIGTERM, lambda *_: stop_worker(0, on_exit))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    host, port = sock.getsockname()[:2]
+    server = make_server(host, port, flask_app, threaded=True, fd=sock.fileno())
+    server.serve_forever()
+
+
+def spawn_worker(flask_app, sock, on_exit=None):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            run_worker(flask_app, sock, on_exit)
+        finally:
+            stop_worker(1, on_exit)
+    return pid
+
+
+def supervise(flask_app, sock, workers, on_exit=None):
+    """
+    预派生workers个子进程；子进程退出即重启，收到SIGTERM/SIGINT时全部停止；
+    on_exit在每个子进程退出前调用
+    """
+    children = {}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for _ in range(workers):
+        children[spawn_worker(flask_app, sock, on_exit)] = time.monotonic()
+    print(f"✅ 已启动{workers}个worker：{sorted(children)}")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started = children.pop(pid, None)
+        if stopping or started is None:
+            continue
+        code = os.waitstatus_to_exitcode(status)
+        print(f"⚠️ worker {pid} 退出（退出码{code}），正在重启")
+        if time.monotonic() - started < MIN_UPTIME_SECONDS:
+            time.sleep(RESTART_BACKOFF_SECONDS)
+        children[spawn_worker(flask_app, sock, on_exit)] = time.monotonic()
+    print("所有worker已停止")
+
+
+def main():
+    host = os.getenv("HOST", "0.0.0.0")
+    port = int(os.getenv("PORT", 5000))
+    workers = int(os.getenv("WORKERS", 0)) or detect_cpu_count()
+
+    # 父进程只加载一次模型：同步加载+金丝雀校验+预热完成后再fork，
+    # 模型权重要在fork前放入共享内存，因此这里不用后台加载
+    from app.main import close_background, create_app, model_manager
+    from app.model_manager import ModelHandle
+
+    flask_app = create_app(background=False)
+
+    if not hasattr(os, "fork"):
+        print("当前平台不支持fork，退回单进程模式")
+        flask_app.run(host=host, port=port, debug=False, threaded=True)
+        return
+
+    # 模型权重放入共享内存，worker继承映射（只读）
+    handle = model_manager.current
+    shm, shared_scorer = share_scorer(handle.scorer)
+    model_manager.current = ModelHandle(
+        shared_scorer, handle.species_map, handle.version, handle.source
+    )
+    print(f"模型权重已放入共享内存：{shm.name}（{shm.size}字节）")
+
+    sock = create_listen_socket(host, port)
+    print(f"监听 http://{host}:{port}，worker数：{workers}")
+    try:
+        supervise(flask_app, sock, workers, on_exit=close_background)
+    finally:
+        sock.close()
+        shm.close()
+        shm.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# app/shadow.py（影子模型评估：主请求之外，用候选模型对同样的输入打分并统计一致率）
+import collections
+import os
+import random
+import threading
+import time
+
+import numpy as np
+
+
+class _Comparison:
+    """某个 (主模型版本, 候选模型版本) 组合的累计结果"""
+
+    __slots__ = ("total", "agree", "confusion")
+
+    def __init__(self):
+        self.total = 0
+        self.agree = 0
+        self.confusion = {}  # (主模型标签, 候选模型标签) → 次数
+
+
+class ShadowEvaluator:
+    """
+    主请求把 (特征行, 主模型标签, 主模型版本) 放进有界队列后立即返回（不唤醒线程，
+    只在登记排队行数时短暂持锁）；队列按条数（queue_size）和行数（max_queued_rows）双重限制：
+    批量请求超出剩余行数额度时只保留前面能放下的行，额度用完时丢弃并计数，主请求不受影响。
+    后台worker线程轮询队列，一次取出最多max_batch_rows行拼成矩阵，
+    对每个候选模型只做一次矩阵打分，再把一致数和混淆计数累加进内存中的计数器。
+    """
+
+    def __init__(
+        self,
+        get_candidates,
+        workers=1,
+        queue_size=10000,
+        max_queued_rows=100000,
+        sample_rate=1.0,
+        max_batch_rows=1024,
+        poll_interval=0.05,
+    ):
+        # get_candidates() 返回候选模型的ModelHandle列表（每批取一次，兼容缓存淘汰后重新加载）
+        self._get_candidates = get_candidates
+        self.workers = max(1, int(workers))
+        self.queue_size = max(1, int(queue_size))
+        self.max_queued_rows = max(1, int(max_queued_rows))
+        self.sample_rate = float(sample_rate)
+        self.max_batch_rows = max(1, int(max_batch_rows))
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()  # 只在登记排队行数、丢弃和累加结果时使用
+        self._comparisons = {}
+        self._dropped = 0
+        self._dropped_rows = 0
+        self._processed = 0
+        self._errors = 0
+        self._last_error = None
+        self._start_workers()
+        # fork出的子进程（app/serve.py）不会继承线程，需要重新启动worker
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._start_workers)
+
+    def _start_workers(self):
+        self._lock = threading.Lock()
+        self._queued_rows = 0
+        # maxlen只是兜底：submit先检查长度，满了丢弃的是新任务
+        self._queue = collections.deque(maxlen=self.queue_size)
+        self._threads = [
+            threading.Thread(target=self._run, name=f"shadow-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, rows, labels, version):
+        """提交一批已由主模型打分的特征行（单条请求rows只有一行），返回是否入队"""
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return False
+        n_rows = len(rows)
+        with self._lock:
+            room = self.max_queued_rows - self._queued_rows
+            if len(self._queue) >= self.queue_size or room <= 0:
+                self._dropped += 1
+                self._dropped_rows += n_rows
+                return False
+            if n_rows > room:
+                # 超出行数额度的批量请求只保留前room行（拷贝出来，不让切片持有整批数据）
+                self._dropped_rows += n_rows - room
+                rows, labels = np.array(rows[:room]), np.array(labels[:room])
+                n_rows = room
+            self._queued_rows += n_rows
+        self._queue.append((rows, labels, version))
+        return True
+
+    def _take(self):
+        """从队列取出约max_batch_rows行（队列为空时返回空字典），按主模型版本分组"""
+        groups, n_rows = {}, 0
+        while n_rows < self.max_batch_rows:
+            try:
+                rows, labels, version = self._queue.popleft()
+            except IndexError:
+                break
+            group = groups.setdefault(version, ([], []))
+            # 按块保存（二进制批量请求提交的是整块数组，不逐行展开）
+            group[0].append(np.asarray(rows, dtype=np.float64))
+            group[1].append(np.asarray(labels))
+            n_rows += len(rows)
+        if n_rows:
+            with self._lock:
+                self._queued_rows -= n_rows
+        return groups
+
+    def _run(self):
+        while True:
+            groups = self._take()
+            if not groups:
+                time.sleep(self.poll_interval)
+                continue
+            try:
+                candidates = self._get_candidates()
+                for version, (rows, labels) in groups.items():
+                    X = np.concatenate(rows)
+                    primary = np.concatenate(labels)
+                    for candidate in candidates:
+                        shadow = candidate.scorer.predict(X)
+                        self._record(version, candidate.version, primary, shadow)
+                    with self._lock:
+                        self._processed += len(primary)
+            except Exception as e:
+                with self._lock:
+                    self._errors += 1
+                    self._last_error = f"{type(e).__name__}: {e}"
+
+    def _record(self, version, candidate_version, primary, shadow):
+        pairs, counts = np.unique(
+            np.column_stack([primary, shadow]), axis=0, return_counts=True
+        )
+        agree = int(np.count_nonzero(primary == shadow))
+        key = (version, candidate_version)
+        with self._lock:
+            comparison = self._comparisons.get(key)
+            if comparison is None:
+                comparison = self._comparisons[key] = _Comparison()
+            comparison.total += len(primary)
+            comparison.agree += agree
+            for (p, s), n in zip(pairs.tolist(), counts.tolist()):
+                comparison.confusion[(p, s)] = comparison.confusion.get((p, s), 0) + n
+
+    def stats(self, species_map=None):
+        """
+        各组合的一致率和混淆计数（confusion[主模型品种][候选模型品种]），以及队列/丢弃情况；
+        species_map用于把标签换成品种名
+        """
+        names = species_map or {}
+        with self._lock:
+            comparisons = [
+                {
+                    "primary_version": version,
+                    "candidate_version": candidate,
+                    "total": c.total,
+                    "agree": c.agree,
+                    "agreement_rate": c.agree / c.total if c.total else None,
+                    "confusion": _nested(c.confusion, names),
+                }
+                for (version, candidate), c in sorted(self._comparisons.items())
+            ]
+            counters = {
+                "processed_rows": self._processed,
+                "dropped": self._dropped,
+                "dropped_rows": self._dropped_rows,
+                "queued_rows": self._queued_rows,
+                "errors": self._errors,
+                "last_error": self._last_error,
+            }
+        return dict(
+            counters,
+            enabled=True,
+            workers=self.workers,
+            sample_rate=self.sample_rate,
+            queue_depth=len(self._queue),
+            queue_size=self.queue_size,
+            max_queued_rows=self.max_queued_rows,
+            comparisons=comparisons,
+        )
+
+
+def _nested(confusion, names):
+    nested = {}
+    for (p, s), n in sorted(confusion.items()):
+        row = nested.setdefault(str(names.get(p, p)), {})
+        row[str(names.get(s, s))] = n
+    return nested
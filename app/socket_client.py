@@ -0,0 +1,270 @@
+# app/socket_client.py（二进制套接字预测协议 + Python客户端：连接池、流水线、透明合批）
+#
+# 协议：长连接上收发帧，每帧 = 9字节帧头 <IIB（负载长度、请求ID、操作码/状态码）+ 负载
+#   请求  OP_PREDICT：负载为app/binary_format.py格式的特征矩阵（float32/float64，4列）
+#         OP_PING：   负载为空
+#   响应  STATUS_OK：  预测为二进制标签数组（同一格式，int8/int32），PING为模型版本（UTF-8）
+#         STATUS_ERROR：负载为错误信息（UTF-8）
+# 同一连接上可以连续发送多个请求不等响应（流水线），服务端按请求顺序返回，请求ID原样带回；
+# 流水线需边发边读：在途请求不加限制时，双方套接字缓冲区写满后会互相等待对方读取而卡死
+# 地址格式："unix:/路径" 或 "主机:端口"
+import collections
+import queue
+import socket
+import struct
+import threading
+
+import numpy as np
+
+from app.binary_format import decode_labels, encode
+
+FRAME = struct.Struct("<IIB")
+FRAME_SIZE = FRAME.size
+OP_PREDICT = 1
+OP_PING = 2
+STATUS_OK = 0
+STATUS_ERROR = 1
+MAX_FRAME_PAYLOAD = 64 * 1024 * 1024
+# 流水线的在途窗口：未读回响应的请求数及其负载合计字节数上限
+PIPELINE_WINDOW = 64
+PIPELINE_WINDOW_BYTES = 1024 * 1024
+
+
+class ServerError(RuntimeError):
+    """服务端返回STATUS_ERROR（请求格式错误、模型未就绪等）"""
+
+
+def parse_address(address):
+    """ "unix:/路径" → (AF_UNIX, 路径)；"主机:端口" → (AF_INET, (主机, 端口))"""
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:") :]
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"地址格式需为 unix:/路径 或 主机:端口，实际为：{address}")
+    return socket.AF_INET, (host, int(port))
+
+
+def recv_exact(sock, n):
+    """读满n字节（对端关闭时抛ConnectionError）"""
+    buffer = bytearray(n)
+    view = memoryview(buffer)
+    received = 0
+    while received < n:
+        count = sock.recv_into(view[received:])
+        if not count:
+            raise ConnectionError("连接已被对端关闭")
+        received += count
+    return buffer
+
+
+class Connection:
+    """单条长连接：同步请求，或一次发出多个请求再按顺序读回（流水线）"""
+
+    def __init__(self, address, timeout=5.0):
+        family, target = parse_address(address)
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(target)
+        if family == socket.AF_INET:
+            # 小帧立即发出，不等Nagle合并
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._next_id = 0
+
+    def send(self, op, payload=b""):
+        """发出一个请求，返回请求ID（不等响应）"""
+        self._next_id = (self._next_id + 1) & 0xFFFFFFFF
+        self.sock.sendall(FRAME.pack(len(payload), self._next_id, op) + payload)
+        return self._next_id
+
+    def receive(self, request_id):
+        """读回下一个响应帧，返回负载；状态为错误时抛ServerError"""
+        length, response_id, status = FRAME.unpack(recv_exact(self.sock, FRAME_SIZE))
+        payload = recv_exact(self.sock, length) if length else b""
+        if response_id != request_id:
+            raise ConnectionError(
+                f"响应顺序错乱：预期请求{request_id}，收到{response_id}"
+            )
+        if status != STATUS_OK:
+            raise ServerError(bytes(payload).decode("utf-8", "replace"))
+        return payload
+
+    def request(self, op, payload=b""):
+        return self.receive(self.send(op, payload))
+
+    def pipeline(
+        self,
+        payloads,
+        op=OP_PREDICT,
+        window=PIPELINE_WINDOW,
+        window_bytes=PIPELINE_WINDOW_BYTES,
+    ):
+        """
+        连续发出请求，在途请求达到window个或负载合计超过window_bytes字节时先读回最早的响应，
+        返回负载列表；有请求返回错误时读完全部响应（连接仍可复用）再抛出第一个ServerError
+        """
+        results, error = [], None
+        pending = collections.deque()  # (请求ID, 负载字节数)
+        in_flight = 0
+
+        def read_oldest():
+            nonlocal error, in_flight
+            request_id, size = pending.popleft()
+            in_flight -= size
+            try:
+                results.append(self.receive(request_id))
+            except ServerError as e:
+                results.append(None)
+                error = error or e
+
+        for payload in payloads:
+            while pending and (
+                len(pending) >= window or in_flight + len(payload) > window_bytes
+            ):
+                read_oldest()
+            pending.append((self.send(op, payload), len(payload)))
+            in_flight += len(payload)
+        while pending:
+            read_oldest()
+        if error is not None:
+            raise error
+        return results
+
+    def close(self):
+        self.sock.close()
+
+
+class _Slot:
+    """predict_one的等待槽：合批线程填入结果后唤醒调用方"""
+
+    __slots__ = ("features", "event", "label", "error")
+
+    def __init__(self, features):
+        self.features = features
+        self.event = threading.Event()
+        self.label = None
+        self.error = None
+
+
+class PredictionClient:
+    """
+    线程安全的预测客户端：
+    - 连接按需创建，最多pool_size条，用完放回连接池复用（出错的连接直接关闭）
+    - predict(X) 一次请求打分整个矩阵；predict_many 在一条连接上流水线发出多个矩阵
+    - predict_one(features) 透明合批：没有请求在途时调用线程直接发出；
+      并发调用时排队的单条记录由在途的调用线程（最多pool_size个）拼成一个矩阵一起发出，
+      单线程调用不增加等待，高并发时自动变成批量请求
+    """
+
+    def __init__(self, address, pool_size=4, timeout=5.0, max_batch_rows=1024):
+        self.address = address
+        self.pool_size = max(1, int(pool_size))
+        self.timeout = timeout
+        self.max_batch_rows = max(1, int(max_batch_rows))
+        self._pool = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+        self._lock = threading.Lock()
+        self._pending = []
+        self._leaders = 0
+
+    # --------------------------
+    # 连接池
+    # --------------------------
+    def _acquire(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"等待空闲连接超时（{self.timeout}s）")
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            try:
+                return Connection(self.address, self.timeout)
+            except Exception:
+                self._slots.release()
+                raise
+
+    def _release(self, connection, broken=False):
+        if broken:
+            connection.close()
+        else:
+            self._pool.put(connection)
+        self._slots.release()
+
+    def _call(self, fn):
+        connection = self._acquire()
+        try:
+            result = fn(connection)
+        except ServerError:
+            self._release(connection)  # 服务端正常返回了错误，连接仍可用
+            raise
+        except BaseException:
+            self._release(connection, broken=True)
+            raise
+        self._release(connection)
+        return result
+
+    # --------------------------
+    # 预测
+    # --------------------------
+    def ping(self):
+        """返回服务端当前模型版本"""
+        payload = self._call(lambda c: c.request(OP_PING))
+        return bytes(payload).decode("utf-8")
+
+    def predict(self, X):
+        """X：(行数, 4) 的特征矩阵（float32保持float32发送，其余按float64），返回标签数组"""
+        payload = encode(_as_matrix(X))
+        return decode_labels(self._call(lambda c: c.request(OP_PREDICT, payload)))
+
+    def predict_many(self, matrices):
+        """在一条连接上流水线发出多个矩阵（在途窗口有上限，边发边读），返回各自的标签数组"""
+        payloads = [encode(_as_matrix(X)) for X in matrices]
+        responses = self._call(lambda c: c.pipeline(payloads))
+        return [decode_labels(payload) for payload in responses]
+
+    def predict_one(self, features):
+        """单条预测（features按 sepal_length, sepal_width, petal_length, petal_width 排列）"""
+        slot = _Slot(features)
+        with self._lock:
+            self._pending.append(slot)
+            lead = self._leaders < self.pool_size
+            if lead:
+                self._leaders += 1
+        if lead:
+            self._drain()
+        if not slot.event.wait(self.timeout):
+            raise TimeoutError(f"等待预测结果超时（{self.timeout}s）")
+        if slot.error is not None:
+            raise slot.error
+        return slot.label
+
+    def _drain(self):
+        """把排队的单条记录按max_batch_rows拼批发出，直到队列为空"""
+        while True:
+            with self._lock:
+                batch = self._pending[: self.max_batch_rows]
+                del self._pending[: self.max_batch_rows]
+                if not batch:
+                    self._leaders -= 1
+                    return
+            try:
+                labels = self.predict([slot.features for slot in batch]).tolist()
+                for slot, label in zip(batch, labels):
+                    slot.label = label
+            except Exception as e:
+                for slot in batch:
+                    slot.error = e
+            for slot in batch:
+                slot.event.set()
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def _as_matrix(X):
+    X = np.asarray(X)
+    if X.dtype != np.float32:
+        X = X.astype(np.float64, copy=False)
+    return X.reshape(-1, 4) if X.ndim == 1 else X
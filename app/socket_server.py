@@ -0,0 +1,262 @@
+# app/socket_server.py（旁路部署用的二进制预测服务：Unix域套接字/TCP长连接，不经过HTTP和Flask）
+# 用法：python app/socket_server.py [--unix /tmp/iris.sock] [--tcp 127.0.0.1:5001]
+# 协议见app/socket_client.py；模型加载、标签映射和热更新与HTTP服务共用app/main.py的model_manager
+import argparse
+import os
+import signal
+import socket
+import sys
+import threading
+
+import numpy as np
+
+# 项目根目录加入模块搜索路径（兼容 python app/socket_server.py 直接启动）
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.binary_format import BinaryFormatError, decode, encode_labels
+from app.socket_client import (
+    FRAME,
+    FRAME_SIZE,
+    MAX_FRAME_PAYLOAD,
+    OP_PING,
+    OP_PREDICT,
+    STATUS_ERROR,
+    STATUS_OK,
+    parse_address,
+)
+
+N_FEATURES = 4  # 列顺序同app/main.py的FEATURE_COLUMNS
+RECV_SIZE = 1 << 16
+
+
+class PredictionServer:
+    """
+    每条连接一个线程：一次recv读到的所有完整帧作为一组处理，
+    组内的预测请求（客户端流水线发来的多个帧）拼成一个矩阵只打分一次，
+    响应按请求顺序拼接后一次sendall写回；连接保持到客户端关闭。
+    负载超过max_payload的帧：先答复它之前的完整帧，再对它回错误帧并断开连接
+    """
+
+    def __init__(self, get_handle, max_payload=MAX_FRAME_PAYLOAD):
+        # get_handle() 返回当前模型句柄，每组请求取一次（兼容热更新）
+        self._get_handle = get_handle
+        self.max_payload = max_payload
+        self._listeners = []
+        self._unix_paths = []
+        self._lock = threading.Lock()
+        self._counters = {
+            "connections": 0,
+            "active_connections": 0,
+            "requests": 0,
+            "rows": 0,
+            "errors": 0,
+        }
+
+    # --------------------------
+    # 监听
+    # --------------------------
+    def listen(self, address, backlog=1024):
+        """按地址（unix:/路径 或 主机:端口）创建监听套接字，返回实际地址（端口为0时由系统分配）"""
+        family, target = parse_address(address)
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_UNIX:
+            if os.path.exists(target):
+                os.unlink(target)  # 上次异常退出留下的套接字文件
+            sock.bind(target)
+            self._unix_paths.append(target)
+            bound = f"unix:{target}"
+        else:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(target)
+            host, port = sock.getsockname()[:2]
+            bound = f"{host}:{port}"
+        sock.listen(backlog)
+        self._listeners.append(sock)
+        threading.Thread(
+            target=self._accept_loop, args=(sock,), name="socket-accept", daemon=True
+        ).start()
+        return bound
+
+    def _accept_loop(self, listener):
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except OSError:
+                return  # 监听套接字已关闭
+            if conn.family != socket.AF_UNIX:
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with self._lock:
+                self._counters["connections"] += 1
+                self._counters["active_connections"] += 1
+            threading.Thread(
+                target=self._serve_connection,
+                args=(conn,),
+                name="socket-conn",
+                daemon=True,
+            ).start()
+
+    def close(self):
+        for sock in self._listeners:
+            sock.close()
+        for path in self._unix_paths:
+            if os.path.exists(path):
+                os.unlink(path)
+        self._listeners, self._unix_paths = [], []
+
+    # --------------------------
+    # 连接处理
+    # --------------------------
+    def _serve_connection(self, conn):
+        buffer = bytearray()
+        try:
+            while True:
+                data = conn.recv(RECV_SIZE)
+                if not data:
+                    return
+                buffer += data
+                frames, consumed, oversized = self._split_frames(buffer)
+                if frames:
+                    del buffer[:consumed]
+                    conn.sendall(self.handle_frames(frames))
+                if oversized is not None:
+                    # 先答复之前的完整帧，再对超长帧回错误帧；之后无法再定位帧边界，断开连接
+                    conn.sendall(
+                        self._error(oversized, f"帧负载超过上限{self.max_payload}字节")
+                    )
+                    return
+        except OSError:
+            pass
+        finally:
+            conn.close()
+            with self._lock:
+                self._counters["active_connections"] -= 1
+
+    def _split_frames(self, buffer):
+        """
+        从缓冲区切出所有完整帧，返回 ([(请求ID, 操作码, 负载)], 已消费字节数, 超长帧的请求ID)；
+        遇到负载长度超过上限的帧时停止切分，第三项为该帧的请求ID（否则为None）
+        """
+        frames, offset = [], 0
+        while len(buffer) - offset >= FRAME_SIZE:
+            length, request_id, op = FRAME.unpack_from(buffer, offset)
+            if length > self.max_payload:
+                return frames, offset, request_id
+            end = offset + FRAME_SIZE + length
+            if len(buffer) < end:
+                break
+            frames.append((request_id, op, buffer[offset + FRAME_SIZE : end]))
+            offset = end
+        return frames, offset, None
+
+    def handle_frames(self, frames):
+        """处理一组帧，返回按请求顺序拼接好的响应字节"""
+        responses = [None] * len(frames)
+        matrices, index = [], []
+        for i, (request_id, op, payload) in enumerate(frames):
+            if op == OP_PREDICT:
+                try:
+                    matrices.append(decode(payload, n_columns=N_FEATURES))
+                    index.append(i)
+                except BinaryFormatError as e:
+                    responses[i] = self._error(request_id, str(e))
+            elif op == OP_PING:
+                handle = self._get_handle()
+                if handle is None:
+                    responses[i] = self._error(request_id, "模型尚未就绪")
+                else:
+                    version = str(handle.version).encode("utf-8")
+                    responses[i] = FRAME.pack(len(version), request_id, STATUS_OK) + (
+                        version
+                    )
+            else:
+                responses[i] = self._error(request_id, f"未知操作码：{op}")
+
+        if matrices:
+            self._predict(frames, matrices, index, responses)
+        with self._lock:
+            self._counters["requests"] += len(frames)
+            self._counters["rows"] += sum(len(X) for X in matrices)
+        return b"".join(responses)
+
+    def _predict(self, frames, matrices, index, responses):
+        """组内全部预测请求拼成一个矩阵打分，再按行数切回各请求"""
+        handle = self._get_handle()
+        try:
+            if handle is None:
+                raise RuntimeError("模型尚未就绪")
+            X = matrices[0] if len(matrices) == 1 else np.concatenate(matrices)
+            if not np.isfinite(X).all():
+                raise ValueError("特征含非有限值（NaN/inf）")
+            labels = handle.scorer.predict(X) if len(X) else np.empty(0, np.int64)
+        except Exception as e:
+            if len(matrices) > 1 and not isinstance(e, RuntimeError):
+                # 只有部分请求有问题时逐个重试，不连累同组的其他请求
+                for i, X in zip(index, matrices):
+                    self._predict(frames, [X], [i], responses)
+                return
+            for i in index:
+                responses[i] = self._error(frames[i][0], str(e))
+            return
+        offset = 0
+        for i, X in zip(index, matrices):
+            body = encode_labels(labels[offset : offset + len(X)])
+            offset += len(X)
+            responses[i] = FRAME.pack(len(body), frames[i][0], STATUS_OK) + body
+
+    def _error(self, request_id, message):
+        with self._lock:
+            self._counters["errors"] += 1
+        body = message.encode("utf-8")
+        return FRAME.pack(len(body), request_id, STATUS_ERROR) + body
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
+
+
+def main():
+    # 与HTTP服务同一套模型加载（get_valid_model_path/load_label_map/精简产物/查表）和热更新；
+    # 导入时同时读取.env
+    from app.main import SERVING_MODE, model_manager
+
+    parser = argparse.ArgumentParser(description="二进制套接字预测服务")
+    parser.add_argument(
+        "--unix",
+        default=os.getenv("SOCKET_UNIX_PATH", ""),
+        help="Unix域套接字路径（留空不监听）",
+    )
+    parser.add_argument(
+        "--tcp",
+        default=os.getenv("SOCKET_TCP_ADDRESS", ""),
+        help="TCP监听地址 主机:端口（留空不监听）",
+    )
+    args = parser.parse_args()
+    if not args.unix and not args.tcp:
+        args.unix = "/tmp/iris.sock"
+
+    print(f"开始加载模型（{SERVING_MODE}模式）")
+    model_manager.start(
+        watch_interval=float(os.getenv("MODEL_RELOAD_INTERVAL", 0)),
+        background=False,
+    )
+    server = PredictionServer(lambda: model_manager.current)
+    addresses = []
+    if args.unix:
+        addresses.append(server.listen(f"unix:{args.unix}"))
+    if args.tcp:
+        addresses.append(server.listen(args.tcp))
+    print(f"套接字预测服务已启动：{', '.join(addresses)}")
+
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    signal.signal(signal.SIGINT, lambda *_: stopped.set())
+    while not stopped.wait(1.0):
+        pass
+    server.close()
+    print(f"套接字预测服务已停止：{server.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import os
+import sys
+import threading
+import time
+import pytest
+
+# 核心：按项目根目录名称定位，确保导入正确
+current_script_path = os.path.abspath(__file__)
+project_root = current_script_path
+while "iris-classification-app" not in os.path.basename(project_root):
+    project_root = os.path.dirname(project_root)
+    if project_root == os.path.dirname(project_root):
+        raise FileNotFoundError(
+            "未找到项目根目录 'iris-classification-app'，请确认目录名称正确"
+        )
+sys.path.insert(0, project_root)
+
+from app.admission import AdmissionController, AdmissionRejected
+
+
+def test_admission_limits():
+    """并发上限内直接执行，超出后排队；队列满返回503，截止时间前完成不了返回429"""
+    controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=5)
+    start = controller.admit()
+    controller.release(start)  # 记下约0秒的执行耗时
+    controller._service_seconds = 0.05  # 固定平均执行耗时，便于断言估算结果
+    running = controller.admit()
+
+    admitted = []
+    waiter = threading.Thread(target=lambda: admitted.append(controller.admit()))
+    waiter.start()
+    while controller.stats()["queue_depth"] == 0:
+        time.sleep(0.001)
+
+    with pytest.raises(AdmissionRejected) as e:
+        controller.admit()
+    assert e.value.status == 503 and e.value.reason == "queue_full"
+    assert e.value.retry_after >= 1
+    controller.max_queue = 2
+    with pytest.raises(AdmissionRejected) as e:
+        controller.admit(deadline=time.perf_counter() + 0.06)  # 排队+执行约需0.15秒
+    assert e.value.status == 429 and e.value.reason == "deadline"
+    with pytest.raises(AdmissionRejected) as e:
+        controller.admit(deadline=time.perf_counter() - 1)
+    assert e.value.reason == "deadline_expired"
+
+    controller.release(running)  # 执行槽直接交给排队的请求
+    waiter.join(timeout=5)
+    assert len(admitted) == 1
+    stats = controller.stats()
+    assert stats["active"] == 1 and stats["queue_depth"] == 0
+    assert stats["admitted"] == 3 and stats["queued"] == 1
+    assert stats["shed"] == {
+        "queue_full": 1,
+        "deadline": 1,
+        "deadline_expired": 1,
+        "queue_timeout": 0,
+    }
+    assert stats["queue_wait_ms"]["count"] == 3
+
+
+def test_admission_queue_timeout():
+    """排队超过截止时间的请求返回503，不占用之后空出的执行槽"""
+    controller = AdmissionController(max_concurrency=1, max_queue=4, queue_timeout=0.05)
+    running = controller.admit()
+    with pytest.raises(AdmissionRejected) as e:
+        controller.admit()
+    assert e.value.status == 503 and e.value.reason == "queue_timeout"
+    controller.release(running)
+    stats = controller.stats()
+    assert stats["active"] == 0 and stats["queue_depth"] == 0
+    assert controller.admit() is not None
@@ -17,8 +17,10 @@ while "iris-classification-app" not in os.path.basename(project_root):
 # 将项目根目录添加到Python模块搜索路径
 sys.path.insert(0, project_root)
 
-# 现在可正常导入app模块
-from app.main import app
+# 现在可正常导入app模块（同步加载模型，测试开始时模型已就绪）
+from app.main import create_app
+
+app = create_app(background=False)
 
 
 @pytest.fixture
@@ -81,3 +83,403 @@ def test_api_missing_param(client):
     assert (
         "缺少参数" in result["error"] or "petal_width" in result["error"]
     ), f"错误信息未提示缺少参数，实际为{result['error']}"
+
+
+def test_api_batch_response(client):
+    """测试批量接口：合法记录返回预测，非法记录在原位置返回错误"""
+    request_data = [
+        {
+            "sepal_length": 5.1,
+            "sepal_width": 3.5,
+            "petal_length": 1.4,
+            "petal_width": 0.2,
+        },
+        {"sepal_length": 5.1, "sepal_width": 3.5},  # 缺少参数
+        {
+            "sepal_length": "abc",
+            "sepal_width": 3.5,
+            "petal_length": 1.4,
+            "petal_width": 0.2,
+        },  # 非数值
+        {
+            "sepal_length": 6.5,
+            "sepal_width": 3.0,
+            "petal_length": 5.5,
+            "petal_width": 2.0,
+        },
+    ]
+    response = client.post(
+        "/predict/batch",
+        data=json.dumps(request_data),
+        content_type="application/json",
+    )
+
+    assert response.status_code == 200, f"预期状态码200，实际为{response.status_code}"
+    result = json.loads(response.data)
+    assert result["total"] == 4 and result["succeeded"] == 2 and result["failed"] == 2
+    statuses = [r["status"] for r in result["results"]]
+    assert statuses == [
+        "success",
+        "fail",
+        "fail",
+        "success",
+    ], f"逐条状态异常：{statuses}"
+    assert [r["index"] for r in result["results"]] == [0, 1, 2, 3]
+    assert result["results"][0]["predicted_species"] == "setosa"
+    assert result["results"][3]["predicted_species"] == "virginica"
+    assert "petal_width" in result["results"][1]["error"]
+    assert result["results"][2]["error"] == "参数需为数字"
+    probabilities = result["results"][0]["probabilities"]
+    assert abs(sum(probabilities.values()) - 1.0) < 1e-6, "概率之和应为1"
+
+
+def test_api_batch_requires_array(client):
+    """测试批量接口拒绝非数组请求体"""
+    response = client.post(
+        "/predict/batch",
+        data=json.dumps({"sepal_length": 5.1}),
+        content_type="application/json",
+    )
+    assert response.status_code == 400
+    assert json.loads(response.data)["status"] == "fail"
+
+
+def test_api_batch_binary(client):
+    """二进制批量接口：默认返回二进制标签，Accept为JSON时返回JSON，格式错误返回400"""
+    import numpy as np
+    from app.binary_format import decode_labels, encode
+
+    rows = np.array(
+        [[5.1, 3.5, 1.4, 0.2], [6.0, 2.8, 4.5, 1.5], [6.5, 3.0, 5.5, 2.0]],
+        dtype=np.float32,
+    )
+    body = encode(rows)
+    response = client.post(
+        "/predict/batch", data=body, content_type="application/octet-stream"
+    )
+    assert response.status_code == 200
+    assert response.mimetype == "application/octet-stream"
+    assert decode_labels(response.data).tolist() == [0, 1, 2]
+
+    response = client.post(
+        "/predict/batch",
+        data=encode(rows.astype(np.float64)),
+        content_type="application/octet-stream",
+        headers={"Accept": "application/json"},
+    )
+    result = json.loads(response.data)
+    assert result["predicted_species"] == ["setosa", "versicolor", "virginica"]
+
+    for bad in (body[:-1], b"JUNK" + body[4:], encode(rows[:, :3])):
+        response = client.post(
+            "/predict/batch", data=bad, content_type="application/octet-stream"
+        )
+        assert response.status_code == 400
+    rows[1, 2] = np.nan
+    response = client.post(
+        "/predict/batch", data=encode(rows), content_type="application/octet-stream"
+    )
+    assert response.status_code == 400 and "第1行" in json.loads(response.data)["error"]
+
+
+def test_api_batch_binary_too_large_not_read(client, monkeypatch):
+    """二进制请求体超过BINARY_MAX_ROWS对应的大小时按Content-Length直接返回413，不读请求体"""
+    import io
+    import app.main as main_module
+    from app.binary_format import encode
+
+    class UnreadableStream(io.BytesIO):
+        def read(self, *args):
+            raise AssertionError("请求体不应被读取")
+
+        readinto = readline = read
+
+    monkeypatch.setattr(main_module, "BINARY_MAX_ROWS", 2)
+    body = encode([[5.1, 3.5, 1.4, 0.2]] * 3)
+    response = client.post(
+        "/predict/batch",
+        input_stream=UnreadableStream(body),
+        content_type="application/octet-stream",
+        headers={"Content-Length": str(len(body))},
+    )
+    assert response.status_code == 413
+    response = client.post(
+        "/predict/batch",
+        data=encode([[5.1, 3.5, 1.4, 0.2]] * 2)[:-1],
+        content_type="application/octet-stream",
+    )
+    assert response.status_code == 400  # 未超限的请求体照常解析（长度与头部不符）
+
+
+def test_artifact_mode_requires_artifact_unless_fallback(monkeypatch, tmp_path):
+    """artifact模式下精简产物不存在时默认启动失败，SERVING_ARTIFACT_FALLBACK=1时退回MLflow模型"""
+    import app.main as main_module
+
+    monkeypatch.setattr(main_module, "SERVING_MODE", "artifact")
+    monkeypatch.setenv("SERVING_ARTIFACT_PATH", str(tmp_path / "missing.npz"))
+    with pytest.raises(FileNotFoundError):
+        main_module.load_model_handle()
+
+    monkeypatch.setattr(main_module, "SERVING_ARTIFACT_FALLBACK", True)
+    handle = main_module.load_model_handle()
+    assert not handle.source.endswith(".npz")
+    assert handle.species_map[handle.scorer.predict_one([5.1, 3.5, 1.4, 0.2])] in (
+        "setosa",
+        "iris-setosa",
+    )
+
+
+def test_api_admin_reload(client):
+    """测试管理接口：同步重载后返回当前版本和切换历史"""
+    response = client.post("/admin/reload?wait=1")
+    assert response.status_code == 200, f"预期状态码200，实际为{response.status_code}"
+    assert json.loads(response.data)["status"] == "success"
+
+    status = json.loads(client.get("/admin/model").data)
+    assert status["active"]["version"], "应返回当前生效的模型版本"
+    assert status["history"][-1]["reason"] == "admin"
+    assert status["last_reload_latency_seconds"] >= 0
+
+
+def test_api_model_version_selection(client):
+    """测试按请求选择模型版本：请求头或请求体字段指定版本，不存在的版本返回404"""
+    sample = {
+        "sepal_length": 5.1,
+        "sepal_width": 3.5,
+        "petal_length": 1.4,
+        "petal_width": 0.2,
+    }
+    response = client.post("/predict", json=sample, headers={"X-Model-Version": "1"})
+    assert response.status_code == 200
+    assert json.loads(response.data)["model_version"].endswith(":v1")
+
+    response = client.post("/predict", json=dict(sample, model_version="v1"))
+    assert json.loads(response.data)["model_version"].endswith(":v1")
+    assert json.loads(client.get("/admin/model").data)["cache"]["hits"] >= 1
+
+    response = client.post("/predict", json=sample, headers={"X-Model-Version": "999"})
+    assert response.status_code == 404
+    assert json.loads(response.data)["status"] == "fail"
+
+
+def test_api_shadow(client, monkeypatch):
+    """测试影子模型：主请求正常返回，候选版本在后台打分并统计一致率"""
+    import time
+    import app.main
+    from app.shadow import ShadowEvaluator
+
+    shadow = ShadowEvaluator(
+        lambda: [app.main.model_cache.get(("Iris-Production-Model", "1"))],
+        poll_interval=0.01,
+    )
+    monkeypatch.setattr(app.main, "shadow", shadow)
+    sample = {
+        "sepal_length": 5.1,
+        "sepal_width": 3.5,
+        "petal_length": 1.4,
+        "petal_width": 0.2,
+    }
+    assert client.post("/predict", json=sample).status_code == 200
+    assert client.post("/predict/batch", json=[sample, sample]).status_code == 200
+
+    deadline = time.time() + 5
+    while shadow.stats()["processed_rows"] < 3 and time.time() < deadline:
+        time.sleep(0.01)
+    stats = json.loads(client.get("/admin/shadow").data)
+    assert stats["enabled"] and stats["processed_rows"] == 3
+    assert stats["comparisons"][0]["candidate_version"].endswith(":v1")
+    assert stats["comparisons"][0]["total"] == 3
+
+
+def test_api_stream_response(client, monkeypatch):
+    """测试流式接口：逐行返回结果，坏行报错但不中断（分块大小设为2，覆盖跨块情况）"""
+    import app.main
+
+    monkeypatch.setattr(app.main, "STREAM_CHUNK_SIZE", 2)
+    lines = [
+        json.dumps(
+            {
+                "id": "a",
+                "sepal_length": 5.1,
+                "sepal_width": 3.5,
+                "petal_length": 1.4,
+                "petal_width": 0.2,
+            }
+        ),
+        "{不是JSON",
+        "",
+        json.dumps({"sepal_length": 5.1}),
+        json.dumps(
+            {
+                "sepal_length": 6.5,
+                "sepal_width": 3.0,
+                "petal_length": 5.5,
+                "petal_width": 2.0,
+            }
+        ),
+    ]
+    response = client.post(
+        "/predict/stream",
+        data="\n".join(lines) + "\n",
+        content_type="application/x-ndjson",
+    )
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    results = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert [r["line"] for r in results] == [1, 2, 4, 5], "空行跳过，其余按行号返回"
+    assert [r["status"] for r in results] == ["success", "fail", "fail", "success"]
+    assert results[0]["id"] == "a" and results[0]["predicted_species"] == "setosa"
+    assert "JSON" in results[1]["error"]
+    assert "petal_width" in results[2]["error"]
+    assert results[3]["predicted_species"] == "virginica"
+
+
+def test_api_metrics(client, monkeypatch):
+    """开启指标采集后，/metrics按Prometheus文本格式返回分阶段耗时和计数"""
+    from app import main
+    from app.metrics import Metrics
+
+    enabled = Metrics(enabled=True)
+    enabled.register("predict", ["parse", "validate", "model", "serialize"])
+    enabled.register("stream", [])
+    monkeypatch.setattr(main, "metrics", enabled)
+    client.post("/predict", json={"sepal_length": 5.1})
+    client.post(
+        "/predict",
+        json={
+            "sepal_length": 5.1,
+            "sepal_width": 3.5,
+            "petal_length": 1.4,
+            "petal_width": 0.2,
+        },
+    )
+    client.post(
+        "/predict/stream",
+        data=json.dumps({"sepal_length": 5.1}) + "\n",
+        content_type="application/x-ndjson",
+    ).get_data()
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    text = response.get_data(as_text=True)
+    assert 'iris_requests_total{endpoint="predict",status="200"} 1' in text
+    assert 'iris_errors_total{endpoint="predict",type="validation"} 1' in text
+    assert 'stage="serialize"' in text
+    assert 'iris_requests_total{endpoint="stream",status="200"} 1' in text
+    assert 'endpoint="stream",stage="total"' in text
+    assert "iris_model_info{" in text
+
+
+def test_api_readiness_gate(monkeypatch):
+    """后台加载期间：/healthz 存活、/readyz 和 /predict 返回503；加载完成后恢复正常"""
+    import threading
+    import app.main
+    from app.model_manager import ModelManager
+
+    release = threading.Event()
+
+    def slow_loader():
+        release.wait(10)
+        return app.main.load_model_handle()
+
+    manager = ModelManager(slow_loader, warm_up=app.main.warm_up_model)
+    monkeypatch.setattr(app.main, "model_manager", manager)
+    slow_app = create_app(background=True)
+    client = slow_app.test_client()
+    sample = {
+        "sepal_length": 5.1,
+        "sepal_width": 3.5,
+        "petal_length": 1.4,
+        "petal_width": 0.2,
+    }
+
+    assert client.get("/healthz").status_code == 200
+    assert client.get("/readyz").status_code == 503
+    response = client.post("/predict", json=sample)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+    release.set()
+    assert manager.wait_ready(timeout=30)
+    body = json.loads(client.get("/readyz").data)
+    assert body["state"] == "ready" and body["load_seconds"] is not None
+    assert client.post("/predict", json=sample).status_code == 200
+
+
+def test_api_lookup_table(client, monkeypatch):
+    """查表预测：0.1cm格点上的请求命中查表，其余回退到模型，命中计数见/admin/model"""
+    import app.main
+    from app.model_manager import ModelHandle
+
+    current = app.main.model_manager.current
+    handle = ModelHandle(
+        app.main.attach_lut(current.scorer),
+        current.species_map,
+        current.version,
+        current.source,
+    )
+    monkeypatch.setattr(app.main.model_manager, "current", handle)
+    sample = {
+        "sepal_length": 5.1,
+        "sepal_width": 3.5,
+        "petal_length": 1.4,
+        "petal_width": 0.2,
+    }
+    response = client.post("/predict", json=sample)
+    assert json.loads(response.data)["predicted_species"] == "setosa"
+    response = client.post("/predict", json=dict(sample, sepal_length=5.123))
+    assert json.loads(response.data)["predicted_species"] == "setosa"
+
+    lut = json.loads(client.get("/admin/model").data)["lut"]
+    assert lut["hits"] == 1 and lut["off_grid"] == 1
+    assert lut["hit_rate"] == 0.5
+
+
+def test_api_drift(client, monkeypatch):
+    """漂移监控：/predict 和 /predict/batch 的输入计入统计，/admin/drift 返回与参考统计的对比"""
+    import app.main
+    from app.drift import DriftMonitor
+    from ml.drift import compute_reference
+
+    rows = [[5.1, 3.5, 1.4, 0.2], [6.0, 2.8, 4.5, 1.5], [6.5, 3.0, 5.5, 2.0]]
+    reference = compute_reference(rows * 10, [0, 1, 2] * 10, app.main.FEATURE_COLUMNS)
+    monitor = DriftMonitor(reference, poll_interval=60)
+    monkeypatch.setattr(app.main, "drift_monitor", monitor)
+    records = [dict(zip(app.main.FEATURE_COLUMNS, row)) for row in rows]
+    assert client.post("/predict", json=records[0]).status_code == 200
+    assert client.post("/predict/batch", json=records[1:]).status_code == 200
+
+    monitor.fold()
+    report = json.loads(client.get("/admin/drift").data)
+    assert report["enabled"] and report["cumulative"]["count"] == 3
+    distribution = report["cumulative"]["prediction_distribution"]
+    assert distribution["classes"] == ["setosa", "versicolor", "virginica"]
+    assert distribution["live"] == [1, 1, 1]
+
+
+def test_api_admission(client, monkeypatch):
+    """准入控制：执行槽占满且队列已满时返回503和Retry-After，截止时间格式错误返回400"""
+    import app.main
+    from app.admission import AdmissionController
+
+    controller = AdmissionController(max_concurrency=1, max_queue=0)
+    monkeypatch.setattr(app.main, "admission", controller)
+    sample = {
+        "sepal_length": 5.1,
+        "sepal_width": 3.5,
+        "petal_length": 1.4,
+        "petal_width": 0.2,
+    }
+    assert client.post("/predict", json=sample).status_code == 200
+    assert controller.stats()["active"] == 0  # 请求结束后释放执行槽
+
+    running = controller.admit()
+    response = client.post("/predict/batch", json=[sample])
+    assert response.status_code == 503 and response.headers["Retry-After"] == "1"
+    assert json.loads(response.data)["reason"] == "queue_full"
+    controller.release(running)
+    response = client.post("/predict", json=sample, headers={"X-Deadline-Ms": "abc"})
+    assert response.status_code == 400
+
+    stats = json.loads(client.get("/admin/admission").data)
+    assert stats["admitted"] == 2 and stats["shed"]["queue_full"] == 1
@@ -0,0 +1,51 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# 核心：按项目根目录名称定位，确保导入正确
+current_script_path = os.path.abspath(__file__)
+project_root = current_script_path
+while "iris-classification-app" not in os.path.basename(project_root):
+    project_root = os.path.dirname(project_root)
+    if project_root == os.path.dirname(project_root):
+        raise FileNotFoundError(
+            "未找到项目根目录 'iris-classification-app'，请确认目录名称正确"
+        )
+sys.path.insert(0, project_root)
+
+from ml.batch_score import FEATURE_COLUMNS, load_scorer, score_file
+
+
+def test_score_file_keeps_input_order(tmp_path):
+    """多进程分块打分的结果须与单进程直接打分逐行一致，且顺序不变"""
+    rng = np.random.default_rng(0)
+    X = np.round(rng.uniform(0.1, 7.9, size=(2500, 4)), 1)
+    df = pd.DataFrame(X, columns=FEATURE_COLUMNS)
+    df.insert(0, "row_id", np.arange(len(df)))
+    df.loc[7, "petal_width"] = np.nan  # 缺失值行标记为无效
+    input_path = tmp_path / "input.csv"
+    output_path = tmp_path / "output.csv"
+    df.to_csv(input_path, index=False)
+
+    stats = score_file(
+        str(input_path),
+        str(output_path),
+        chunksize=300,
+        workers=2,
+        with_proba=True,
+        id_column="row_id",
+    )
+    assert stats["rows"] == 2500
+    assert stats["invalid_rows"] == 1
+
+    out = pd.read_csv(output_path, keep_default_na=False)
+    assert out["row_id"].tolist() == list(range(2500))
+    scorer, species_map = load_scorer()
+    expected = scorer.predict(X)
+    valid = out["row_id"] != 7
+    assert (out.loc[valid, "label"].to_numpy() == expected[valid.to_numpy()]).all()
+    assert out.loc[7, "label"] == -1 and out.loc[7, "predicted_species"] == ""
+    proba_columns = [f"proba_{species_map[int(c)]}" for c in scorer.classes]
+    sums = out.loc[valid, proba_columns].astype(float).sum(axis=1)
+    assert np.allclose(sums, 1.0)
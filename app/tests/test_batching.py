@@ -0,0 +1,73 @@
+import os
+import sys
+import threading
+import numpy as np
+
+# 核心：按项目根目录名称定位，确保导入正确
+current_script_path = os.path.abspath(__file__)
+project_root = current_script_path
+while "iris-classification-app" not in os.path.basename(project_root):
+    project_root = os.path.dirname(project_root)
+    if project_root == os.path.dirname(project_root):
+        raise FileNotFoundError(
+            "未找到项目根目录 'iris-classification-app'，请确认目录名称正确"
+        )
+sys.path.insert(0, project_root)
+
+from app.batching import MicroBatcher
+from app.model_manager import ModelHandle
+from ml.scoring import LinearScorer
+
+
+class CountingScorer(LinearScorer):
+    """记录每次predict调用的批大小"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = []
+
+    def predict(self, X):
+        self.calls.append(len(X))
+        return super().predict(X)
+
+
+def make_handle():
+    # 按花瓣长度区分三类
+    coef = np.array([[0, 0, -10.0, 0], [0, 0, 0, 0], [0, 0, 10.0, 0]])
+    scorer = CountingScorer(coef, np.array([30.0, 0.0, -50.0]), np.array([0, 1, 2]))
+    return ModelHandle(scorer, {0: "setosa", 1: "versicolor", 2: "virginica"}, "v1", "")
+
+
+def test_concurrent_requests_are_batched():
+    """并发提交的单条请求被合并打分，且各自拿回自己的结果"""
+    handle = make_handle()
+    batcher = MicroBatcher(lambda: handle, max_batch_size=16, max_wait_ms=50)
+    petal_lengths = [1.4, 4.5, 6.0] * 10
+    results = [None] * len(petal_lengths)
+    barrier = threading.Barrier(len(petal_lengths))
+
+    def worker(i):
+        barrier.wait()
+        results[i] = batcher.submit([5.0, 3.0, petal_lengths[i], 1.0])[0]
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(30)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == [0, 1, 2] * 10, "每个调用方应拿到自己那一行的结果"
+    assert len(handle.scorer.calls) < 30, "并发请求应被合并成较少的批次"
+    assert max(handle.scorer.calls) <= 16, "单批不超过max_batch_size"
+    stats = batcher.stats()
+    assert stats["batch_size"]["count"] == len(handle.scorer.calls)
+    assert stats["queue_wait_ms"]["count"] == 30
+
+
+def test_single_request_flushes_after_wait():
+    """只有一条请求时，等待max_wait_ms后也会单独打分"""
+    handle = make_handle()
+    batcher = MicroBatcher(lambda: handle, max_batch_size=64, max_wait_ms=1)
+    label, used_handle = batcher.submit([5.1, 3.5, 1.4, 0.2])
+    assert label == 0 and used_handle is handle
+    assert handle.scorer.calls == [1]
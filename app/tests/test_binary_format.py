@@ -0,0 +1,59 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+# 核心：按项目根目录名称定位，确保导入正确
+current_script_path = os.path.abspath(__file__)
+project_root = current_script_path
+while "iris-classification-app" not in os.path.basename(project_root):
+    project_root = os.path.dirname(project_root)
+    if project_root == os.path.dirname(project_root):
+        raise FileNotFoundError(
+            "未找到项目根目录 'iris-classification-app'，请确认目录名称正确"
+        )
+sys.path.insert(0, project_root)
+
+from app.binary_format import (
+    HEADER_SIZE,
+    BinaryFormatError,
+    decode,
+    decode_labels,
+    encode,
+    encode_labels,
+)
+
+
+def test_binary_roundtrip():
+    """编码后解码得到相同矩阵，且解码结果直接引用请求体缓冲区（不拷贝）"""
+    X = np.random.default_rng(0).uniform(0, 8, size=(1000, 4))
+    for dtype in (np.float32, np.float64):
+        body = encode(X.astype(dtype))
+        assert len(body) == HEADER_SIZE + X.size * np.dtype(dtype).itemsize
+        decoded = decode(body, n_columns=4)
+        assert decoded.dtype == dtype and np.array_equal(decoded, X.astype(dtype))
+        assert not decoded.flags.owndata and not decoded.flags.writeable
+    assert decode(encode(np.empty((0, 4))), n_columns=4).shape == (0, 4)
+
+    labels = np.array([0, 2, 1, 2])
+    assert len(encode_labels(labels)) == HEADER_SIZE + 4  # 每行1字节
+    assert decode_labels(encode_labels(labels)).tolist() == [0, 2, 1, 2]
+    wide = np.array([0, 1000, -5])
+    assert decode_labels(encode_labels(wide)).tolist() == [0, 1000, -5]
+
+
+def test_binary_format_errors():
+    body = encode(np.ones((3, 4), dtype=np.float32))
+    bad_bodies = [
+        body[:10],  # 头部不完整
+        b"XXXX" + body[4:],  # 魔数
+        body[:4] + b"\x09" + body[5:],  # 版本
+        body[:5] + b"\x07" + body[6:],  # 数据类型码
+        body + b"\x00",  # 长度
+        encode(np.ones((3, 4), dtype=np.int32)),  # 整数特征
+    ]
+    for bad in bad_bodies:
+        with pytest.raises(BinaryFormatError):
+            decode(bad, n_columns=4)
+    with pytest.raises(BinaryFormatError, match="列数"):
+        decode(body, n_columns=5)
@@ -1,5 +1,6 @@
 import os
 import sys
+import numpy as np
 import pandas as pd
 import pytest
 
@@ -15,7 +16,14 @@ while "iris-classification-app" not in os.path.basename(project_root):
 sys.path.insert(0, project_root)
 
 # 现在可正常导入ml模块
-from ml.data_pipeline import load_and_clean_data
+from ml.data_pipeline import (
+    RowHashSet,
+    clean_data,
+    clean_data_streaming,
+    load_and_clean_data,
+    load_columnar,
+    prepare_data,
+)
 
 
 def test_feature_range():
@@ -79,3 +87,145 @@ def test_label_categories():
     label_counts = df["species"].value_counts()
     for label, count in label_counts.items():
         assert count >= 10, f"类别{label}样本数不足：仅{count}个，需至少10个"
+
+
+def test_prepare_data_reuses_cache(tmp_path):
+    """输入未变化时复用缓存（连修改时间变化也只重新哈希、不重新清洗），内容变化时重新计算"""
+    raw_path = tmp_path / "raw.csv"
+    raw_path.write_text(
+        open(os.path.join(project_root, "data", "raw", "iris_v1.csv")).read()
+    )
+    paths = dict(
+        raw_path=str(raw_path),
+        processed_path=str(tmp_path / "processed" / "iris_v2.csv"),
+        label_map_path=str(tmp_path / "label_map.yml"),
+        cache_dir=str(tmp_path / "cache"),
+    )
+
+    first = prepare_data(**paths)
+    assert not first["cache_hit"]
+    assert first["rows_out"] < first["rows_in"]  # 原始数据含重复行
+
+    os.utime(raw_path)  # 只改修改时间，内容不变
+    os.remove(paths["processed_path"])  # 输出被删除时从缓存恢复
+    second = prepare_data(**paths)
+    assert second["cache_hit"] and second["data_md5"] == first["data_md5"]
+    assert os.path.exists(paths["processed_path"])
+
+    with open(raw_path, "a") as f:
+        f.write("5.0,3.0,1.5,0.2,Iris-setosa\n")
+    third = prepare_data(**paths)
+    assert not third["cache_hit"]
+    assert third["key"] != first["key"] and third["data_md5"] != first["data_md5"]
+
+
+@pytest.mark.parametrize("memory_mb", [256, 0.0002])
+def test_streaming_matches_pandas(tmp_path, memory_mb):
+    """流式清洗（含去重集合溢写到磁盘的情况）与整表清洗的输出逐字节一致"""
+    raw_path = os.path.join(project_root, "data", "raw", "iris_v1.csv")
+    df, label_map, rows_in = clean_data(raw_path)
+    expected_path = tmp_path / "expected.csv"
+    df.to_csv(expected_path, index=False, header=True)
+
+    output_path = tmp_path / "streaming.csv"
+    codes, stream_rows_in, rows_out = clean_data_streaming(
+        raw_path, str(output_path), chunksize=7, memory_mb=memory_mb
+    )
+    assert stream_rows_in == rows_in and rows_out == len(df)
+    assert codes == label_map
+    assert output_path.read_bytes() == expected_path.read_bytes()
+
+
+def test_columnar_dataset_matches_csv(tmp_path):
+    """二进制数据集与清洗后的CSV内容一致，以只读内存映射加载；流式清洗生成的数据集逐字节相同"""
+    raw_path = os.path.join(project_root, "data", "raw", "iris_v1.csv")
+    outputs = {}
+    for streaming in (False, True):
+        out_dir = tmp_path / ("streaming" if streaming else "pandas")
+        info = prepare_data(
+            raw_path=raw_path,
+            processed_path=str(out_dir / "iris_v2.csv"),
+            label_map_path=str(out_dir / "label_map.yml"),
+            cache_dir=str(out_dir / "cache"),
+            streaming=streaming,
+        )
+        outputs[streaming] = (out_dir / "iris_v2.bin").read_bytes()
+
+    X, y, schema = load_columnar(str(tmp_path / "pandas" / "iris_v2.bin"))
+    df = pd.read_csv(tmp_path / "pandas" / "iris_v2.csv")
+    assert isinstance(X, np.memmap) and not X.flags.writeable
+    assert schema["rows"] == info["rows_out"] == len(df)
+    np.testing.assert_array_equal(X, df[schema["feature_columns"]].to_numpy())
+    np.testing.assert_array_equal(y, df["species"].to_numpy())
+    assert outputs[True] == outputs[False]
+
+
+def test_prepare_data_falls_back_to_processed(tmp_path):
+    """原始数据不存在时改用清洗后数据（DVC跟踪）和已有标签映射，生成相同的二进制数据集"""
+    raw_path = tmp_path / "raw.csv"
+    raw_path.write_text(
+        open(os.path.join(project_root, "data", "raw", "iris_v1.csv")).read()
+    )
+    paths = dict(
+        raw_path=str(raw_path),
+        processed_path=str(tmp_path / "processed" / "iris_v2.csv"),
+        label_map_path=str(tmp_path / "label_map.yml"),
+    )
+    first = prepare_data(cache_dir=str(tmp_path / "cache"), **paths)
+    expected = (tmp_path / "processed" / "iris_v2.bin").read_bytes()
+
+    os.remove(raw_path)
+    os.remove(tmp_path / "processed" / "iris_v2.bin")
+    fallback = prepare_data(cache_dir=str(tmp_path / "cache2"), **paths)
+    assert not fallback["cache_hit"]
+    assert fallback["raw_path"] == paths["processed_path"]
+    assert fallback["data_md5"] == first["data_md5"]
+    assert fallback["rows_out"] == first["rows_out"]
+    assert (tmp_path / "processed" / "iris_v2.bin").read_bytes() == expected
+    assert prepare_data(cache_dir=str(tmp_path / "cache2"), **paths)["cache_hit"]
+
+    os.remove(paths["processed_path"])
+    with pytest.raises(FileNotFoundError):
+        prepare_data(cache_dir=str(tmp_path / "cache3"), **paths)
+
+
+@pytest.mark.parametrize("memory_mb", [256, 0.0002])
+def test_row_hash_set_verifies_keys_on_collision(tmp_path, memory_mb):
+    """哈希相同但行键不同（碰撞）的行不判为重复，哈希和行键都相同的才判为重复（含转存到磁盘后）"""
+    seen = RowHashSet(memory_mb, spill_dir=str(tmp_path))
+    try:
+        assert seen.add_new([1, 1, 2], [b"a", b"b", b"c"]).tolist() == [True] * 3
+        assert seen.add_new([1, 1, 1], [b"b", b"d", b"d"]).tolist() == [
+            False,
+            True,
+            False,
+        ]
+        assert seen.add_new([2, 1, 3], [b"c", b"a", b"e"]).tolist() == [
+            False,
+            False,
+            True,
+        ]
+        assert len(seen) == 5
+        assert seen.spilled == (memory_mb < 1)
+    finally:
+        seen.close()
+
+
+def test_streaming_drops_missing_labels(tmp_path):
+    """缺失标签的行两种清洗方式都丢弃，输出仍逐字节一致"""
+    raw_path = tmp_path / "raw.csv"
+    raw_path.write_text(
+        open(os.path.join(project_root, "data", "raw", "iris_v1.csv")).read()
+        + "5.0,3.0,1.5,0.2,\n"
+    )
+    df, label_map, rows_in = clean_data(str(raw_path))
+    expected_path = tmp_path / "expected.csv"
+    df.to_csv(expected_path, index=False, header=True)
+
+    output_path = tmp_path / "streaming.csv"
+    codes, stream_rows_in, rows_out = clean_data_streaming(
+        str(raw_path), str(output_path), chunksize=7
+    )
+    assert stream_rows_in == rows_in and rows_out == len(df)
+    assert codes == label_map and len(codes) == 3
+    assert output_path.read_bytes() == expected_path.read_bytes()
@@ -0,0 +1,117 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# 核心：按项目根目录名称定位，确保导入正确
+current_script_path = os.path.abspath(__file__)
+project_root = current_script_path
+while "iris-classification-app" not in os.path.basename(project_root):
+    project_root = os.path.dirname(project_root)
+    if project_root == os.path.dirname(project_root):
+        raise FileNotFoundError(
+            "未找到项目根目录 'iris-classification-app'，请确认目录名称正确"
+        )
+sys.path.insert(0, project_root)
+from app.drift import DriftMonitor
+from ml.drift import RunningStats, compute_reference, make_edges
+
+FEATURE_COLUMNS = ["sepal_length", "sepal_width", "petal_length", "petal_width"]
+
+
+def load_iris():
+    df = pd.read_csv(
+        os.path.join(project_root, "data", "raw", "iris_v1.csv"), header=None
+    )
+    X = df.iloc[:, :4].to_numpy(dtype=np.float64)
+    y = pd.factorize(df[4])[0].astype(np.int64)
+    return X, y
+
+
+def test_running_stats_matches_numpy():
+    """按不同大小的批合并后，均值/方差/最值/直方图与一次性计算的结果一致"""
+    rng = np.random.default_rng(0)
+    X = rng.normal(5.0, 2.0, size=(10000, 4)) + 1e6  # 大偏移量下仍需数值稳定
+    edges = make_edges(X, bins=10)
+    stats = RunningStats(edges)
+    start = 0
+    for size in rng.integers(1, 500, size=100):
+        stats.update(X[start : start + size])
+        start += size
+    stats.update(X[start:])
+
+    assert stats.count == len(X)
+    np.testing.assert_allclose(stats.mean, X.mean(axis=0), rtol=1e-12)
+    np.testing.assert_allclose(stats.variance, X.var(axis=0, ddof=1), rtol=1e-8)
+    assert np.array_equal(stats.min, X.min(axis=0))
+    assert np.array_equal(stats.max, X.max(axis=0))
+    for j in range(4):
+        inner, _ = np.histogram(X[:, j], bins=edges[j])
+        # 边界内的样本都落在中间的箱里（最大值等于最后一条边界时np.histogram归入最后一箱）
+        assert stats.hist[j, 0] == 0 and stats.hist[j].sum() == len(X)
+        assert np.array_equal(stats.hist[j, 1:-2], inner[:-1])
+
+
+def test_drift_monitor_detects_shift():
+    """与训练数据同分布的流量判为stable，花瓣长度整体偏移后判为drift；快照、丢弃、非有限值计数"""
+    X, y = load_iris()
+    reference = compute_reference(X, y, FEATURE_COLUMNS)
+    monitor = DriftMonitor(reference, snapshot_interval=0, poll_interval=60)
+
+    for row, label in zip(X.tolist(), y.tolist()):
+        monitor.observe([row], [label])
+    monitor.observe([[np.nan, 3.0, 1.0, 0.2]], [0])
+    monitor.fold()
+    report = monitor.report({0: "setosa", 1: "versicolor", 2: "virginica"})
+    assert report["cumulative"]["count"] == len(X)
+    assert report["nonfinite_rows"] == 1
+    assert report["cumulative"]["level"] == "stable"
+    assert report["cumulative"]["prediction_distribution"]["psi"] < 1e-9
+    assert len(report["snapshots"]) == 1
+    assert report["cumulative"]["by_class"]["setosa"]["count"] == 50
+
+    shifted = X.copy()
+    shifted[:, 2] += 2.0
+    monitor.observe(shifted.tolist(), y.tolist())
+    monitor.fold()
+    report = monitor.report(snapshots=1)
+    latest = report["snapshots"][0]
+    assert latest["count"] == len(X)
+    assert latest["features"]["petal_length"]["level"] == "drift"
+    assert latest["features"]["sepal_length"]["level"] == "stable"
+    assert latest["features"]["petal_length"]["mean_shift_std"] > 1.0
+    assert latest["level"] == "drift"
+
+    full = DriftMonitor(reference, queue_size=1, poll_interval=60)
+    assert full.observe([X[0].tolist()], [0]) is True
+    assert full.observe([X[1].tolist()], [0]) is False
+    assert full.report()["dropped"] == 1
+
+
+def test_drift_monitor_bounds_rows_and_folds_in_slices():
+    """队列按行数限制（大批量截断、额度用完丢弃），合并时按fold_rows切片，结果与一次合并相同"""
+    X, y = load_iris()
+    reference = compute_reference(X, y, FEATURE_COLUMNS)
+    monitor = DriftMonitor(
+        reference, max_queued_rows=200, fold_rows=7, poll_interval=60
+    )
+    assert monitor.observe(X, y) is True
+    assert monitor.observe(X, y) is True  # 只保留前50行
+    assert monitor.observe(X[:1], y[:1]) is False
+    report = monitor.report()
+    assert report["queued_rows"] == 200
+    assert report["dropped_rows"] == 101 and report["dropped"] == 1
+
+    rows, labels = monitor._take()
+    assert [len(chunk) for chunk in rows] == [7] and len(labels[0]) == 7
+    report = monitor.report()
+    assert report["queued_rows"] == 193, "切开的剩余行仍计入积压"
+    assert report["queue_depth"] == 1, "剩余部分留在后台线程中，不放回共享队列"
+    monitor.fold()  # 其余193行按7行一片合并，第一条记录被切开后剩余部分也不丢
+    report = monitor.report()
+    assert report["queued_rows"] == 0 and report["queue_depth"] == 0
+    assert report["cumulative"]["count"] == 193
+
+    expected = RunningStats(reference["edges"])
+    expected.update(np.concatenate([X, X[:50]])[7:])
+    assert np.allclose(monitor._total.overall.mean, expected.mean)
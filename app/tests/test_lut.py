@@ -0,0 +1,76 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+# 核心：按项目根目录名称定位，确保导入正确
+current_script_path = os.path.abspath(__file__)
+project_root = current_script_path
+while "iris-classification-app" not in os.path.basename(project_root):
+    project_root = os.path.dirname(project_root)
+    if project_root == os.path.dirname(project_root):
+        raise FileNotFoundError(
+            "未找到项目根目录 'iris-classification-app'，请确认目录名称正确"
+        )
+sys.path.insert(0, project_root)
+from ml.lut import LutScorer, compile_lut, load_lut, save_lut, verify_lut
+from ml.scoring import LinearScorer
+
+
+def fit_scorer(C=1.0):
+    """用原始鸢尾花数据训练一个LogisticRegression，返回打分器"""
+    from sklearn.linear_model import LogisticRegression
+
+    df = pd.read_csv(
+        os.path.join(project_root, "data", "raw", "iris_v1.csv"), header=None
+    )
+    X = df.iloc[:, :4].to_numpy(dtype=np.float64)
+    y = pd.factorize(df[4])[0].astype(np.int64)
+    return LinearScorer.from_model(LogisticRegression(C=C, max_iter=500).fit(X, y))
+
+
+def test_lut_parity():
+    """查表结果与模型逐位一致：全部格点 + 0.1cm精度样本 + 范围外/非格点样本的回退"""
+    scorer = fit_scorer()
+    table = compile_lut(scorer)
+    assert table.bits == 2 and table.nbytes == (table.cells + 3) // 4
+    assert verify_lut(table, scorer, n_random=2000) == 0
+
+    rng = np.random.default_rng(1)
+    X = np.vstack(
+        [
+            np.round(rng.uniform(0.1, 7.9, size=(5000, 4)), 1),  # 部分超出网格范围
+            rng.uniform(0.0, 8.0, size=(1000, 4)),  # 不在格点上
+            [[np.nan, 3.5, 1.4, 0.2], [5.1, 3.5, 1.4, 0.2]],
+        ]
+    )
+    lut_scorer = LutScorer(scorer, table)
+    assert np.array_equal(lut_scorer.predict(X), scorer.predict(X))
+    for row in X[:300].tolist() + X[-2:].tolist():
+        assert lut_scorer.predict_one(row) == scorer.predict_one(row)
+
+    stats = lut_scorer.stats()
+    assert stats["hits"] > 0 and stats["out_of_range"] > 0 and stats["off_grid"] > 0
+    assert stats["hits"] + stats["out_of_range"] + stats["off_grid"] == len(X) + 302
+    assert table.lookup_one([5.1, 3.5, 1.4, 0.2]) == (
+        scorer.predict_one([5.1, 3.5, 1.4, 0.2]),
+        None,
+    )
+    assert table.lookup_one([5.15, 3.5, 1.4, 0.2]) == (None, "off_grid")
+    assert table.lookup_one([9.0, 3.5, 1.4, 0.2]) == (None, "out_of_range")
+
+
+def test_lut_roundtrip_rejects_other_model(tmp_path):
+    """查表产物读写后内容不变；与编译时不同的模型不能套用"""
+    scorer = fit_scorer()
+    table = compile_lut(scorer)
+    path = str(tmp_path / "model_lut.npz")
+    save_lut(table, path)
+    loaded = load_lut(path)
+    assert np.array_equal(loaded.packed, table.packed)
+    assert loaded.describe() == table.describe()
+    LutScorer(scorer, loaded)
+
+    with pytest.raises(ValueError):
+        LutScorer(fit_scorer(C=0.01), loaded)
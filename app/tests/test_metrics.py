@@ -0,0 +1,94 @@
+import os
+import sys
+import threading
+
+# 核心：按项目根目录名称定位，确保导入正确
+current_script_path = os.path.abspath(__file__)
+project_root = current_script_path
+while "iris-classification-app" not in os.path.basename(project_root):
+    project_root = os.path.dirname(project_root)
+    if project_root == os.path.dirname(project_root):
+        raise FileNotFoundError(
+            "未找到项目根目录 'iris-classification-app'，请确认目录名称正确"
+        )
+sys.path.insert(0, project_root)
+
+from app.metrics import FOLD_THRESHOLD, Metrics
+
+
+def test_metrics_counts_across_threads():
+    """多线程写入（含跨过折算阈值的批量折算）后，汇总计数须精确"""
+    metrics = Metrics()
+    metrics.register("predict", ["parse", "validate", "model", "serialize"])
+    per_thread = FOLD_THRESHOLD * 2 + 7
+
+    def work():
+        for i in range(per_thread):
+            if i % 10 == 0:
+                metrics.finish("predict", [0.0, 1e-6, 2e-6], 400, "validation")
+            else:
+                metrics.finish("predict", [0.0, 1e-6, 2e-6, 3e-3, 3.01e-3], 200)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    total = metrics.collect()
+    failed = 4 * len(range(0, per_thread, 10))
+    assert total.requests[("predict", 400)] == failed
+    assert total.requests[("predict", 200)] == 4 * per_thread - failed
+    assert total.errors[("predict", "validation")] == failed
+    assert total.stages[("predict", "total")].total == 4 * per_thread
+    # 校验失败的请求只走完parse/validate两个阶段
+    assert total.stages[("predict", "validate")].total == 4 * per_thread
+    assert total.stages[("predict", "model")].total == 4 * per_thread - failed
+
+
+def test_metrics_render_prometheus_text():
+    metrics = Metrics()
+    metrics.register("predict", ["parse"])
+    metrics.finish("predict", [0.0, 2e-6], 200)
+    metrics.finish("predict", None, 200)  # 未计时的请求不记录
+    text = metrics.render(model_info={"version": "Iris-Production-Model:v2"})
+    assert "# TYPE iris_stage_duration_seconds histogram" in text
+    assert (
+        'iris_stage_duration_seconds_bucket{endpoint="predict",stage="parse",le="1e-06"} 0'
+        in text
+    )
+    assert (
+        'iris_stage_duration_seconds_bucket{endpoint="predict",stage="parse",le="2.5e-06"} 1'
+        in text
+    )
+    assert 'iris_requests_total{endpoint="predict",status="200"} 1' in text
+    assert 'iris_model_info{version="Iris-Production-Model:v2"} 1' in text
+
+
+def test_metrics_threaded_server_shards_bounded():
+    """werkzeug threaded模式每个连接一个新线程：已退出线程的分片被回收，计数不丢"""
+    import urllib.request
+    from werkzeug.serving import make_server
+
+    metrics = Metrics()
+    metrics.register("predict", ["parse"])
+
+    def wsgi_app(environ, start_response):
+        metrics.finish("predict", [0.0, 1e-6, 2e-6], 200)
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return [b"ok"]
+
+    server = make_server("127.0.0.1", 0, wsgi_app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/"
+        n_requests = FOLD_THRESHOLD + 244
+        for _ in range(n_requests):
+            with urllib.request.urlopen(url) as response:
+                response.read()
+    finally:
+        server.shutdown()
+    total = metrics.collect()
+    assert total.requests[("predict", 200)] == n_requests
+    assert len(metrics._shards) <= 8, f"分片未回收：{len(metrics._shards)}"
@@ -0,0 +1,95 @@
+import os
+import sys
+import threading
+import time
+import numpy as np
+import pytest
+
+# 核心：按项目根目录名称定位，确保导入正确
+current_script_path = os.path.abspath(__file__)
+project_root = current_script_path
+while "iris-classification-app" not in os.path.basename(project_root):
+    project_root = os.path.dirname(project_root)
+    if project_root == os.path.dirname(project_root):
+        raise FileNotFoundError(
+            "未找到项目根目录 'iris-classification-app'，请确认目录名称正确"
+        )
+sys.path.insert(0, project_root)
+
+from app.model_cache import ModelCache, ModelNotFoundError
+from app.model_manager import ModelHandle
+from ml.scoring import LinearScorer
+
+
+def make_handle(key):
+    scorer = LinearScorer(np.zeros((3, 4)), np.zeros(3), np.array([0, 1, 2]))
+    return ModelHandle(scorer, {0: "setosa", 1: "versicolor", 2: "virginica"}, key, "")
+
+
+def test_lru_eviction_and_counters():
+    """超过条目上限时淘汰最久未使用的版本，命中/未命中/淘汰分别计数"""
+    loads = []
+    cache = ModelCache(lambda key: loads.append(key) or make_handle(key), max_entries=2)
+    cache.get("v1")
+    cache.get("v2")
+    cache.get("v1")  # v1变为最近使用
+    cache.get("v3")  # 淘汰v2
+    cache.get("v1")
+    cache.get("v2")  # 重新加载，淘汰v3
+
+    assert loads == ["v1", "v2", "v3", "v2"]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 4, 2)
+    assert stats["keys"] == ["v1", "v2"]
+
+
+def test_memory_budget_evicts():
+    """按估算内存淘汰：预算只够一个版本时只保留最近加载的"""
+    one = 3 * 4 * 8 + 3 * 8 + 3 * 8  # coef + intercept + classes
+    cache = ModelCache(make_handle, max_entries=10, max_bytes=one * 1.5)
+    cache.get("v1")
+    cache.get("v2")
+    assert cache.stats()["keys"] == ["v2"] and cache.stats()["bytes"] == one
+
+
+def test_concurrent_misses_load_once():
+    """同一版本并发未命中时只加载一次，所有请求拿到同一个句柄"""
+    calls = []
+
+    def slow_loader(key):
+        calls.append(key)
+        time.sleep(0.2)
+        return make_handle(key)
+
+    cache = ModelCache(slow_loader)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get("v1")))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert calls == ["v1"]
+    assert len(results) == 8 and all(h is results[0] for h in results)
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["coalesced"] == 7
+
+
+def test_load_error_not_cached():
+    """加载失败时抛出异常且不缓存，下次请求重新加载"""
+    attempts = {"n": 0}
+
+    def loader(key):
+        attempts["n"] += 1
+        if attempts["n"] == 1:
+            raise ModelNotFoundError(f"模型版本不存在：{key}")
+        return make_handle(key)
+
+    cache = ModelCache(loader)
+    with pytest.raises(ModelNotFoundError):
+        cache.get("v1")
+    assert cache.get("v1").version == "v1"
+    assert cache.stats()["load_errors"] == 1
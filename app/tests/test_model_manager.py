@@ -0,0 +1,117 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+# 核心：按项目根目录名称定位，确保导入正确
+current_script_path = os.path.abspath(__file__)
+project_root = current_script_path
+while "iris-classification-app" not in os.path.basename(project_root):
+    project_root = os.path.dirname(project_root)
+    if project_root == os.path.dirname(project_root):
+        raise FileNotFoundError(
+            "未找到项目根目录 'iris-classification-app'，请确认目录名称正确"
+        )
+sys.path.insert(0, project_root)
+
+from app.model_manager import ModelHandle, ModelManager
+from ml.scoring import LinearScorer
+
+SPECIES_MAP = {0: "setosa", 1: "versicolor", 2: "virginica"}
+
+
+def make_handle(version, good=True):
+    """good=True时按花瓣长度区分三类（能通过金丝雀），否则全部预测为setosa"""
+    if good:
+        coef = np.array([[0, 0, -10.0, 0], [0, 0, 0, 0], [0, 0, 10.0, 0]])
+        intercept = np.array([30.0, 0.0, -50.0])
+    else:
+        coef, intercept = np.zeros((3, 4)), np.array([1.0, 0.0, 0.0])
+    scorer = LinearScorer(coef, intercept, np.array([0, 1, 2]))
+    return ModelHandle(scorer, SPECIES_MAP, version, f"/models/{version}")
+
+
+def test_reload_swaps_handle():
+    """重载成功后切换到新句柄，旧句柄引用仍可继续使用"""
+    versions = iter(["v1", "v2"])
+    manager = ModelManager(lambda: make_handle(next(versions)))
+    old = manager.load_initial()
+
+    result = manager.reload()
+    assert result["status"] == "success"
+    assert manager.current.version == "v2"
+    # 切换前取得旧句柄的请求不受影响
+    assert old.version == "v1" and old.scorer.predict_one([5.1, 3.5, 1.4, 0.2]) == 0
+    history = manager.status()["history"]
+    assert [h["version"] for h in history] == ["v1", "v2"]
+    assert history[-1]["previous_version"] == "v1"
+
+
+def test_reload_rejects_failed_canary():
+    """新模型未通过金丝雀校验时保留旧模型"""
+    handles = iter([make_handle("v1"), make_handle("bad", good=False)])
+    manager = ModelManager(lambda: next(handles))
+    manager.load_initial()
+
+    result = manager.reload()
+    assert result["status"] == "fail"
+    assert manager.current.version == "v1"
+    assert manager.status()["history"][-1]["success"] is False
+
+
+def test_reload_keeps_model_when_loader_raises():
+    """加载异常时保留旧模型"""
+    calls = {"n": 0}
+
+    def loader():
+        calls["n"] += 1
+        if calls["n"] > 1:
+            raise FileNotFoundError("模型目录不存在")
+        return make_handle("v1")
+
+    manager = ModelManager(loader)
+    manager.load_initial()
+    assert manager.reload()["status"] == "fail"
+    assert manager.current.version == "v1"
+
+
+def test_initial_load_requires_canary():
+    """启动时模型未通过金丝雀校验直接报错"""
+    manager = ModelManager(lambda: make_handle("bad", good=False))
+    with pytest.raises(RuntimeError):
+        manager.load_initial()
+
+
+def test_background_start_failure():
+    """后台启动加载失败：state为failed，wait_ready立即返回False，错误原因可查"""
+    manager = ModelManager(lambda: make_handle("bad", good=False))
+    manager.start(background=True)
+
+    assert manager.wait_ready(timeout=5) is False
+    assert manager.state == "failed" and manager.current is None
+    assert "金丝雀" in manager.status()["load_error"]
+    assert manager.start() is None, "只启动一次"
+
+
+def test_reload_recovers_from_failed_start():
+    """首次加载失败后可以重载恢复：失败的重载不因没有当前模型而出错，成功后转为ready"""
+    handles = iter(
+        [
+            make_handle("bad", good=False),
+            make_handle("bad2", good=False),
+            make_handle("v2"),
+        ]
+    )
+    manager = ModelManager(lambda: next(handles))
+    assert manager.reload()["status"] == "busy", "首次加载开始前不允许重载"
+    manager.start(background=True)
+    assert manager.wait_ready(timeout=5) is False
+
+    assert manager.reload()["status"] == "fail"
+    assert manager.state == "failed" and manager.current is None
+    result = manager.reload()
+    assert result["status"] == "success" and manager.current.version == "v2"
+    assert manager.state == "ready" and manager.wait_ready(timeout=0)
+    status = manager.status()
+    assert status["load_error"] is None
+    assert status["history"][-1]["previous_version"] is None
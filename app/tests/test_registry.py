@@ -0,0 +1,147 @@
+import os
+import sys
+
+# 核心：按项目根目录名称定位，确保导入正确
+current_script_path = os.path.abspath(__file__)
+project_root = current_script_path
+while "iris-classification-app" not in os.path.basename(project_root):
+    project_root = os.path.dirname(project_root)
+    if project_root == os.path.dirname(project_root):
+        raise FileNotFoundError(
+            "未找到项目根目录 'iris-classification-app'，请确认目录名称正确"
+        )
+sys.path.insert(0, project_root)
+
+from ml.registry import (
+    compact_mlruns,
+    load_registry_index,
+    rebuild_index_from_mlruns,
+    register_model_version,
+    resolve_model_entry,
+)
+
+
+def make_model_dir(root, name):
+    """构造一个最小的MLflow模型目录（含MLmodel标志文件）"""
+    model_dir = os.path.join(root, name, "artifacts")
+    os.makedirs(model_dir)
+    with open(os.path.join(model_dir, "MLmodel"), "w", encoding="utf-8") as f:
+        f.write(f"model_id: {name}\n")
+    return model_dir
+
+
+def test_register_and_resolve(tmp_path):
+    """登记新版本后，按默认/版本/阶段都能O(1)查到对应记录"""
+    index_path = str(tmp_path / "index.json")
+    v1_dir = make_model_dir(str(tmp_path), "m-1")
+    v2_dir = make_model_dir(str(tmp_path), "m-2")
+
+    register_model_version(v1_dir, run_id="run-1", index_path=index_path)
+    register_model_version(
+        v2_dir, run_id="run-2", stage="Staging", index_path=index_path
+    )
+    index = load_registry_index(index_path)
+
+    default_entry = resolve_model_entry(index=index)
+    assert default_entry["version"] == "1", "未指定时应返回Production阶段版本"
+    assert resolve_model_entry(version="2", index=index)["run_id"] == "run-2"
+    assert resolve_model_entry(stage="Staging", index=index)["version"] == "2"
+    assert resolve_model_entry(stage="Archived", index=index) is None
+    assert resolve_model_entry(name="Unknown", index=index) is None
+    assert len(default_entry["checksum"]) == 64
+    assert not [
+        f for f in os.listdir(tmp_path) if ".tmp" in f
+    ], "原子写入后不应残留临时文件"
+
+
+def test_rebuild_index_matches_mlruns(tmp_path):
+    """从仓库mlruns重建的索引中，每个版本都指向存在的模型目录"""
+    index = rebuild_index_from_mlruns(
+        os.path.join(project_root, "mlruns"), str(tmp_path / "index.json")
+    )
+    production = index["models"]["Iris-Production-Model"]
+    assert production["latest_version"] == "2"
+    for entry in production["versions"].values():
+        assert os.path.exists(
+            os.path.join(project_root, entry["path"], "MLmodel")
+        ), f"索引路径不存在：{entry['path']}"
+
+
+def test_compact_archives_unreferenced(tmp_path):
+    """压缩命令只归档索引未引用的run/模型目录，预览模式不改动文件"""
+    mlruns = tmp_path / "mlruns"
+    kept_model = make_model_dir(str(mlruns / "0" / "models"), "m-kept")
+    make_model_dir(str(mlruns / "0" / "models"), "m-stale")
+    os.makedirs(mlruns / "0" / "run-kept")
+    os.makedirs(mlruns / "0" / "run-stale")
+    index = {
+        "models": {
+            "Iris-Production-Model": {
+                "latest_version": "1",
+                "stages": {},
+                "versions": {"1": {"path": kept_model, "run_id": "run-kept"}},
+            }
+        }
+    }
+
+    targets = compact_mlruns(str(mlruns), index=index)
+    assert sorted(os.path.basename(t) for t in targets) == ["m-stale", "run-stale"]
+    assert os.path.exists(mlruns / "0" / "run-stale"), "预览模式不应删除"
+
+    archive = tmp_path / "archive"
+    compact_mlruns(str(mlruns), archive_dir=str(archive), apply=True, index=index)
+    assert not os.path.exists(mlruns / "0" / "run-stale")
+    assert os.path.exists(archive / "0" / "run-stale")
+    assert os.path.exists(archive / "0" / "models" / "m-stale")
+    assert os.path.exists(kept_model)
+
+
+def test_compact_keeps_fallback_and_related_runs(tmp_path, monkeypatch):
+    """
+    current_model.md、MODEL_PATH、MLflow注册表引用的run，被引用run的父run（sweep）
+    和产出的模型目录都不清理
+    """
+    import ml.registry as registry
+
+    mlruns = tmp_path / "mlruns"
+    indexed_model = make_model_dir(str(mlruns / "0" / "models"), "m-indexed")
+    for run_id in ("run-legacy", "run-env", "run-registered", "run-child"):
+        os.makedirs(mlruns / "0" / run_id / "artifacts")
+    os.makedirs(mlruns / "0" / "run-sweep")
+    os.makedirs(mlruns / "0" / "run-stale")
+    (mlruns / "0" / "run-child" / "tags").mkdir()
+    (mlruns / "0" / "run-child" / "tags" / "mlflow.parentRunId").write_text("run-sweep")
+    make_model_dir(str(mlruns / "0" / "models"), "m-child")
+    (mlruns / "0" / "models" / "m-child" / "meta.yaml").write_text(
+        "source_run_id: run-child\n"
+    )
+    make_model_dir(str(mlruns / "0" / "models"), "m-stale")
+    version_dir = mlruns / "models" / "Iris-Baseline-Model" / "version-1"
+    version_dir.mkdir(parents=True)
+    (version_dir / "meta.yaml").write_text("run_id: run-registered\nversion: 1\n")
+
+    # current_model.md里可能是训练机上的Windows绝对路径
+    monkeypatch.setattr(
+        registry,
+        "read_current_model_path",
+        lambda: r"C:\Users\me\iris\mlruns\0\run-legacy\artifacts\baseline_model",
+    )
+    monkeypatch.setenv(
+        "MODEL_PATH", str(mlruns / "0" / "run-env" / "artifacts" / "model")
+    )
+    index = {
+        "models": {
+            "Iris-Production-Model": {
+                "latest_version": "1",
+                "stages": {},
+                "versions": {"1": {"path": indexed_model, "run_id": "run-child"}},
+            }
+        }
+    }
+
+    targets = compact_mlruns(str(mlruns), apply=True, index=index)
+    assert sorted(os.path.basename(t) for t in targets) == ["m-stale", "run-stale"]
+    for kept in ("run-legacy", "run-env", "run-registered", "run-child", "run-sweep"):
+        assert os.path.exists(mlruns / "0" / kept), f"{kept}不应被清理"
+    assert os.path.exists(mlruns / "0" / "models" / "m-child")
+    assert os.path.exists(indexed_model)
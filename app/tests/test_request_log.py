@@ -0,0 +1,104 @@
+import gzip
+import json
+import os
+import sys
+import numpy as np
+
+# 核心：按项目根目录名称定位，确保导入正确
+current_script_path = os.path.abspath(__file__)
+project_root = current_script_path
+while "iris-classification-app" not in os.path.basename(project_root):
+    project_root = os.path.dirname(project_root)
+    if project_root == os.path.dirname(project_root):
+        raise FileNotFoundError(
+            "未找到项目根目录 'iris-classification-app'，请确认目录名称正确"
+        )
+sys.path.insert(0, project_root)
+
+from app.request_log import RequestLogger
+
+SAMPLE = {
+    "sepal_length": 5.1,
+    "sepal_width": 3.5,
+    "petal_length": 1.4,
+    "petal_width": 0.2,
+}
+
+
+def read_records(directory):
+    records = []
+    for name in sorted(os.listdir(directory)):
+        with gzip.open(os.path.join(directory, name), "rt", encoding="utf-8") as f:
+            records += [json.loads(line) for line in f]
+    return records
+
+
+def test_logger_writes_compressed_jsonl(tmp_path):
+    """记录经写线程批量压缩写出，关闭时写完剩余记录；NumPy标签可正常序列化"""
+    logger = RequestLogger(str(tmp_path), flush_interval=0.05)
+    logger.log("/predict", SAMPLE, 200, "m:v1", np.int64(0))
+    logger.log("/predict/batch", [SAMPLE, {}], 200, "m:v1", [0, None])
+    logger.log("/predict", {}, 400)
+    logger.close()
+
+    records = read_records(tmp_path)
+    assert [r["endpoint"] for r in records] == [
+        "/predict",
+        "/predict/batch",
+        "/predict",
+    ]
+    assert records[0]["body"] == SAMPLE and records[0]["predicted"] == 0
+    assert records[1]["predicted"] == [0, None] and records[2]["status"] == 400
+    assert logger.stats()["written_records"] == 3
+
+
+def test_logger_rotates_and_drops(tmp_path):
+    """超过大小上限后轮转到新文件；队列满时丢弃新记录并计数，不阻塞"""
+    logger = RequestLogger(
+        str(tmp_path), max_bytes=1, queue_size=2, flush_interval=3600
+    )
+    assert [logger.log("/predict", SAMPLE, 200) for _ in range(3)] == [
+        True,
+        True,
+        False,
+    ]
+    logger.flush()
+    logger.log("/predict", SAMPLE, 200)
+    logger.flush()
+    logger.close()
+
+    assert len(os.listdir(tmp_path)) == 2
+    assert len(read_records(tmp_path)) == 3
+    stats = logger.stats()
+    assert stats["dropped"] == 1 and stats["rotations"] == 1
+
+
+def test_logger_bounds_queued_records(tmp_path):
+    """队列按记录数限制：批量请求按行数计，超出额度时整条丢弃，写出后额度释放"""
+    logger = RequestLogger(str(tmp_path), max_queued_records=5, flush_interval=3600)
+    assert logger.log("/predict/batch", [SAMPLE] * 4, 200) is True
+    assert logger.log("/predict/batch", [SAMPLE] * 2, 200) is False
+    assert logger.log("/predict", SAMPLE, 200) is True
+    stats = logger.stats()
+    assert stats["queued_records"] == 5
+    assert stats["dropped"] == 1 and stats["dropped_records"] == 2
+    logger.flush()
+    assert logger.stats()["queued_records"] == 0
+    assert logger.log("/predict/batch", [SAMPLE] * 2, 200) is True
+    logger.close()
+    assert [len(r["body"]) for r in read_records(tmp_path)] == [4, 4, 2]
+
+
+def test_logger_counts_write_failures_separately(tmp_path):
+    """写文件失败的记录计入failed_records，不计入入队时的丢弃数"""
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+    logger = RequestLogger(str(blocker), flush_interval=3600)
+    assert logger.log("/predict/batch", [SAMPLE] * 3, 200) is True
+    assert logger.log("/predict", SAMPLE, 200) is True
+    logger.flush()
+    logger.close()
+    stats = logger.stats()
+    assert stats["write_errors"] == 1 and stats["failed_records"] == 2
+    assert stats["dropped"] == 0 and stats["dropped_records"] == 0
+    assert stats["queued_records"] == 0
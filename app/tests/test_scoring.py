@@ -0,0 +1,116 @@
+import os
+import sys
+import glob
+import numpy as np
+import pandas as pd
+import pytest
+import mlflow.sklearn
+
+# 核心：按项目根目录名称定位，确保导入正确
+current_script_path = os.path.abspath(__file__)
+project_root = current_script_path
+while "iris-classification-app" not in os.path.basename(project_root):
+    project_root = os.path.dirname(project_root)
+    if project_root == os.path.dirname(project_root):
+        raise FileNotFoundError(
+            "未找到项目根目录 'iris-classification-app'，请确认目录名称正确"
+        )
+sys.path.insert(0, project_root)
+
+from ml.scoring import LinearScorer, export_artifact, load_artifact, save_artifact
+
+FEATURE_COLUMNS = ["sepal_length", "sepal_width", "petal_length", "petal_width"]
+# mlruns下所有MLflow模型目录（以MLmodel文件为标志）
+MODEL_DIRS = sorted(
+    os.path.dirname(p)
+    for p in glob.glob(
+        os.path.join(project_root, "mlruns", "**", "MLmodel"), recursive=True
+    )
+)
+
+
+def make_inputs():
+    """构造覆盖鸢尾花取值范围及范围外的随机样本"""
+    rng = np.random.default_rng(0)
+    uniform = rng.uniform(0.0, 8.0, size=(5000, 4))
+    # 0.1cm精度的样本（与真实流量一致）
+    rounded = np.round(rng.uniform(0.1, 7.9, size=(5000, 4)), 1)
+    return np.vstack([uniform, rounded])
+
+
+@pytest.mark.parametrize("model_dir", MODEL_DIRS)
+def test_scorer_parity(model_dir):
+    """打分器标签需与model.predict逐位一致，概率与predict_proba一致"""
+    model = mlflow.sklearn.load_model(model_dir)
+    scorer = LinearScorer.from_model(model)
+    X = make_inputs()
+    X_df = pd.DataFrame(X, columns=FEATURE_COLUMNS)
+
+    expected = model.predict(X_df)
+    actual = scorer.predict(X)
+    assert np.array_equal(expected, actual), f"{model_dir} 标签与model.predict不一致"
+    assert actual.dtype == expected.dtype
+
+    labels, proba = scorer.predict_with_proba(X)
+    assert np.array_equal(labels, expected)
+    np.testing.assert_allclose(proba, model.predict_proba(X_df), rtol=1e-12, atol=0)
+
+    for row, label in zip(X[:50], expected[:50]):
+        assert scorer.predict_one(list(row)) == label
+
+
+@pytest.mark.parametrize("multi_class", ["auto", "ovr", "multinomial"])
+def test_scorer_binary_parity(multi_class):
+    """二分类模型：multinomial时概率为softmax([-d, d])，与predict_proba一致"""
+    from sklearn.datasets import load_iris
+    from sklearn.linear_model import LogisticRegression
+
+    X, y = load_iris(return_X_y=True)
+    mask = y > 0  # versicolor / virginica，线性不可分，概率不会饱和
+    model = LogisticRegression(multi_class=multi_class, max_iter=1000)
+    model.fit(X[mask], y[mask])
+    scorer = LinearScorer.from_model(model)
+    X_test = make_inputs()
+
+    labels, proba = scorer.predict_with_proba(X_test)
+    assert np.array_equal(labels, model.predict(X_test))
+    np.testing.assert_allclose(
+        proba, model.predict_proba(X_test), rtol=1e-12, atol=1e-15
+    )
+
+
+def test_scorer_rejects_wrong_shape():
+    """特征数不匹配时报错"""
+    scorer = LinearScorer(np.ones((3, 4)), np.zeros(3), np.array([0, 1, 2]))
+    with pytest.raises(ValueError):
+        scorer.predict(np.ones((2, 3)))
+
+
+def test_artifact_roundtrip(tmp_path):
+    """精简产物导出后重新加载，预测结果与原模型一致"""
+    model = mlflow.sklearn.load_model(MODEL_DIRS[0])
+    species_map = {0: "setosa", 1: "versicolor", 2: "virginica"}
+    artifact_path = str(tmp_path / "model.npz")
+    checksum = export_artifact(model, artifact_path, FEATURE_COLUMNS, species_map)
+
+    scorer, meta = load_artifact(artifact_path)
+    assert meta["checksum"] == checksum
+    assert meta["feature_names"] == FEATURE_COLUMNS
+    assert meta["species_map"] == species_map
+    X = make_inputs()
+    expected = model.predict(pd.DataFrame(X, columns=FEATURE_COLUMNS))
+    assert np.array_equal(scorer.predict(X), expected)
+
+
+def test_artifact_checksum_mismatch(tmp_path):
+    """产物内容被篡改时拒绝加载"""
+    scorer = LinearScorer(np.ones((3, 4)), np.zeros(3), np.array([0, 1, 2]))
+    artifact_path = str(tmp_path / "model.npz")
+    export_path = str(tmp_path / "tampered.npz")
+    save_artifact(scorer, artifact_path, FEATURE_COLUMNS, {0: "a", 1: "b", 2: "c"})
+    with np.load(artifact_path) as data:
+        arrays = {k: data[k] for k in data.files}
+    arrays["coef"] = arrays["coef"] * 2
+    np.savez(export_path, **arrays)
+    with pytest.raises(ValueError):
+        load_artifact(export_path)
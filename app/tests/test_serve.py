@@ -0,0 +1,87 @@
+import gzip
+import os
+import signal
+import sys
+import time
+import urllib.request
+import numpy as np
+import pytest
+
+# 核心：按项目根目录名称定位，确保导入正确
+current_script_path = os.path.abspath(__file__)
+project_root = current_script_path
+while "iris-classification-app" not in os.path.basename(project_root):
+    project_root = os.path.dirname(project_root)
+    if project_root == os.path.dirname(project_root):
+        raise FileNotFoundError(
+            "未找到项目根目录 'iris-classification-app'，请确认目录名称正确"
+        )
+sys.path.insert(0, project_root)
+
+from app.request_log import RequestLogger
+from app.serve import create_listen_socket, detect_cpu_count, share_scorer, spawn_worker
+from ml.scoring import LinearScorer
+
+
+def test_detect_cpu_count():
+    """自动确定的worker数不小于1，且不超过本机可用CPU数"""
+    count = detect_cpu_count()
+    assert 1 <= count <= (os.cpu_count() or 1)
+
+
+def test_share_scorer_is_readonly_and_equivalent():
+    """共享内存中的打分器与原打分器结果一致，且权重只读"""
+    rng = np.random.default_rng(0)
+    scorer = LinearScorer(rng.normal(size=(3, 4)), rng.normal(size=3), np.arange(3))
+    shm, shared = share_scorer(scorer)
+    try:
+        X = rng.uniform(0, 8, size=(100, 4))
+        assert np.array_equal(shared.predict(X), scorer.predict(X))
+        assert np.shares_memory(
+            shared.coef,
+            np.ndarray(shared.coef.shape, dtype=shared.coef.dtype, buffer=shm.buf),
+        ), "打分器应直接使用共享内存中的权重"
+        with pytest.raises(ValueError):
+            shared.coef[0, 0] = 1.0
+    finally:
+        del shared
+        shm.close()
+        shm.unlink()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="需要fork")
+def test_worker_flushes_request_log_on_sigterm(tmp_path):
+    """worker收到SIGTERM时先调用on_exit写出请求日志，再退出（写线程间隔很长，只能靠退出时写出）"""
+    from flask import Flask
+
+    logger = RequestLogger(str(tmp_path), flush_interval=3600)
+    flask_app = Flask(__name__)
+
+    @flask_app.route("/ping")
+    def ping():
+        logger.log("/ping", {"n": 1}, 200)
+        return "ok"
+
+    sock = create_listen_socket("127.0.0.1", 0)
+    port = sock.getsockname()[1]
+    pid = spawn_worker(flask_app, sock, on_exit=logger.close)
+    try:
+        deadline = time.time() + 10
+        while True:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/ping", timeout=1)
+                break
+            except OSError:
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.05)
+        os.kill(pid, signal.SIGTERM)
+        _, status = os.waitpid(pid, 0)
+    finally:
+        sock.close()
+        logger.close()
+    assert os.waitstatus_to_exitcode(status) == 0
+    names = os.listdir(tmp_path)
+    assert len(names) == 1
+    with gzip.open(os.path.join(tmp_path, names[0]), "rt", encoding="utf-8") as f:
+        assert '"endpoint": "/ping"' in f.read()
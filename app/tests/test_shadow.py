@@ -0,0 +1,109 @@
+import os
+import sys
+import threading
+import time
+import numpy as np
+
+# 核心：按项目根目录名称定位，确保导入正确
+current_script_path = os.path.abspath(__file__)
+project_root = current_script_path
+while "iris-classification-app" not in os.path.basename(project_root):
+    project_root = os.path.dirname(project_root)
+    if project_root == os.path.dirname(project_root):
+        raise FileNotFoundError(
+            "未找到项目根目录 'iris-classification-app'，请确认目录名称正确"
+        )
+sys.path.insert(0, project_root)
+
+from app.model_manager import ModelHandle
+from app.shadow import ShadowEvaluator
+from ml.scoring import LinearScorer
+
+SPECIES_MAP = {0: "setosa", 1: "versicolor", 2: "virginica"}
+
+
+def make_handle(version, always=None):
+    """按花瓣长度区分三类；always指定时全部预测为该类别"""
+    if always is None:
+        coef = np.array([[0, 0, -10.0, 0], [0, 0, 0, 0], [0, 0, 10.0, 0]])
+        intercept = np.array([30.0, 0.0, -50.0])
+    else:
+        coef, intercept = np.zeros((3, 4)), np.eye(3)[always]
+    scorer = LinearScorer(coef, intercept, np.array([0, 1, 2]))
+    return ModelHandle(scorer, SPECIES_MAP, version, "")
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "等待影子任务处理超时"
+        time.sleep(0.01)
+
+
+def test_shadow_agreement_and_confusion():
+    """候选模型在后台打分，按 (主模型, 候选模型) 统计一致率和混淆计数"""
+    primary = make_handle("v1")
+    candidates = [make_handle("v2"), make_handle("v3", always=0)]
+    shadow = ShadowEvaluator(lambda: candidates, poll_interval=0.01)
+    rows = [[5.1, 3.5, 1.4, 0.2], [6.0, 2.8, 4.5, 1.5], [6.5, 3.0, 5.5, 2.0]]
+    shadow.submit(rows[:1], primary.scorer.predict(rows[:1]), primary.version)
+    shadow.submit(rows[1:], primary.scorer.predict(rows[1:]), primary.version)
+    wait_for(lambda: shadow.stats()["processed_rows"] == 3)
+
+    same, setosa = shadow.stats(SPECIES_MAP)["comparisons"]
+    assert (same["candidate_version"], same["agreement_rate"]) == ("v2", 1.0)
+    assert setosa["total"] == 3 and setosa["agree"] == 1
+    assert setosa["confusion"] == {
+        "setosa": {"setosa": 1},
+        "versicolor": {"setosa": 1},
+        "virginica": {"setosa": 1},
+    }
+
+
+def test_shadow_drops_when_queue_full():
+    """worker处理不过来时丢弃新的影子任务并计数，submit从不阻塞"""
+    release = threading.Event()
+    candidate = make_handle("v2")
+
+    def get_candidates():
+        release.wait()
+        return [candidate]
+
+    shadow = ShadowEvaluator(get_candidates, queue_size=2, poll_interval=0.01)
+    row = [[5.1, 3.5, 1.4, 0.2]]
+    shadow.submit(row, [0], "v1")
+    wait_for(lambda: shadow.stats()["queue_depth"] == 0)  # worker已取走并阻塞
+
+    accepted = [shadow.submit(row, [0], "v1") for _ in range(5)]
+    assert accepted == [True, True, False, False, False]
+    assert shadow.stats()["dropped"] == 3
+
+    release.set()
+    wait_for(lambda: shadow.stats()["processed_rows"] == 3)
+
+
+def test_shadow_bounds_queued_rows():
+    """队列按行数限制：大批量只保留额度内的前几行，额度用完后整批丢弃"""
+    release = threading.Event()
+    candidate = make_handle("v2")
+
+    def get_candidates():
+        release.wait()
+        return [candidate]
+
+    shadow = ShadowEvaluator(
+        get_candidates, max_queued_rows=100, max_batch_rows=10, poll_interval=0.01
+    )
+    shadow.submit(np.ones((1, 4)), [0], "v1")
+    wait_for(lambda: shadow.stats()["queue_depth"] == 0)  # worker已取走并阻塞
+
+    big = np.tile([5.1, 3.5, 1.4, 0.2], (70, 1))
+    assert shadow.submit(big, np.zeros(70, dtype=int), "v1")
+    assert shadow.submit(big, np.zeros(70, dtype=int), "v1")  # 只保留30行
+    assert not shadow.submit(big[:1], [0], "v1")
+    stats = shadow.stats()
+    assert stats["queued_rows"] == 100 and stats["dropped_rows"] == 41
+
+    release.set()
+    wait_for(lambda: shadow.stats()["processed_rows"] == 101)
+    assert shadow.stats()["queued_rows"] == 0
@@ -0,0 +1,142 @@
+import os
+import sys
+import threading
+import numpy as np
+import pandas as pd
+import pytest
+
+# 核心：按项目根目录名称定位，确保导入正确
+current_script_path = os.path.abspath(__file__)
+project_root = current_script_path
+while "iris-classification-app" not in os.path.basename(project_root):
+    project_root = os.path.dirname(project_root)
+    if project_root == os.path.dirname(project_root):
+        raise FileNotFoundError(
+            "未找到项目根目录 'iris-classification-app'，请确认目录名称正确"
+        )
+sys.path.insert(0, project_root)
+
+from app.model_manager import ModelHandle
+from app.socket_client import (
+    FRAME,
+    OP_PING,
+    OP_PREDICT,
+    Connection,
+    PredictionClient,
+    ServerError,
+)
+from app.socket_server import PredictionServer
+from app.binary_format import decode_labels, encode
+from ml.scoring import LinearScorer
+
+
+@pytest.fixture(scope="module")
+def served(tmp_path_factory):
+    """用原始数据训练的打分器启动服务，同时监听Unix域套接字和TCP（端口由系统分配）"""
+    from sklearn.linear_model import LogisticRegression
+
+    df = pd.read_csv(
+        os.path.join(project_root, "data", "raw", "iris_v1.csv"), header=None
+    )
+    X = df.iloc[:, :4].to_numpy(dtype=np.float64)
+    y = pd.factorize(df[4])[0].astype(np.int64)
+    scorer = LinearScorer.from_model(LogisticRegression(max_iter=500).fit(X, y))
+    handle = ModelHandle(
+        scorer, {0: "setosa", 1: "versicolor", 2: "virginica"}, "1", ""
+    )
+    server = PredictionServer(lambda: handle)
+    unix = server.listen(f"unix:{tmp_path_factory.mktemp('sock') / 'iris.sock'}")
+    tcp = server.listen("127.0.0.1:0")
+    yield server, [unix, tcp], X, scorer.predict(X)
+    server.close()
+
+
+def test_socket_predict(served):
+    """两种传输上的单条/批量/流水线/并发单条预测都与模型一致"""
+    server, addresses, X, expected = served
+    for address in addresses:
+        client = PredictionClient(address, pool_size=2)
+        assert client.ping() == "1"
+        assert client.predict(X).tolist() == expected.tolist()
+        assert (
+            client.predict(X.astype(np.float32)[:10]).tolist() == expected[:10].tolist()
+        )
+        chunks = client.predict_many([X[:50], X[50:51], X[51:]])
+        assert np.concatenate(chunks).tolist() == expected.tolist()
+
+        labels = [None] * len(X)
+
+        def run(rows):
+            for i in rows:
+                labels[i] = client.predict_one(X[i])
+
+        threads = [
+            threading.Thread(target=run, args=(range(k, len(X), 8),)) for k in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert labels == expected.tolist()
+        client.close()
+    assert server.stats()["rows"] >= 4 * len(X)
+
+
+def test_socket_errors(served):
+    """格式错误的请求返回错误帧，连接仍可继续使用；流水线中的坏请求不影响同组其他请求"""
+    server, addresses, X, expected = served
+    connection = Connection(addresses[0])
+    with pytest.raises(ServerError, match="列数"):
+        connection.request(OP_PREDICT, encode(X[:, :3]))
+    bad = X[:2].copy()
+    bad[1, 0] = np.nan
+    ids = [connection.send(OP_PREDICT, encode(m)) for m in (X[:3], bad, X[3:5])]
+    assert connection.receive(ids[0]) is not None
+    with pytest.raises(ServerError, match="非有限值"):
+        connection.receive(ids[1])
+    assert connection.receive(ids[2]) is not None
+    with pytest.raises(ServerError, match="操作码"):
+        connection.request(99)
+    assert connection.request(OP_PING) == b"1"
+    connection.close()
+
+
+def test_socket_pipeline_large_payloads(served):
+    """大矩阵流水线边发边读，不会因双方套接字缓冲区写满而互相等待到超时"""
+    server, addresses, X, expected = served
+    rows, labels = np.tile(X, (150, 1)), np.tile(expected, 150)  # 每个矩阵约720KB
+    for address in addresses:
+        connection = Connection(address, timeout=5.0)
+        responses = connection.pipeline([encode(rows)] * 40)
+        assert len(responses) == 40
+        assert all(np.array_equal(decode_labels(r), labels) for r in responses)
+        # 错误响应不打断流水线：读完全部响应后抛出，连接仍可使用
+        with pytest.raises(ServerError, match="列数"):
+            connection.pipeline([encode(X), encode(X[:, :3]), encode(X)])
+        assert connection.request(OP_PING) == b"1"
+        connection.close()
+
+
+def test_socket_oversized_frame_answers_parsed_frames(served):
+    """超长帧之前已完整收到的请求照常答复，超长帧回错误帧后断开连接"""
+    server, addresses, X, expected = served
+    small = PredictionServer(server._get_handle, max_payload=4096)
+    address = small.listen("127.0.0.1:0")
+    try:
+        connection = Connection(address)
+        payload = encode(X[:5])
+        data = b"".join(
+            FRAME.pack(len(payload), i, OP_PREDICT) + payload for i in (1, 2)
+        )
+        connection.sock.sendall(data + FRAME.pack(8192, 3, OP_PREDICT))
+        for request_id in (1, 2):
+            assert decode_labels(connection.receive(request_id)).tolist() == (
+                expected[:5].tolist()
+            )
+        with pytest.raises(ServerError, match="上限"):
+            connection.receive(3)
+        with pytest.raises(ConnectionError):
+            connection.receive(4)
+        connection.close()
+    finally:
+        small.close()
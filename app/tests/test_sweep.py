@@ -0,0 +1,105 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# 核心：按项目根目录名称定位，确保导入正确
+current_script_path = os.path.abspath(__file__)
+project_root = current_script_path
+while "iris-classification-app" not in os.path.basename(project_root):
+    project_root = os.path.dirname(project_root)
+    if project_root == os.path.dirname(project_root):
+        raise FileNotFoundError(
+            "未找到项目根目录 'iris-classification-app'，请确认目录名称正确"
+        )
+sys.path.insert(0, project_root)
+
+from ml.train import (
+    expand_search_space,
+    load_fold_assignments,
+    run_cv,
+    run_sweep,
+    run_sweep_sequential,
+    select_cv_best,
+    summarize_cv,
+)
+
+
+def test_expand_search_space():
+    grid = expand_search_space({"space": {"C": [0.1, 1.0], "max_iter": [100, 200]}})
+    assert len(grid) == 4
+    assert {"C": 1.0, "max_iter": 200} in grid
+
+    space = {"C": {"low": 0.01, "high": 100, "log": True}, "solver": ["lbfgs"]}
+    sampled = expand_search_space(
+        {"strategy": "random", "n_iter": 5, "seed": 1, "space": space}
+    )
+    assert len(sampled) == 5
+    assert all(0.01 <= p["C"] <= 100 and p["solver"] == "lbfgs" for p in sampled)
+    # 相同种子结果可复现
+    assert sampled == expand_search_space(
+        {"strategy": "random", "n_iter": 5, "seed": 1, "space": space}
+    )
+
+
+def test_parallel_sweep_matches_sequential():
+    """共享内存并行搜索与主进程串行搜索的结果须一致，且按候选顺序返回"""
+    df = pd.read_csv(
+        os.path.join(project_root, "data", "raw", "iris_v1.csv"), header=None
+    )
+    X = df.iloc[:, :4].to_numpy(dtype=np.float64)
+    y = pd.factorize(df[4])[0].astype(np.int64)
+    arrays = {
+        "X_train": X[::2],
+        "X_test": X[1::2],
+        "y_train": y[::2],
+        "y_test": y[1::2],
+    }
+    candidates = expand_search_space(
+        {"space": {"C": [0.01, 1.0, 10.0], "max_iter": [200]}}
+    )
+    candidates.append({"C": 1.0, "solver": "no-such-solver"})
+
+    parallel, _ = run_sweep(candidates, arrays, workers=2)
+    sequential, _ = run_sweep_sequential(candidates, arrays)
+    assert [r["index"] for r in parallel] == list(range(len(candidates)))
+    assert "error" in parallel[-1]
+    for a, b in zip(parallel[:-1], sequential[:-1]):
+        assert a["params"] == b["params"]
+        assert a["test_accuracy"] == b["test_accuracy"]
+
+
+def test_parallel_cv_matches_sklearn(tmp_path):
+    """并行交叉验证的各折准确率与sklearn的cross_val_score一致，折划分按数据哈希缓存"""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import StratifiedKFold, cross_val_score
+
+    df = pd.read_csv(
+        os.path.join(project_root, "data", "raw", "iris_v1.csv"), header=None
+    )
+    X = df.iloc[:, :4].to_numpy(dtype=np.float64)
+    y = pd.factorize(df[4])[0].astype(np.int64)
+
+    folds, hit = load_fold_assignments(y, "abc", 5, 2, 42, cache_dir=str(tmp_path))
+    assert not hit and folds.shape == (2, len(y))
+    # 每次重复中每行恰好属于一折，且各折类别分布均衡
+    assert all(np.bincount(f).tolist() == [len(y) // 5] * 5 for f in folds)
+    cached, hit = load_fold_assignments(y, "abc", 5, 2, 42, cache_dir=str(tmp_path))
+    assert hit and np.array_equal(cached, folds)
+
+    candidates = [{"C": 1.0, "max_iter": 200}, {"C": 0.01, "max_iter": 200}]
+    candidates.append({"C": 1.0, "solver": "no-such-solver"})
+    fold_results, _ = run_cv(candidates, X, y, folds, workers=2)
+    assert len(fold_results) == len(candidates) * 2 * 5
+    summaries = summarize_cv(candidates, fold_results)
+    assert "error" in summaries[-1]
+
+    expected = cross_val_score(
+        LogisticRegression(**candidates[0]),
+        X,
+        y,
+        cv=StratifiedKFold(5, shuffle=True, random_state=42),
+    )
+    assert np.allclose(summaries[0]["fold_accuracy"][:5], expected)
+    assert select_cv_best(summaries)["index"] == 0
+    assert np.isclose(summaries[0]["std_accuracy"] ** 2, summaries[0]["var_accuracy"])
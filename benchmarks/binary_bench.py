@@ -0,0 +1,123 @@
+# benchmarks/binary_bench.py
+# /predict/batch 的JSON与二进制请求格式对比（进程内test_client，不经过网络）：
+#   同样的行数分别以JSON数组和二进制矩阵（float32/float64）提交，比较单次请求耗时、每行耗时和请求体大小；
+#   二进制格式另测超出JSON批量上限（MAX_BATCH_SIZE）的大批量
+# 用法：python benchmarks/binary_bench.py [--rows 1000 10000] [--large-rows 100000 1000000]
+#                                        [--repeat 5] [--json 输出文件]
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+BINARY = "application/octet-stream"
+
+
+def make_rows(n, seed=0):
+    """在鸢尾花特征的取值范围内随机生成n行（保留1位小数）"""
+    rng = np.random.default_rng(seed)
+    low = np.array([4.3, 2.0, 1.0, 0.1])
+    high = np.array([7.9, 4.4, 6.9, 2.5])
+    return np.round(rng.uniform(low, high, size=(n, 4)), 1)
+
+
+def timed(fn, repeat):
+    """返回 (每次耗时中位数秒, 最后一次的响应)"""
+    times, response = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), response
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/predict/batch JSON与二进制格式对比")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--large-rows", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=5, help="每种情况的请求次数")
+    parser.add_argument("--json", dest="json_path", help="结果写入JSON文件")
+    args = parser.parse_args()
+
+    from app.binary_format import decode_labels, encode
+    from app.main import FEATURE_COLUMNS, MAX_BATCH_SIZE, create_app
+
+    client = create_app(background=False).test_client()
+    results = []
+
+    def record(fmt, n, body, fn):
+        seconds, response = timed(fn, args.repeat)
+        assert response.status_code == 200, response.data[:200]
+        results.append(
+            {
+                "format": fmt,
+                "rows": n,
+                "request_bytes": len(body),
+                "seconds": seconds,
+                "us_per_row": seconds / n * 1e6,
+            }
+        )
+        return response
+
+    for n in args.rows:
+        X = make_rows(n)
+        labels = None
+        if n <= MAX_BATCH_SIZE:
+            records = [dict(zip(FEATURE_COLUMNS, row)) for row in X.tolist()]
+            body = json.dumps(records).encode("utf-8")
+            response = record(
+                "json",
+                n,
+                body,
+                lambda: client.post(
+                    "/predict/batch", data=body, content_type="application/json"
+                ),
+            )
+            labels = [r["label"] for r in json.loads(response.data)["results"]]
+        for dtype in (np.float64, np.float32):
+            body = encode(X.astype(dtype))
+            response = record(
+                f"binary_{np.dtype(dtype).name}",
+                n,
+                body,
+                lambda: client.post("/predict/batch", data=body, content_type=BINARY),
+            )
+            # float64矩阵与JSON打分结果逐行一致
+            if labels is not None and dtype is np.float64:
+                assert decode_labels(response.data).tolist() == labels
+    for n in args.large_rows:
+        body = encode(make_rows(n).astype(np.float32))
+        record(
+            "binary_float32",
+            n,
+            body,
+            lambda: client.post("/predict/batch", data=body, content_type=BINARY),
+        )
+
+    print(f"{'格式':<16}{'行数':>10}{'请求体(KB)':>12}{'耗时(ms)':>12}{'每行(us)':>10}")
+    for r in results:
+        print(
+            f"{r['format']:<16}{r['rows']:>10}{r['request_bytes'] / 1024:>12.1f}"
+            f"{r['seconds'] * 1e3:>12.2f}{r['us_per_row']:>10.3f}"
+        )
+
+    if args.json_path:
+        report = {
+            "serving_mode": os.getenv("SERVING_MODE", "mlflow"),
+            "repeat": args.repeat,
+            "results": results,
+        }
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"结果已写入：{args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# benchmarks/dataset_bench.py
+# 对比训练数据的两种加载方式（各在独立子进程中测量耗时和内存增量）：
+#   csv  ：pandas解析清洗后的CSV（二进制数据集出现前的加载方式）→ train_test_split 拷贝出训练/测试集
+#   mmap ：load_dataset() 内存映射二进制数据集 → split_indices 只生成索引 → 按索引取行
+# 用法：python benchmarks/dataset_bench.py [--rows 1000000,5000000] [--feature-dtype float64]
+#       [--json 输出文件]
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from ml.data_pipeline import write_columnar
+
+FEATURE_COLUMNS = ["sepal_length", "sepal_width", "petal_length", "petal_width"]
+
+# 子进程中执行：先导入依赖，以导入后的峰值RSS为基线，只统计加载与划分带来的增量
+CHILD_CODE = """
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from ml.train import FEATURE_COLUMNS, load_dataset, split_indices
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+mode, path = sys.argv[1:3]
+base = rss_mb()
+t0 = time.perf_counter()
+if mode == "csv":
+    df = pd.read_csv(path)
+    t1 = time.perf_counter()
+    X_train, X_test, y_train, y_test = train_test_split(
+        df[FEATURE_COLUMNS], df["species"], test_size=0.2, random_state=42
+    )
+else:
+    X, y = load_dataset(path)
+    t1 = time.perf_counter()
+    train_idx, test_idx = split_indices(len(y), test_size=0.2, random_state=42)
+    X_train = pd.DataFrame(X[train_idx], columns=FEATURE_COLUMNS)
+    X_test = pd.DataFrame(X[test_idx], columns=FEATURE_COLUMNS)
+    y_train, y_test = y[train_idx], y[test_idx]
+t2 = time.perf_counter()
+print("__BENCH__" + json.dumps({{
+    "load_seconds": t1 - t0,
+    "split_seconds": t2 - t1,
+    "total_seconds": t2 - t0,
+    "rss_delta_mb": rss_mb() - base,
+}}))
+"""
+
+
+def generate_dataset(tmp_dir, rows, feature_dtype, seed=0):
+    """生成清洗后格式的数据，分别写成CSV和二进制数据集"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        np.round(rng.uniform(0.1, 7.9, size=(rows, 4)), 1), columns=FEATURE_COLUMNS
+    )
+    df["species"] = rng.integers(0, 3, size=rows)
+    csv_path = os.path.join(tmp_dir, f"data_{rows}.csv")
+    bin_path = os.path.join(tmp_dir, f"data_{rows}.bin")
+    df.to_csv(csv_path, index=False, header=True)
+    write_columnar([df], bin_path, feature_dtype)
+    return {"csv": csv_path, "mmap": bin_path}
+
+
+def run_once(mode, path):
+    proc = subprocess.run(
+        [sys.executable, "-c", CHILD_CODE.format(root=PROJECT_ROOT), mode, path],
+        capture_output=True,
+        text=True,
+        env=dict(os.environ, MLFLOW_DISABLE_AGENT_HINT="1"),
+    )
+    for line in proc.stdout.splitlines():
+        if line.startswith("__BENCH__"):
+            return json.loads(line[len("__BENCH__") :])
+    raise RuntimeError(f"{mode}模式执行失败：\n{proc.stdout}\n{proc.stderr}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="训练数据加载耗时/内存基准")
+    parser.add_argument("--rows", default="1000000,5000000", help="逗号分隔的行数")
+    parser.add_argument(
+        "--feature-dtype", choices=["float64", "float32"], default="float64"
+    )
+    parser.add_argument("--json", dest="json_path", help="结果写入JSON文件")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for rows in (int(float(r)) for r in args.rows.split(",")):
+            paths = generate_dataset(tmp_dir, rows, args.feature_dtype)
+            for mode, path in paths.items():
+                r = run_once(mode, path)
+                results.append(
+                    dict(r, mode=mode, rows=rows, file_mb=os.path.getsize(path) / 2**20)
+                )
+            for path in paths.values():
+                os.remove(path)
+
+    print(
+        f"{'模式':<6}{'行数':>10}{'文件MB':>9}{'加载(s)':>10}{'划分(s)':>10}"
+        f"{'合计(s)':>10}{'内存增量MB':>12}"
+    )
+    for r in results:
+        print(
+            f"{r['mode']:<6}{r['rows']:>10}{r['file_mb']:>9.1f}{r['load_seconds']:>10.4f}"
+            f"{r['split_seconds']:>10.4f}{r['total_seconds']:>10.4f}"
+            f"{r['rss_delta_mb']:>12.1f}"
+        )
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"结果已写入：{args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,401 @@
+# benchmarks/load_test.py
+# HTTP压测：本地启动 app/main.py，按指定并发/速率回放NDJSON请求或合成鸢尾花流量，
+# 按服务模式×接口统计吞吐与p50/p95/p99/p999延迟，结果写JSON，可与基线对比发现性能回退
+# 用法：
+#   python benchmarks/load_test.py --modes mlflow,artifact --endpoints predict,batch \
+#       --concurrency 8 --duration 10 [--rate 500] [--replay 请求.ndjson] \
+#       [--json 结果.json] [--baseline 基线.json --tolerance 0.1]
+#   准入控制：--admission 启动服务时开启（ADMISSION_*环境变量可调），--deadline-ms 每个请求带截止时间；
+#   被拒绝的请求（429/503）单独计为shed，不计入错误数和延迟分位数
+#   压测已在运行的服务：--url http://127.0.0.1:5000（此时忽略--modes）
+import argparse
+import gzip
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+import numpy as np
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+FEATURE_COLUMNS = ["sepal_length", "sepal_width", "petal_length", "petal_width"]
+ENDPOINTS = {
+    "predict": "/predict",
+    "batch": "/predict/batch",
+    "stream": "/predict/stream",
+}
+PERCENTILES = {"p50": 50, "p95": 95, "p99": 99, "p999": 99.9}
+
+
+# --------------------------
+# 流量来源
+# --------------------------
+def synthetic_record(rng):
+    """合成一条0.1cm精度的鸢尾花特征（取值范围覆盖三个品种）"""
+    return {
+        "sepal_length": round(rng.uniform(4.3, 7.9), 1),
+        "sepal_width": round(rng.uniform(2.0, 4.4), 1),
+        "petal_length": round(rng.uniform(1.0, 6.9), 1),
+        "petal_width": round(rng.uniform(0.1, 2.5), 1),
+    }
+
+
+def load_replay(path):
+    """
+    读取NDJSON回放文件，每行可以是：
+    - 特征对象 {"sepal_length": ...}（按/predict回放）
+    - {"endpoint": "/predict/batch", "body": ...}（按原接口和请求体回放）
+    .gz文件按gzip读取（可直接回放服务写出的请求日志）
+    返回 {接口路径: [请求体字节串, ...]}
+    """
+    bodies = {}
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, dict) and "endpoint" in record:
+                path_, body = record["endpoint"], record.get("body")
+            else:
+                path_, body = "/predict", record
+            bodies.setdefault(path_, []).append(json.dumps(body).encode("utf-8"))
+    return bodies
+
+
+def synthetic_bodies(endpoint, count, batch_size, seed=0):
+    """为指定接口预先生成count个请求体（压测过程中不再做序列化）"""
+    rng = random.Random(seed)
+    bodies = []
+    for _ in range(count):
+        if endpoint == "/predict":
+            body = json.dumps(synthetic_record(rng))
+        elif endpoint == "/predict/batch":
+            body = json.dumps([synthetic_record(rng) for _ in range(batch_size)])
+        else:
+            body = "\n".join(
+                json.dumps(synthetic_record(rng)) for _ in range(batch_size)
+            )
+        bodies.append(body.encode("utf-8"))
+    return bodies
+
+
+# --------------------------
+# 被测服务
+# --------------------------
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(base_url, proc=None, timeout=120):
+    """轮询/readyz直到模型就绪；子进程提前退出或模型加载失败（/healthz 500）时立即报错"""
+    deadline = time.monotonic() + timeout
+    parsed = urllib.parse.urlparse(base_url)
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"服务启动失败（退出码{proc.returncode}）")
+        try:
+            conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=2)
+            conn.request("GET", "/readyz")
+            response = conn.getresponse()
+            body = response.read()
+            if response.status == 200:
+                return
+            conn.request("GET", "/healthz")
+            if conn.getresponse().status == 500:
+                raise RuntimeError(f"服务模型加载失败：{body.decode('utf-8')}")
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"服务在{timeout}s内未就绪：{base_url}")
+
+
+def start_server(mode, extra_env=None):
+    """以指定SERVING_MODE启动 app/main.py 子进程，返回 (进程, 基础URL)"""
+    port = free_port()
+    env = dict(
+        os.environ,
+        SERVING_MODE=mode,
+        PORT=str(port),
+        MLFLOW_DISABLE_AGENT_HINT="1",
+        **(extra_env or {}),
+    )
+    # 服务输出（含每个请求的访问日志）写临时文件，启动失败时打印末尾便于排查
+    log = tempfile.TemporaryFile(mode="w+")
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join("app", "main.py")],
+        cwd=PROJECT_ROOT,
+        env=env,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_ready(base_url, proc)
+    except Exception:
+        proc.kill()
+        log.seek(0)
+        print("".join(log.readlines()[-20:]))
+        raise
+    return proc, base_url
+
+
+# --------------------------
+# 压测执行
+# --------------------------
+def run_load(
+    base_url, path, bodies, concurrency, duration, rate=None, deadline_ms=None
+):
+    """
+    concurrency个线程各自保持长连接发送请求，持续duration秒：
+    - 未指定rate：闭环压测，每个线程收到响应后立即发下一个
+    - 指定rate（请求/秒）：开环压测，按固定间隔排定发送时刻，
+      延迟从排定时刻算起（服务变慢导致的排队也计入，避免协调遗漏）
+    返回延迟列表（毫秒）、错误数、被拒绝（429/503）数和实际耗时
+    """
+    parsed = urllib.parse.urlparse(base_url)
+    content_type = (
+        "application/x-ndjson" if path == "/predict/stream" else "application/json"
+    )
+    headers = {"Content-Type": content_type}
+    if deadline_ms:
+        headers["X-Deadline-Ms"] = str(deadline_ms)
+    lock = threading.Lock()
+    counter = iter(range(1 << 62))
+    latencies, errors, shed = [], [0], [0]
+    start = time.perf_counter()
+    stop_at = start + duration
+
+    def worker():
+        conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=30)
+        local_latencies, local_errors, local_shed = [], 0, 0
+        while True:
+            with lock:
+                i = next(counter)
+            if rate:
+                scheduled = start + i / rate
+                if scheduled >= stop_at:
+                    break
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                scheduled = time.perf_counter()
+                if scheduled >= stop_at:
+                    break
+            try:
+                conn.request(
+                    "POST", path, body=bodies[i % len(bodies)], headers=headers
+                )
+                response = conn.getresponse()
+                response.read()
+                if response.status in (429, 503):
+                    local_shed += 1
+                    continue
+                if response.status >= 400:
+                    local_errors += 1
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection(
+                    parsed.hostname, parsed.port, timeout=30
+                )
+                continue
+            local_latencies.append((time.perf_counter() - scheduled) * 1000)
+        conn.close()
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+            shed[0] += local_shed
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors[0], shed[0], time.perf_counter() - start
+
+
+def summarize(latencies, errors, elapsed, rows_per_request=1, shed=0):
+    if not latencies:
+        return {"requests": 0, "errors": errors, "shed": shed}
+    values = np.percentile(np.array(latencies), list(PERCENTILES.values()))
+    summary = {
+        "requests": len(latencies),
+        "errors": errors,
+        "shed": shed,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": len(latencies) / elapsed,
+        "rows_per_second": len(latencies) * rows_per_request / elapsed,
+        "mean_ms": float(np.mean(latencies)),
+        "max_ms": float(np.max(latencies)),
+    }
+    for name, value in zip(PERCENTILES, values):
+        summary[f"{name}_ms"] = float(value)
+    return summary
+
+
+# --------------------------
+# 与基线对比
+# --------------------------
+def find_regressions(results, baseline, tolerance, compare_throughput=True):
+    """
+    p99变慢或吞吐下降超过tolerance（比例）即视为回退；
+    开环压测的吞吐由--rate决定，此时只比较延迟
+    """
+    regressions = []
+    for mode, endpoints in results.items():
+        for path, current in endpoints.items():
+            base = baseline.get(mode, {}).get(path)
+            if not base or not current.get("requests") or not base.get("requests"):
+                continue
+            if current["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+                regressions.append(
+                    f"{mode} {path} p99：{base['p99_ms']:.2f}ms → "
+                    f"{current['p99_ms']:.2f}ms"
+                )
+            floor = base["throughput_rps"] * (1 - tolerance)
+            if compare_throughput and current["throughput_rps"] < floor:
+                regressions.append(
+                    f"{mode} {path} 吞吐：{base['throughput_rps']:.0f} → "
+                    f"{current['throughput_rps']:.0f} 请求/秒"
+                )
+    return regressions
+
+
+def print_table(results):
+    print(
+        f"{'模式':<10}{'接口':<18}{'请求数':>8}{'错误':>6}{'拒绝':>6}{'吞吐(rps)':>11}"
+        f"{'p50':>8}{'p95':>8}{'p99':>8}{'p999':>8}  (ms)"
+    )
+    for mode, endpoints in results.items():
+        for path, r in endpoints.items():
+            if not r.get("requests"):
+                print(
+                    f"{mode:<10}{path:<18}{0:>8}{r['errors']:>6}{r.get('shed', 0):>6}"
+                )
+                continue
+            print(
+                f"{mode:<10}{path:<18}{r['requests']:>8}{r['errors']:>6}"
+                f"{r.get('shed', 0):>6}{r['throughput_rps']:>11.1f}{r['p50_ms']:>8.2f}{r['p95_ms']:>8.2f}"
+                f"{r['p99_ms']:>8.2f}{r['p999_ms']:>8.2f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="服务HTTP压测")
+    parser.add_argument("--modes", default="artifact", help="逗号分隔的SERVING_MODE")
+    parser.add_argument(
+        "--endpoints", default="predict,batch", help="predict,batch,stream"
+    )
+    parser.add_argument("--url", help="压测已运行的服务，不再自动启动")
+    parser.add_argument("--concurrency", type=int, default=8, help="并发连接数")
+    parser.add_argument("--duration", type=float, default=10, help="每个接口压测秒数")
+    parser.add_argument("--rate", type=float, help="目标请求速率（开环），默认闭环")
+    parser.add_argument("--batch-size", type=int, default=100, help="批量/流式行数")
+    parser.add_argument("--warmup", type=float, default=1, help="正式计时前预热秒数")
+    parser.add_argument("--replay", help="NDJSON回放文件（代替合成流量）")
+    parser.add_argument(
+        "--microbatch", action="store_true", help="启动服务时开启微批处理"
+    )
+    parser.add_argument(
+        "--admission", action="store_true", help="启动服务时开启准入控制"
+    )
+    parser.add_argument(
+        "--deadline-ms", type=float, help="请求头X-Deadline-Ms（截止时间，毫秒）"
+    )
+    parser.add_argument("--json", dest="json_path", help="结果写入JSON文件")
+    parser.add_argument("--baseline", help="基线结果JSON，用于检测回退")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="允许的退化比例")
+    args = parser.parse_args()
+
+    replay = load_replay(args.replay) if args.replay else None
+    paths = [ENDPOINTS[name] for name in args.endpoints.split(",")]
+    extra_env = {"MICROBATCH_ENABLED": "1"} if args.microbatch else {}
+    if args.admission:
+        extra_env["ADMISSION_ENABLED"] = "1"
+    modes = ["external"] if args.url else args.modes.split(",")
+
+    results = {}
+    for mode in modes:
+        if args.url:
+            proc, base_url = None, args.url.rstrip("/")
+        else:
+            print(f"启动服务（SERVING_MODE={mode}）...")
+            proc, base_url = start_server(mode, extra_env)
+        try:
+            results[mode] = {}
+            for path in paths:
+                if replay is not None:
+                    bodies = replay.get(path)
+                    if not bodies:
+                        continue
+                    rows = 1
+                else:
+                    bodies = synthetic_bodies(path, 1000, args.batch_size)
+                    rows = 1 if path == "/predict" else args.batch_size
+                if args.warmup > 0:
+                    run_load(base_url, path, bodies, args.concurrency, args.warmup)
+                latencies, errors, shed, elapsed = run_load(
+                    base_url,
+                    path,
+                    bodies,
+                    args.concurrency,
+                    args.duration,
+                    args.rate,
+                    args.deadline_ms,
+                )
+                results[mode][path] = summarize(latencies, errors, elapsed, rows, shed)
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait()
+
+    print_table(results)
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "rate": args.rate,
+            "batch_size": args.batch_size,
+            "microbatch": args.microbatch,
+            "admission": args.admission,
+            "deadline_ms": args.deadline_ms,
+            "source": args.replay or "synthetic",
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"结果已写入：{args.json_path}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        closed_loop = args.rate is None and baseline["meta"].get("rate") is None
+        regressions = find_regressions(
+            results, baseline["results"], args.tolerance, closed_loop
+        )
+        if regressions:
+            print(f"❌ 发现性能回退（容忍度{args.tolerance:.0%}）：")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print(f"✅ 未发现超过{args.tolerance:.0%}的性能回退")
+
+
+if __name__ == "__main__":
+    main()
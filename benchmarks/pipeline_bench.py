@@ -0,0 +1,124 @@
+# benchmarks/pipeline_bench.py
+# 对比两种数据清洗方式在不同原始数据规模下的吞吐与峰值内存：
+#   pandas    ：整表读入 → drop_duplicates → LabelEncoder → to_csv（clean_data）
+#   streaming ：分块读取 → 行哈希去重 → 分块写出（clean_data_streaming）
+# 用法：python benchmarks/pipeline_bench.py [--rows 100000,1000000] [--modes pandas,streaming]
+#       [--chunksize 200000] [--memory-mb 256] [--json 输出文件]
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SPECIES = np.array(["Iris-setosa", "Iris-versicolor", "Iris-virginica"])
+
+# 子进程中执行：每次测量都在全新进程里进行，峰值RSS互不干扰
+CHILD_CODE = """
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+from ml.data_pipeline import clean_data, clean_data_streaming
+mode, raw_path, out_path, chunksize, memory_mb = sys.argv[1:6]
+t0 = time.perf_counter()
+if mode == "pandas":
+    df, _, rows_in = clean_data(raw_path)
+    df.to_csv(out_path, index=False, header=True)
+    rows_out = len(df)
+else:
+    _, rows_in, rows_out = clean_data_streaming(
+        raw_path, out_path, chunksize=int(chunksize), memory_mb=float(memory_mb)
+    )
+elapsed = time.perf_counter() - t0
+print("__BENCH__" + json.dumps({{
+    "seconds": elapsed,
+    "rows_in": rows_in,
+    "rows_out": rows_out,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+"""
+
+
+def generate_raw_csv(path, rows, seed=0, block=1000000):
+    """生成无表头的原始数据（0.1cm精度，自然产生大量重复行），分块写出"""
+    rng = np.random.default_rng(seed)
+    with open(path, "w", newline="") as f:
+        for start in range(0, rows, block):
+            n = min(block, rows - start)
+            features = np.round(rng.uniform(0.1, 7.9, size=(n, 4)), 1)
+            df = pd.DataFrame(features)
+            df[4] = SPECIES[rng.integers(0, 3, size=n)]
+            df.to_csv(f, index=False, header=False)
+
+
+def run_once(mode, raw_path, out_path, chunksize, memory_mb):
+    proc = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            CHILD_CODE.format(root=PROJECT_ROOT),
+            mode,
+            raw_path,
+            out_path,
+            str(chunksize),
+            str(memory_mb),
+        ],
+        capture_output=True,
+        text=True,
+    )
+    for line in proc.stdout.splitlines():
+        if line.startswith("__BENCH__"):
+            return json.loads(line[len("__BENCH__") :])
+    raise RuntimeError(f"{mode}模式执行失败：\n{proc.stdout}\n{proc.stderr}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="数据清洗吞吐/峰值内存基准")
+    parser.add_argument("--rows", default="100000,1000000", help="逗号分隔的原始行数")
+    parser.add_argument("--modes", default="pandas,streaming", help="逗号分隔的模式")
+    parser.add_argument("--chunksize", type=int, default=200000, help="流式块大小")
+    parser.add_argument("--memory-mb", type=float, default=256, help="去重内存预算")
+    parser.add_argument("--json", dest="json_path", help="结果写入JSON文件")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for rows in (int(float(r)) for r in args.rows.split(",")):
+            raw_path = os.path.join(tmp_dir, f"raw_{rows}.csv")
+            generate_raw_csv(raw_path, rows)
+            raw_mb = os.path.getsize(raw_path) / 1024 / 1024
+            for mode in args.modes.split(","):
+                out_path = os.path.join(tmp_dir, f"out_{mode}.csv")
+                r = run_once(mode, raw_path, out_path, args.chunksize, args.memory_mb)
+                results.append(
+                    dict(
+                        r,
+                        mode=mode,
+                        raw_mb=raw_mb,
+                        rows_per_second=r["rows_in"] / r["seconds"],
+                    )
+                )
+                os.remove(out_path)
+            os.remove(raw_path)
+
+    print(
+        f"{'模式':<11}{'原始行数':>12}{'原始MB':>9}{'去重后':>12}"
+        f"{'耗时(s)':>9}{'行/秒':>12}{'峰值RSS(MB)':>13}"
+    )
+    for r in results:
+        print(
+            f"{r['mode']:<11}{r['rows_in']:>12}{r['raw_mb']:>9.1f}{r['rows_out']:>12}"
+            f"{r['seconds']:>9.2f}{r['rows_per_second']:>12.0f}{r['max_rss_mb']:>13.1f}"
+        )
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"结果已写入：{args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# benchmarks/socket_bench.py
+# 二进制套接字预测服务（app/socket_server.py）的往返延迟与吞吐：
+#   单条往返延迟（Unix域套接字/TCP）、单连接流水线、多线程并发单条（客户端透明合批），
+#   可选与HTTP /predict（长连接）的单条往返延迟对照
+# 服务以子进程启动（与客户端不争GIL），加载与HTTP服务相同的生产模型
+# 用法：python benchmarks/socket_bench.py [--requests 5000] [--threads 8]
+#                                        [--http 127.0.0.1:5000] [--json 输出文件]
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.socket_client import PredictionClient
+
+SAMPLE = [5.1, 3.5, 1.4, 0.2]
+
+
+def start_server(unix_path, tcp_address, timeout=120):
+    """启动服务子进程，等到两个地址都能ping通"""
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.join(PROJECT_ROOT, "app", "socket_server.py"),
+            "--unix",
+            unix_path,
+            "--tcp",
+            tcp_address,
+        ],
+        cwd=PROJECT_ROOT,
+        stdout=subprocess.DEVNULL,
+    )
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"服务进程已退出（返回码{process.returncode}）")
+        try:
+            for address in (f"unix:{unix_path}", tcp_address):
+                client = PredictionClient(address, timeout=1.0)
+                client.ping()
+                client.close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise TimeoutError(f"服务{timeout}s内未就绪")
+
+
+def latency_summary(seconds):
+    us = np.asarray(seconds) * 1e6
+    return {
+        "p50_us": float(np.percentile(us, 50)),
+        "p99_us": float(np.percentile(us, 99)),
+        "mean_us": float(us.mean()),
+    }
+
+
+def bench_round_trip(address, n):
+    """单连接、单条请求逐个往返"""
+    client = PredictionClient(address, pool_size=1)
+    X = np.array([SAMPLE])
+    for _ in range(100):  # 预热
+        client.predict(X)
+    times = []
+    for _ in range(n):
+        start = time.perf_counter()
+        client.predict(X)
+        times.append(time.perf_counter() - start)
+    client.close()
+    return latency_summary(times)
+
+
+def bench_pipeline(address, n, depth=100):
+    """单连接流水线：每次连续发出depth个单条请求再统一读回"""
+    client = PredictionClient(address, pool_size=1)
+    matrices = [np.array([SAMPLE])] * depth
+    rounds = max(1, n // depth)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        client.predict_many(matrices)
+    seconds = time.perf_counter() - start
+    client.close()
+    return {"depth": depth, "requests_per_second": rounds * depth / seconds}
+
+
+def bench_concurrent(address, n, threads):
+    """多线程并发predict_one（客户端透明合批），返回吞吐和延迟"""
+    client = PredictionClient(address, pool_size=4)
+    per_thread = max(1, n // threads)
+    times = [[] for _ in range(threads)]
+
+    def run(k):
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            client.predict_one(SAMPLE)
+            times[k].append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=run, args=(k,)) for k in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    seconds = time.perf_counter() - start
+    client.close()
+    return dict(
+        latency_summary([t for ts in times for t in ts]),
+        threads=threads,
+        requests_per_second=threads * per_thread / seconds,
+    )
+
+
+def bench_http(address, n):
+    """HTTP /predict 单条往返（长连接）"""
+    host, port = address.rsplit(":", 1)
+    connection = http.client.HTTPConnection(host, int(port))
+    body = json.dumps(
+        dict(
+            zip(["sepal_length", "sepal_width", "petal_length", "petal_width"], SAMPLE)
+        )
+    )
+    headers = {"Content-Type": "application/json"}
+    times = []
+    for i in range(n + 100):
+        start = time.perf_counter()
+        connection.request("POST", "/predict", body, headers)
+        connection.getresponse().read()
+        if i >= 100:
+            times.append(time.perf_counter() - start)
+    connection.close()
+    return latency_summary(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="二进制套接字预测服务基准")
+    parser.add_argument("--requests", type=int, default=5000, help="每项测试的请求数")
+    parser.add_argument("--threads", type=int, default=8, help="并发单条测试的线程数")
+    parser.add_argument("--tcp", default="127.0.0.1:5051", help="服务TCP监听地址")
+    parser.add_argument("--http", help="对照用HTTP服务地址 主机:端口（需已启动）")
+    parser.add_argument("--json", dest="json_path", help="结果写入JSON文件")
+    args = parser.parse_args()
+
+    unix_path = os.path.join(tempfile.mkdtemp(), "iris.sock")
+    process = start_server(unix_path, args.tcp)
+    results = {}
+    try:
+        for name, address in (("unix", f"unix:{unix_path}"), ("tcp", args.tcp)):
+            results[name] = {
+                "round_trip": bench_round_trip(address, args.requests),
+                "pipeline": bench_pipeline(address, args.requests * 4),
+                "concurrent": bench_concurrent(address, args.requests, args.threads),
+            }
+        if args.http:
+            results["http"] = {"round_trip": bench_http(args.http, args.requests)}
+    finally:
+        process.terminate()
+        process.wait()
+
+    print(
+        f"{'传输':<8}{'往返p50(us)':>14}{'往返p99(us)':>14}{'流水线(req/s)':>16}{'并发(req/s)':>14}"
+    )
+    for name, r in results.items():
+        print(
+            f"{name:<8}{r['round_trip']['p50_us']:>14.1f}{r['round_trip']['p99_us']:>14.1f}"
+            f"{r.get('pipeline', {}).get('requests_per_second', 0):>16.0f}"
+            f"{r.get('concurrent', {}).get('requests_per_second', 0):>14.0f}"
+        )
+
+    if args.json_path:
+        report = {"requests": args.requests, "results": results}
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"结果已写入：{args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# benchmarks/stage_bench.py
+# /predict 各处理阶段的微基准（进程内，不经过网络）：
+#   JSON解析 → 参数校验 → DataFrame构造 → 模型调用 → jsonify，以及完整请求
+# DataFrame构造与sklearn模型调用是原先经MLflow模型打分的路径，与当前的LinearScorer对照
+# 用法：python benchmarks/stage_bench.py [--number 20000] [--repeat 5] [--json 输出文件]
+import argparse
+import json
+import os
+import statistics
+import sys
+import timeit
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+SAMPLE = {
+    "sepal_length": 5.1,
+    "sepal_width": 3.5,
+    "petal_length": 1.4,
+    "petal_width": 0.2,
+}
+
+
+def build_stages():
+    """返回 [(阶段名, 无参可调用对象), ...]"""
+    import pandas as pd
+    from flask import jsonify
+
+    from app.main import FEATURE_COLUMNS, create_app, model_manager, validate_features
+    from app.drift import DriftMonitor
+    from ml.drift import compute_reference
+    from ml.lut import LutScorer, compile_lut
+    from ml.registry import resolve_production_model_path
+
+    app = create_app(background=False)
+    body = json.dumps(SAMPLE).encode("utf-8")
+    data = json.loads(body)
+    features, _ = validate_features(data)
+    handle = model_manager.current
+    label = handle.scorer.predict_one(features)
+    payload = {
+        "status": "success",
+        "predicted_species": handle.species_map[label],
+        "label": int(label),
+    }
+    client = app.test_client()
+
+    def run_jsonify():
+        with app.app_context():
+            jsonify(payload)
+
+    stages = [
+        ("json_parse", lambda: json.loads(body)),
+        ("validate", lambda: validate_features(data)),
+        ("dataframe", lambda: pd.DataFrame([features], columns=FEATURE_COLUMNS)),
+    ]
+    try:
+        import mlflow.sklearn
+
+        model = mlflow.sklearn.load_model(resolve_production_model_path())
+        frame = pd.DataFrame([features], columns=FEATURE_COLUMNS)
+        stages.append(("model_sklearn", lambda: model.predict(frame)))
+    except Exception as e:
+        print(f"跳过sklearn模型阶段：{e}")
+    # 漂移监控只测请求线程的入队开销（队列足够大，不触发丢弃；后台线程照常合并）
+    rows = [features, [6.0, 2.8, 4.5, 1.5], [6.5, 3.0, 5.5, 2.0]]
+    drift_monitor = DriftMonitor(
+        compute_reference(rows, [0, 1, 2], FEATURE_COLUMNS), queue_size=10**7
+    )
+    # PREDICT_LUT=1时当前句柄已套上查表层，两种打分分别单独测量
+    scorer = getattr(handle.scorer, "scorer", handle.scorer)
+    lut_scorer = LutScorer(scorer, compile_lut(scorer))
+    stages += [
+        ("model_scorer", lambda: scorer.predict_one(features)),
+        ("model_lut", lambda: lut_scorer.predict_one(features)),
+        ("drift_observe", lambda: drift_monitor.observe([features], [label])),
+        ("jsonify", run_jsonify),
+        ("full_request", lambda: client.post("/predict", json=SAMPLE)),
+    ]
+    return stages
+
+
+def bench(fn, number, repeat):
+    """返回每次调用耗时（微秒）的中位数与最小值"""
+    times = timeit.repeat(fn, number=number, repeat=repeat)
+    per_call = [t / number * 1e6 for t in times]
+    return {"median_us": statistics.median(per_call), "min_us": min(per_call)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/predict 分阶段微基准")
+    parser.add_argument("--number", type=int, default=20000, help="每轮调用次数")
+    parser.add_argument("--repeat", type=int, default=5, help="轮数")
+    parser.add_argument("--json", dest="json_path", help="结果写入JSON文件")
+    args = parser.parse_args()
+
+    results = {}
+    for name, fn in build_stages():
+        # 完整请求和sklearn调用较慢，减少次数
+        number = (
+            args.number // 20
+            if name in ("full_request", "model_sklearn")
+            else args.number
+        )
+        results[name] = bench(fn, max(1, number), args.repeat)
+
+    print(f"{'阶段':<16}{'中位数(us)':>12}{'最小值(us)':>12}")
+    for name, r in results.items():
+        print(f"{name:<16}{r['median_us']:>12.2f}{r['min_us']:>12.2f}")
+
+    if args.json_path:
+        report = {
+            "serving_mode": os.getenv("SERVING_MODE", "mlflow"),
+            "number": args.number,
+            "repeat": args.repeat,
+            "results": results,
+        }
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"结果已写入：{args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# benchmarks/startup_bench.py
+# 对比两种启动模式的冷启动耗时与常驻内存：
+#   mlflow   ：导入mlflow.sklearn并反序列化MLflow模型
+#   artifact ：只读取精简.npz产物
+# 每次测量三个时间点：导入app.main、create_app()返回（此时即可监听端口，/healthz可用）、
+# 模型加载+校验+预热完成（/readyz返回200）
+# 用法：python benchmarks/startup_bench.py [--repeat 3] [--json 输出文件]
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# 子进程中执行：分别计时导入app.main、创建应用、等待模型就绪，并读取峰值RSS
+CHILD_CODE = """
+import json, resource, sys, time
+t0 = time.perf_counter()
+import app.main
+t1 = time.perf_counter()
+flask_app = app.main.create_app()
+t2 = time.perf_counter()
+ready = app.main.model_manager.wait_ready(timeout=300)
+t3 = time.perf_counter()
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print("__BENCH__" + json.dumps({
+    "import_seconds": t1 - t0,
+    "bind_seconds": t2 - t0,
+    "ready_seconds": t3 - t0,
+    "ready": ready,
+    "max_rss_mb": rss_kb / 1024,
+    "mlflow_imported": "mlflow" in sys.modules,
+    "pandas_imported": "pandas" in sys.modules,
+}))
+"""
+
+
+def run_once(mode):
+    env = dict(os.environ, SERVING_MODE=mode, MLFLOW_DISABLE_AGENT_HINT="1")
+    proc = subprocess.run(
+        [sys.executable, "-c", CHILD_CODE],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    for line in proc.stdout.splitlines():
+        if line.startswith("__BENCH__"):
+            return json.loads(line[len("__BENCH__") :])
+    raise RuntimeError(f"{mode}模式启动失败：\n{proc.stdout}\n{proc.stderr}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="服务冷启动耗时/内存基准")
+    parser.add_argument("--repeat", type=int, default=3, help="每种模式重复次数")
+    parser.add_argument("--modes", default="mlflow,artifact", help="逗号分隔的模式")
+    parser.add_argument("--json", dest="json_path", help="结果写入JSON文件")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in args.modes.split(","):
+        runs = [run_once(mode) for _ in range(args.repeat)]
+        if not all(r["ready"] for r in runs):
+            raise RuntimeError(f"{mode}模式模型未能就绪")
+        results[mode] = {
+            "import_seconds_median": statistics.median(
+                r["import_seconds"] for r in runs
+            ),
+            "bind_seconds_median": statistics.median(r["bind_seconds"] for r in runs),
+            "ready_seconds_median": statistics.median(r["ready_seconds"] for r in runs),
+            "max_rss_mb_median": statistics.median(r["max_rss_mb"] for r in runs),
+            "mlflow_imported": runs[0]["mlflow_imported"],
+            "pandas_imported": runs[0]["pandas_imported"],
+        }
+
+    print(
+        f"{'模式':<10}{'导入(s)':>10}{'可监听(s)':>11}{'就绪(s)':>10}"
+        f"{'峰值RSS(MB)':>14}{'mlflow':>8}{'pandas':>8}"
+    )
+    for mode, r in results.items():
+        print(
+            f"{mode:<10}{r['import_seconds_median']:>10.3f}"
+            f"{r['bind_seconds_median']:>11.3f}{r['ready_seconds_median']:>10.3f}"
+            f"{r['max_rss_mb_median']:>14.1f}"
+            f"{str(r['mlflow_imported']):>8}{str(r['pandas_imported']):>8}"
+        )
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"结果已写入：{args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
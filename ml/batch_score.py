@@ -0,0 +1,243 @@
+# ml/batch_score.py（离线批量打分：分块读取 + 进程池并行 + 按输入顺序写出）
+# 用法：python ml/batch_score.py 输入.csv 输出.csv [--chunksize 100000] [--workers N] [--proba]
+import argparse
+import collections
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# 项目根目录加入模块搜索路径（兼容 python ml/batch_score.py 直接启动）
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from ml.scoring import LinearScorer, load_artifact
+
+FEATURE_COLUMNS = ["sepal_length", "sepal_width", "petal_length", "petal_width"]
+
+
+# --------------------------
+# 模型加载（主进程只加载一次，worker只接收打分器权重）
+# --------------------------
+def load_species_map(label_map_path=None):
+    """读取标签映射（iris-setosa: 0 → {0: "setosa"}）"""
+    import yaml
+
+    label_map_path = label_map_path or os.path.join(
+        PROJECT_ROOT, "ml", "registry", "label_map.yml"
+    )
+    with open(label_map_path, "r", encoding="utf-8") as f:
+        label_map = yaml.safe_load(f)
+    return {int(v): k.replace("iris-", "") for k, v in label_map.items()}
+
+
+def load_scorer(artifact_path=None):
+    """默认通过ml/registry.get_production_model()加载生产模型；指定精简产物时直接读取.npz"""
+    if artifact_path:
+        scorer, meta = load_artifact(artifact_path)
+        return scorer, meta["species_map"]
+    from ml.registry import get_production_model
+
+    return LinearScorer.from_model(get_production_model()), load_species_map()
+
+
+# --------------------------
+# worker进程
+# --------------------------
+_worker_scorer = None
+
+
+def _init_worker(coef, intercept, classes, ovr):
+    global _worker_scorer
+    _worker_scorer = LinearScorer(coef, intercept, classes, ovr=ovr)
+
+
+def _score_chunk(X, with_proba):
+    """对一块特征矩阵打分；含缺失/非数值的行标签记为-1"""
+    valid = np.isfinite(X).all(axis=1)
+    labels = np.full(len(X), -1, dtype=np.int64)
+    proba = None
+    if with_proba:
+        proba = np.full((len(X), len(_worker_scorer.classes)), np.nan)
+    if valid.any():
+        if with_proba:
+            labels[valid], proba[valid] = _worker_scorer.predict_with_proba(X[valid])
+        else:
+            labels[valid] = _worker_scorer.predict(X[valid])
+    return labels, proba
+
+
+# --------------------------
+# 分块读写
+# --------------------------
+def iter_input_chunks(input_path, chunksize, id_column=None):
+    """按块读取输入，产出 (特征矩阵, ID列或None)；支持CSV和Parquet（需pyarrow）"""
+    columns = FEATURE_COLUMNS + ([id_column] if id_column else [])
+    if input_path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("读取Parquet需要安装pyarrow：pip install pyarrow")
+        for batch in pq.ParquetFile(input_path).iter_batches(
+            batch_size=chunksize, columns=columns
+        ):
+            df = batch.to_pandas()
+            yield _chunk_features(df), df[id_column] if id_column else None
+    else:
+        for df in pd.read_csv(input_path, usecols=columns, chunksize=chunksize):
+            yield _chunk_features(df), df[id_column] if id_column else None
+
+
+def _chunk_features(df):
+    # 非数值内容转为NaN，交给worker标记为无效行
+    features = df[FEATURE_COLUMNS].apply(pd.to_numeric, errors="coerce")
+    return np.ascontiguousarray(features.to_numpy(dtype=np.float64))
+
+
+class OutputWriter:
+    """按块追加写出：.parquet用ParquetWriter，其余写CSV"""
+
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self._parquet = output_path.endswith(".parquet")
+        self._writer = None
+        self._first = True
+
+    def write(self, df):
+        if self._parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.output_path, table.schema)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(
+                self.output_path,
+                mode="w" if self._first else "a",
+                header=self._first,
+                index=False,
+            )
+        self._first = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _format_chunk(labels, proba, ids, species_map, classes, id_column):
+    df = pd.DataFrame()
+    if id_column:
+        df[id_column] = ids.to_numpy()
+    df["label"] = labels
+    df["predicted_species"] = pd.Series(labels).map(species_map).fillna("").to_numpy()
+    if proba is not None:
+        for j, c in enumerate(classes):
+            df[f"proba_{species_map[int(c)]}"] = proba[:, j]
+    return df
+
+
+def peak_memory_mb():
+    """主进程与已结束子进程的峰值RSS（MB）；不支持resource的平台返回None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024  # macOS单位为字节
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return {"main": own, "worker_max": children}
+
+
+def score_file(
+    input_path,
+    output_path,
+    chunksize=100000,
+    workers=None,
+    with_proba=False,
+    id_column=None,
+    artifact_path=None,
+):
+    """
+    分块读取input_path，块在进程池中并行打分，按输入顺序写入output_path；
+    同时在途的块数上限为 2×workers，内存占用与输入大小无关。返回统计信息
+    """
+    workers = workers or os.cpu_count() or 1
+    scorer, species_map = load_scorer(artifact_path)
+    start = time.perf_counter()
+    rows = invalid = 0
+    writer = OutputWriter(output_path)
+    pending = collections.deque()
+
+    def drain_one():
+        nonlocal rows, invalid
+        future, ids = pending.popleft()
+        labels, proba = future.result()
+        rows += len(labels)
+        invalid += int((labels < 0).sum())
+        writer.write(
+            _format_chunk(labels, proba, ids, species_map, scorer.classes, id_column)
+        )
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(scorer.coef, scorer.intercept, scorer.classes, scorer.ovr),
+        ) as pool:
+            for X, ids in iter_input_chunks(input_path, chunksize, id_column):
+                pending.append((pool.submit(_score_chunk, X, with_proba), ids))
+                if len(pending) >= 2 * workers:
+                    drain_one()
+            while pending:
+                drain_one()
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "invalid_rows": invalid,
+        "seconds": elapsed,
+        "rows_per_second": rows / elapsed if elapsed > 0 else None,
+        "workers": workers,
+        "peak_memory_mb": peak_memory_mb(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="离线批量打分")
+    parser.add_argument("input", help="输入文件（.csv或.parquet，需包含四个特征列）")
+    parser.add_argument("output", help="输出文件（.csv或.parquet）")
+    parser.add_argument("--chunksize", type=int, default=100000, help="每块行数")
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认CPU数")
+    parser.add_argument("--proba", action="store_true", help="同时输出各类别概率")
+    parser.add_argument("--id-column", help="原样透传到输出的ID列")
+    parser.add_argument("--artifact", help="使用精简产物(.npz)代替生产模型")
+    args = parser.parse_args()
+
+    stats = score_file(
+        args.input,
+        args.output,
+        chunksize=args.chunksize,
+        workers=args.workers,
+        with_proba=args.proba,
+        id_column=args.id_column,
+        artifact_path=args.artifact,
+    )
+    print(
+        f"打分完成：{stats['rows']}行（无效{stats['invalid_rows']}行），"
+        f"耗时{stats['seconds']:.2f}s，{stats['rows_per_second']:.0f}行/秒，"
+        f"{stats['workers']}个进程"
+    )
+    if stats["peak_memory_mb"]:
+        print(
+            f"峰值内存：主进程{stats['peak_memory_mb']['main']:.1f}MB，"
+            f"worker最高{stats['peak_memory_mb']['worker_max']:.1f}MB"
+        )
+    print(f"结果已写入：{args.output}")
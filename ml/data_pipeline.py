@@ -1,15 +1,91 @@
 # ml/data_pipeline.py（完整修复版）
-import pandas as pd
+# 增量执行：以「原始数据内容哈希 + 本文件代码哈希」为键缓存清洗结果，输入和代码都没变时直接复用
+import hashlib
+import json
 import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
 import yaml  # 新增：导入yaml模块
 from sklearn.preprocessing import LabelEncoder  # 用于标签编码
 
+RAW_PATH = "data/raw/iris_v1.csv"
+PROCESSED_PATH = "data/processed/iris_v2.csv"
+LABEL_MAP_PATH = "ml/registry/label_map.yml"
+CACHE_DIR = "data/cache"
+# 文件哈希缓存：路径 → (大小, 修改时间, 哈希)，文件未改动时不必重新读取计算
+STAT_CACHE_FILE = "stat_cache.json"
+COLUMN_NAMES = ["sepal_length", "sepal_width", "petal_length", "petal_width", "species"]
+# 特征列固定按float64解析（分块读取时各块推断出的类型可能不同，导致输出格式不一致）
+COLUMN_DTYPES = {name: "float64" for name in COLUMN_NAMES[:4]}
+# 原始文件超过该大小时自动使用流式清洗（内存占用与文件大小无关）
+STREAMING_THRESHOLD_BYTES = 256 * 1024 * 1024
+STREAMING_CHUNKSIZE = 200000
+# 去重哈希集合的内存预算，超出后转存到磁盘上的SQLite
+DEDUP_MEMORY_MB = 256
+# 二进制列式数据集（与清洗后的CSV同名、扩展名.bin），训练时直接内存映射
+DATASET_MAGIC = b"IRISCOL1"
+# 头部固定占一页（magic + JSON模式描述，空格填充），特征矩阵从页边界开始
+DATASET_HEADER_SIZE = 4096
+DATASET_FEATURE_DTYPE = "float64"
+DATASET_LABEL_DTYPE = "<i8"
+
+
+# --------------------------
+# 内容指纹
+# --------------------------
+def file_digest(path, algorithm="sha256", block_size=1 << 20):
+    """分块计算文件哈希（大文件不整体读入内存）"""
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _load_stat_cache(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, STAT_CACHE_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_stat_cache(cache_dir, stat_cache):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, STAT_CACHE_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(stat_cache, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
 
-def load_and_clean_data():
-    raw_path = "data/raw/iris_v1.csv"
-    processed_path = "data/processed/iris_v2.csv"
-    os.makedirs("data/processed", exist_ok=True)
 
+def cached_file_digest(path, stat_cache):
+    """文件大小和修改时间（纳秒）都没变时直接复用上次的sha256，否则重新计算并更新缓存"""
+    st = os.stat(path)
+    key = os.path.abspath(path)
+    cached = stat_cache.get(key)
+    if cached and cached["size"] == st.st_size and cached["mtime_ns"] == st.st_mtime_ns:
+        return cached["sha256"]
+    sha256 = file_digest(path)
+    stat_cache[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha256}
+    return sha256
+
+
+def code_fingerprint():
+    """清洗逻辑的版本：本文件内容的sha256（改动清洗代码即令缓存失效）"""
+    return file_digest(os.path.abspath(__file__))
+
+
+# --------------------------
+# 清洗
+# --------------------------
+def clean_data(raw_path=RAW_PATH):
+    """读取原始数据、去重、标签编码，返回 (清洗后数据, 标签映射, 原始行数)"""
     # 检查原始数据是否存在
     if not os.path.exists(raw_path):
         raise FileNotFoundError(
@@ -17,36 +93,509 @@ def load_and_clean_data():
         )
 
     # 读取原始数据（无表头，手动指定列名）
-    column_names = [
-        "sepal_length",
-        "sepal_width",
-        "petal_length",
-        "petal_width",
-        "species",
-    ]
-    df_raw = pd.read_csv(raw_path, names=column_names)
-
-    # 修复SettingWithCopyWarning：用copy()创建独立DataFrame
-    df_clean = df_raw.drop_duplicates().copy()
+    df_raw = pd.read_csv(raw_path, names=COLUMN_NAMES, dtype=COLUMN_DTYPES)
+
+    # 缺失标签的行无法训练，先丢弃；修复SettingWithCopyWarning：用copy()创建独立DataFrame
+    df_clean = df_raw.dropna(subset=["species"]).drop_duplicates().copy()
 
     # 标签编码（字符串→数字）
     le = LabelEncoder()
     df_clean["species"] = le.fit_transform(df_clean["species"].str.lower())
     print(f"数据清洗完成：{len(df_raw)}行 → {len(df_clean)}行（去重+标签编码）")
 
-    # 保存带表头的清洗后数据
-    df_clean.to_csv(processed_path, index=False, header=True)
-    print(f"清洗后数据已保存至：{processed_path}")
-
-    # 保存标签映射（已导入yaml，无NameError）
-    os.makedirs("ml/registry", exist_ok=True)
     label_map = dict(zip(le.classes_, range(len(le.classes_))))
-    with open("ml/registry/label_map.yml", "w", encoding="utf-8") as f:
-        yaml.dump(label_map, f)
-    print(f"标签映射已保存至：ml/registry/label_map.yml")
+    return df_clean, label_map, len(df_raw)
 
-    return df_clean
+
+# --------------------------
+# 流式清洗（大文件：分块读取 + 行哈希去重 + 分块写出）
+# --------------------------
+class RowHashSet:
+    """
+    行去重集合，add_new(hashes, keys)返回「此前未出现过」的掩码：
+    - 64位行哈希用于快速查找，哈希相同时再比较完整行键（keys，定长字节串），
+      哈希碰撞的不同行不会被误判为重复
+    - 内存中保存为若干按哈希排序的数组（哈希 + 对应行键，大小相近的相邻数组合并）
+    - 数量超过内存预算后全部转存到临时SQLite表，之后按块在SQLite内做集合运算
+    """
+
+    # 每条记录的内存估算：哈希8字节 + 行键约48字节（4个float64 + 标签），合并时约需2倍
+    BYTES_PER_ENTRY = 128
+
+    def __init__(self, memory_mb=DEDUP_MEMORY_MB, spill_dir=None):
+        self.max_in_memory = max(
+            1, int(memory_mb * 1024 * 1024 // self.BYTES_PER_ENTRY)
+        )
+        self.spill_dir = spill_dir
+        self._runs = []  # [(有序哈希数组, 同序的行键数组)]
+        self._size = 0
+        self._db = None
+        self._db_path = None
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def spilled(self):
+        return self._db is not None
+
+    def add_new(self, hashes, keys):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        keys = np.asarray(keys, dtype=np.bytes_)
+        # 块内去重按完整行键：只保留每行第一次出现的位置
+        _, first = np.unique(keys, return_index=True)
+        mask = np.zeros(len(hashes), dtype=bool)
+        if self._db is not None:
+            mask[first] = self._add_to_db(hashes[first], keys[first])
+        else:
+            candidates, candidate_keys = hashes[first], keys[first]
+            seen = np.zeros(len(candidates), dtype=bool)
+            for run, run_keys in self._runs:
+                seen |= _contains(run, run_keys, candidates, candidate_keys)
+            mask[first] = ~seen
+            new_hashes, new_keys = candidates[~seen], candidate_keys[~seen]
+            order = np.argsort(new_hashes, kind="stable")
+            self._add_run(new_hashes[order], new_keys[order])
+            if self._size > self.max_in_memory:
+                self._spill()
+        return mask
+
+    def _add_run(self, run, run_keys):
+        if not len(run):
+            return
+        self._runs.append((run, run_keys))
+        self._size += len(run)
+        while len(self._runs) > 1 and len(self._runs[-2][0]) <= 2 * len(
+            self._runs[-1][0]
+        ):
+            last, last_keys = self._runs.pop()
+            merged = np.concatenate([self._runs[-1][0], last])
+            merged_keys = np.concatenate([self._runs[-1][1], last_keys])
+            order = np.argsort(merged, kind="stable")
+            self._runs[-1] = (merged[order], merged_keys[order])
+
+    def _spill(self):
+        fd, self._db_path = tempfile.mkstemp(suffix=".sqlite", dir=self.spill_dir)
+        os.close(fd)
+        self._db = sqlite3.connect(self._db_path)
+        self._db.executescript(
+            "PRAGMA journal_mode=OFF; PRAGMA synchronous=OFF;"
+            "CREATE TABLE seen (h INTEGER, k BLOB, PRIMARY KEY (h, k)) WITHOUT ROWID;"
+            "CREATE TEMP TABLE batch (h INTEGER, k BLOB, pos INTEGER,"
+            " PRIMARY KEY (h, k));"
+        )
+        for run, run_keys in self._runs:
+            self._db.executemany(
+                "INSERT INTO seen VALUES (?, ?)",
+                zip(run.view(np.int64).tolist(), run_keys.tolist()),
+            )
+        self._runs = []
+        print(f"去重集合超过内存预算，已转存到磁盘：{self._db_path}")
+
+    def _add_to_db(self, unique_hashes, unique_keys):
+        """unique_keys块内已去重；返回其中此前未出现过的掩码"""
+        db = self._db
+        db.execute("DELETE FROM batch")
+        db.executemany(
+            "INSERT INTO batch VALUES (?, ?, ?)",
+            zip(
+                unique_hashes.view(np.int64).tolist(),
+                unique_keys.tolist(),
+                range(len(unique_keys)),
+            ),
+        )
+        new_pos = [
+            pos
+            for (pos,) in db.execute(
+                "SELECT pos FROM batch WHERE NOT EXISTS"
+                " (SELECT 1 FROM seen WHERE seen.h = batch.h AND seen.k = batch.k)"
+            )
+        ]
+        db.execute("INSERT OR IGNORE INTO seen SELECT h, k FROM batch")
+        mask = np.zeros(len(unique_keys), dtype=bool)
+        mask[new_pos] = True
+        self._size += len(new_pos)
+        return mask
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            os.remove(self._db_path)
+            self._db = None
+
+
+def _contains(run, run_keys, hashes, keys):
+    """有序哈希数组run中是否存在哈希和行键都相同的记录（哈希相同的记录可能有多条）"""
+    left = np.searchsorted(run, hashes, side="left")
+    right = np.searchsorted(run, hashes, side="right")
+    found = np.zeros(len(hashes), dtype=bool)
+    hit = np.flatnonzero(right > left)
+    if not len(hit):
+        return found
+    found[hit] = run_keys[left[hit]] == keys[hit]
+    # 哈希相同但行键不同：碰撞，逐条比较同哈希的其余记录（极少发生）
+    for i in hit[~found[hit]]:
+        found[i] = any(k == keys[i] for k in run_keys[left[i] + 1 : right[i]])
+    return found
+
+
+def row_keys(chunk):
+    """
+    完整行键（定长字节串）：4个float64特征的字节 + 标签（UTF-8），供哈希相同时确认是否真的重复；
+    标签非空且不含空字节，末尾补齐的空字节不影响比较
+    """
+    features = np.ascontiguousarray(chunk[COLUMN_NAMES[:4]].to_numpy(dtype=np.float64))
+    # 标签取值很少，只对不同取值做编码
+    codes, uniques = pd.factorize(chunk["species"])
+    labels = np.char.encode(np.asarray(uniques, dtype=str), "utf-8")[codes]
+    keys = np.empty(len(chunk), dtype=[("features", "V32"), ("label", labels.dtype)])
+    keys["features"] = features.view("V32").ravel()
+    keys["label"] = labels
+    return keys.view(f"S{keys.dtype.itemsize}")
+
+
+def clean_data_streaming(
+    raw_path,
+    output_path,
+    chunksize=STREAMING_CHUNKSIZE,
+    memory_mb=DEDUP_MEMORY_MB,
+):
+    """
+    流式清洗，结果与clean_data()+to_csv逐字节一致：
+    - 第一遍只读标签列，得到排序后的类别（与LabelEncoder一致，缺失标签不计入）
+    - 第二遍分块读取，丢弃缺失标签的行，按行哈希+完整行键去重（保留首次出现），
+      编码标签后追加写出
+    返回 (标签映射, 原始行数, 输出行数)
+    """
+    if not os.path.exists(raw_path):
+        raise FileNotFoundError(
+            f"原始数据文件不存在：{raw_path}\n请在data/raw/目录下放置iris_v1.csv"
+        )
+
+    classes = set()
+    for chunk in pd.read_csv(
+        raw_path, names=COLUMN_NAMES, usecols=["species"], chunksize=chunksize
+    ):
+        classes.update(chunk["species"].dropna().str.lower().unique())
+    classes = sorted(classes)
+    codes = {name: code for code, name in enumerate(classes)}
+
+    seen = RowHashSet(memory_mb, spill_dir=os.path.dirname(output_path) or None)
+    rows_in = rows_out = 0
+    tmp_path = f"{output_path}.tmp"
+    try:
+        with open(tmp_path, "w", newline="") as out:
+            header = True
+            for chunk in pd.read_csv(
+                raw_path, names=COLUMN_NAMES, dtype=COLUMN_DTYPES, chunksize=chunksize
+            ):
+                rows_in += len(chunk)
+                chunk = chunk[chunk["species"].notna()]  # 缺失标签的行无法训练，丢弃
+                hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+                chunk = chunk[seen.add_new(hashes, row_keys(chunk))].copy()
+                chunk["species"] = chunk["species"].str.lower().map(codes)
+                chunk.to_csv(out, index=False, header=header)
+                header = False
+                rows_out += len(chunk)
+        os.replace(tmp_path, output_path)
+    finally:
+        seen.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    print(f"数据清洗完成（流式）：{rows_in}行 → {rows_out}行（去重+标签编码）")
+    return codes, rows_in, rows_out
+
+
+# --------------------------
+# 二进制列式数据集（内存映射，零拷贝加载）
+# --------------------------
+def dataset_path_for(processed_path):
+    """清洗后CSV对应的二进制数据集路径：同目录同名，扩展名.bin"""
+    return os.path.splitext(processed_path)[0] + ".bin"
+
+
+def write_columnar(frames, path, feature_dtype=DATASET_FEATURE_DTYPE):
+    """
+    把清洗后的数据（DataFrame的可迭代对象，可分块传入）写成二进制数据集：
+        [头部 DATASET_HEADER_SIZE 字节] [特征矩阵 行数×4，行主序] [标签向量 行数]
+    头部为 DATASET_MAGIC + JSON（列名、dtype、行数、各段偏移），数据均为小端序。
+    标签先写到临时文件、特征写完后再拼到末尾，内存占用只与单个块大小有关。返回行数
+    """
+    feature_columns = COLUMN_NAMES[:4]
+    feature_dtype = np.dtype(feature_dtype).newbyteorder("<")
+    label_dtype = np.dtype(DATASET_LABEL_DTYPE)
+    tmp_path = f"{path}.tmp"
+    rows = 0
+    with open(tmp_path, "wb") as out, tempfile.TemporaryFile() as labels:
+        out.write(b"\0" * DATASET_HEADER_SIZE)
+        for frame in frames:
+            frame[feature_columns].to_numpy(dtype=feature_dtype).tofile(out)
+            frame["species"].to_numpy(dtype=label_dtype).tofile(labels)
+            rows += len(frame)
+        features_offset = DATASET_HEADER_SIZE
+        labels_offset = (
+            features_offset + rows * len(feature_columns) * feature_dtype.itemsize
+        )
+        padding = -labels_offset % 64  # 标签向量按64字节对齐
+        out.write(b"\0" * padding)
+        labels_offset += padding
+        labels.seek(0)
+        shutil.copyfileobj(labels, out)
+
+        schema = {
+            "version": 1,
+            "rows": rows,
+            "feature_columns": feature_columns,
+            "feature_dtype": feature_dtype.str,
+            "features_offset": features_offset,
+            "label_column": "species",
+            "label_dtype": label_dtype.str,
+            "labels_offset": labels_offset,
+        }
+        header = DATASET_MAGIC + json.dumps(schema).encode("utf-8")
+        if len(header) > DATASET_HEADER_SIZE:
+            raise ValueError(f"数据集头部超过{DATASET_HEADER_SIZE}字节")
+        out.seek(0)
+        out.write(header.ljust(DATASET_HEADER_SIZE, b" "))
+    os.replace(tmp_path, path)
+    return rows
+
+
+def read_dataset_schema(path):
+    """读取二进制数据集的头部（模式描述）"""
+    with open(path, "rb") as f:
+        header = f.read(DATASET_HEADER_SIZE)
+    if not header.startswith(DATASET_MAGIC):
+        raise ValueError(f"不是有效的二进制数据集（magic不匹配）：{path}")
+    schema = json.loads(header[len(DATASET_MAGIC) :].rstrip(b" "))
+    expected_size = (
+        schema["labels_offset"]
+        + schema["rows"] * np.dtype(schema["label_dtype"]).itemsize
+    )
+    if os.path.getsize(path) < expected_size:
+        raise ValueError(f"二进制数据集不完整：{path}")
+    return schema
+
+
+def load_columnar(path):
+    """
+    内存映射二进制数据集，返回 (特征矩阵, 标签向量, 模式)。
+    两个数组都是只读np.memmap，直接指向文件内容，加载时不解析、不拷贝；
+    按索引取行（X[idx]）时才把用到的行读入内存
+    """
+    schema = read_dataset_schema(path)
+    rows, n_features = schema["rows"], len(schema["feature_columns"])
+    if rows == 0:  # 长度为0的区域无法mmap
+        return (
+            np.empty((0, n_features), dtype=schema["feature_dtype"]),
+            np.empty(0, dtype=schema["label_dtype"]),
+            schema,
+        )
+    X = np.memmap(
+        path,
+        dtype=schema["feature_dtype"],
+        mode="r",
+        offset=schema["features_offset"],
+        shape=(rows, n_features),
+    )
+    y = np.memmap(
+        path,
+        dtype=schema["label_dtype"],
+        mode="r",
+        offset=schema["labels_offset"],
+        shape=(rows,),
+    )
+    return X, y, schema
+
+
+# --------------------------
+# 增量执行
+# --------------------------
+def _materialize(cached_path, target_path, expected_sha256, stat_cache):
+    """目标文件不存在或内容与缓存不一致时，从缓存拷贝过去"""
+    if os.path.exists(target_path):
+        if cached_file_digest(target_path, stat_cache) == expected_sha256:
+            return False
+    os.makedirs(os.path.dirname(target_path) or ".", exist_ok=True)
+    shutil.copyfile(cached_path, target_path)
+    cached_file_digest(target_path, stat_cache)
+    return True
+
+
+def _import_processed(
+    processed_path, label_map_path, cached_output, cached_dataset, feature_dtype
+):
+    """没有原始数据时：清洗后数据原样放入缓存并分块转成二进制数据集，返回 (标签映射, 行数, 行数)"""
+    with open(label_map_path, "r", encoding="utf-8") as f:
+        label_map = yaml.safe_load(f)
+    header = list(pd.read_csv(processed_path, nrows=0).columns)
+    if header != COLUMN_NAMES:
+        raise ValueError(f"清洗后数据列名不符：{header}，预期{COLUMN_NAMES}")
+    shutil.copyfile(processed_path, f"{cached_output}.tmp")
+    os.replace(f"{cached_output}.tmp", cached_output)
+    rows = write_columnar(
+        pd.read_csv(
+            cached_output,
+            dtype=dict(COLUMN_DTYPES, species="int64"),
+            chunksize=STREAMING_CHUNKSIZE,
+        ),
+        cached_dataset,
+        feature_dtype,
+    )
+    return label_map, rows, rows
+
+
+def prepare_data(
+    raw_path=RAW_PATH,
+    processed_path=PROCESSED_PATH,
+    label_map_path=LABEL_MAP_PATH,
+    cache_dir=CACHE_DIR,
+    force=False,
+    streaming=None,
+    dataset_path=None,
+    feature_dtype=DATASET_FEATURE_DTYPE,
+):
+    """
+    增量执行清洗流程，返回本次数据的清单（manifest）：
+    - streaming=None时原始文件超过STREAMING_THRESHOLD_BYTES自动改用流式清洗（结果相同）
+    - 同时输出二进制数据集（dataset_path，默认与processed_path同名的.bin），供训练内存映射
+    - 缓存键 = sha256(原始数据sha256 + 清洗代码sha256 + 特征dtype)
+    - 命中缓存时不读取/清洗数据，只在输出文件缺失或被改动时从缓存拷回
+    - 清单中的 data_md5 为清洗后数据的md5（与DVC的.dvc文件记录方式一致），供训练记录使用
+    - 原始文件不在仓库中（gitignore）：不存在时改用DVC跟踪的清洗后数据（dvc pull得到）和
+      仓库中的标签映射，以清洗后数据的sha256作缓存键，只生成二进制数据集
+    """
+    source_path = raw_path
+    if not os.path.exists(raw_path):
+        if not (os.path.exists(processed_path) and os.path.exists(label_map_path)):
+            raise FileNotFoundError(
+                f"原始数据文件不存在：{raw_path}，清洗后数据{processed_path}也不存在\n"
+                "请在data/raw/目录下放置iris_v1.csv，或执行 dvc pull 获取清洗后数据"
+            )
+        source_path = processed_path
+        print(f"原始数据文件不存在：{raw_path}，改用清洗后数据：{processed_path}")
+    stat_cache = _load_stat_cache(cache_dir)
+    raw_sha256 = cached_file_digest(source_path, stat_cache)
+    code_sha256 = code_fingerprint()
+    feature_dtype = np.dtype(feature_dtype).name
+    key = hashlib.sha256(
+        f"{raw_sha256}:{code_sha256}:{feature_dtype}".encode()
+    ).hexdigest()[:16]
+    entry_dir = os.path.join(cache_dir, key)
+    manifest_path = os.path.join(entry_dir, "manifest.json")
+    cached_output = os.path.join(entry_dir, os.path.basename(processed_path))
+    cached_label_map = os.path.join(entry_dir, "label_map.yml")
+    dataset_path = dataset_path or dataset_path_for(processed_path)
+    cached_dataset = os.path.join(entry_dir, os.path.basename(dataset_path))
+
+    manifest = None
+    if not force and os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        cached_files = (cached_output, cached_label_map, cached_dataset)
+        if not all(os.path.exists(path) for path in cached_files):
+            manifest = None
+
+    if manifest is not None:
+        cache_hit = True
+        print(f"数据未变化，复用缓存：{entry_dir}")
+    else:
+        cache_hit = False
+        os.makedirs(entry_dir, exist_ok=True)
+        if streaming is None:
+            streaming = os.path.getsize(source_path) > STREAMING_THRESHOLD_BYTES
+        if source_path != raw_path:
+            label_map, rows_in, rows_out = _import_processed(
+                processed_path,
+                label_map_path,
+                cached_output,
+                cached_dataset,
+                feature_dtype,
+            )
+        elif streaming:
+            label_map, rows_in, rows_out = clean_data_streaming(raw_path, cached_output)
+            # 二进制数据集从清洗结果分块转换，内存占用同样与数据量无关
+            write_columnar(
+                pd.read_csv(
+                    cached_output,
+                    dtype=dict(COLUMN_DTYPES, species="int64"),
+                    chunksize=STREAMING_CHUNKSIZE,
+                ),
+                cached_dataset,
+                feature_dtype,
+            )
+        else:
+            df_clean, label_map, rows_in = clean_data(raw_path)
+            rows_out = len(df_clean)
+            # 先写临时文件再原子替换，避免中断留下半份缓存
+            tmp_output = f"{cached_output}.tmp"
+            df_clean.to_csv(tmp_output, index=False, header=True)
+            os.replace(tmp_output, cached_output)
+            write_columnar([df_clean], cached_dataset, feature_dtype)
+        with open(f"{cached_label_map}.tmp", "w", encoding="utf-8") as f:
+            yaml.dump(label_map, f)
+        os.replace(f"{cached_label_map}.tmp", cached_label_map)
+        manifest = {
+            "key": key,
+            "raw_path": source_path,
+            "raw_sha256": raw_sha256,
+            "code_sha256": code_sha256,
+            "data_sha256": file_digest(cached_output),
+            "data_md5": file_digest(cached_output, "md5"),
+            "label_map_sha256": file_digest(cached_label_map),
+            "dataset_sha256": file_digest(cached_dataset),
+            "feature_dtype": feature_dtype,
+            "rows_in": rows_in,
+            "rows_out": rows_out,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        with open(f"{manifest_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+
+    if _materialize(cached_output, processed_path, manifest["data_sha256"], stat_cache):
+        print(f"清洗后数据已保存至：{processed_path}")
+    if _materialize(
+        cached_label_map, label_map_path, manifest["label_map_sha256"], stat_cache
+    ):
+        print(f"标签映射已保存至：{label_map_path}")
+    if _materialize(
+        cached_dataset, dataset_path, manifest["dataset_sha256"], stat_cache
+    ):
+        print(f"二进制数据集已保存至：{dataset_path}")
+    _save_stat_cache(cache_dir, stat_cache)
+    return dict(manifest, cache_hit=cache_hit)
+
+
+def load_and_clean_data(force=False):
+    """执行（或复用）清洗流程并返回清洗后的数据"""
+    prepare_data(force=force)
+    return pd.read_csv(PROCESSED_PATH)
 
 
 if __name__ == "__main__":
-    load_and_clean_data()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="数据清洗（输入未变化时复用缓存）")
+    parser.add_argument("--force", action="store_true", help="忽略缓存强制重新清洗")
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        default=None,
+        help="强制使用流式清洗（默认按文件大小自动选择）",
+    )
+    parser.add_argument(
+        "--feature-dtype",
+        choices=["float64", "float32"],
+        default=DATASET_FEATURE_DTYPE,
+        help="二进制数据集的特征精度（float32体积减半）",
+    )
+    args = parser.parse_args()
+    info = prepare_data(
+        force=args.force, streaming=args.streaming, feature_dtype=args.feature_dtype
+    )
+    print(
+        f"数据哈希（md5）：{info['data_md5']}，缓存键：{info['key']}，"
+        f"{'命中缓存' if info['cache_hit'] else '已重新计算'}"
+    )
@@ -0,0 +1,247 @@
+# ml/drift.py（特征分布统计：训练时保存参考统计，服务端按同样的格式在线累计并对比）
+import json
+import os
+import sys
+import numpy as np
+
+# 参考统计格式版本（字段变化时递增）
+REFERENCE_FORMAT_VERSION = 1
+DEFAULT_REFERENCE_PATH = "ml/registry/reference_stats.json"
+DEFAULT_BINS = 20
+# PSI（群体稳定性指数）经验阈值：<0.1 稳定，0.1~0.25 轻微漂移，≥0.25 明显漂移
+PSI_WARN = 0.1
+PSI_DRIFT = 0.25
+_PSI_EPSILON = 1e-4
+
+
+class RunningStats:
+    """
+    一组特征的流式统计，内存与样本数无关：每个特征只保存
+    样本数、均值、离差平方和（M2）、最小/最大值，以及固定分箱直方图（首尾各一个溢出箱）。
+    update() 按批合并（Chan等人的并行Welford公式），与逐条Welford结果一致且数值稳定
+    """
+
+    def __init__(self, edges):
+        # edges：(特征数, 分箱数+1)，各特征的分箱边界
+        self.edges = np.asarray(edges, dtype=np.float64)
+        n_features = self.edges.shape[0]
+        self.count = 0
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)
+        self.min = np.full(n_features, np.inf)
+        self.max = np.full(n_features, -np.inf)
+        self.hist = np.zeros((n_features, self.edges.shape[1] + 1), dtype=np.int64)
+
+    def update(self, X):
+        """合并一批样本（X：(行数, 特征数)，调用方保证全部为有限值）"""
+        X = np.asarray(X, dtype=np.float64)
+        m = len(X)
+        if m == 0:
+            return
+        batch_mean = X.mean(axis=0)
+        batch_m2 = ((X - batch_mean) ** 2).sum(axis=0)
+        n = self.count + m
+        delta = batch_mean - self.mean
+        self.mean += delta * (m / n)
+        self.m2 += batch_m2 + delta**2 * (self.count * m / n)
+        self.count = n
+        np.minimum(self.min, X.min(axis=0), out=self.min)
+        np.maximum(self.max, X.max(axis=0), out=self.max)
+        n_slots = self.hist.shape[1]
+        for j, edges in enumerate(self.edges):
+            slots = np.searchsorted(edges, X[:, j], side="right")
+            self.hist[j] += np.bincount(slots, minlength=n_slots)
+
+    @property
+    def variance(self):
+        """样本方差（n-1）"""
+        if self.count < 2:
+            return np.zeros_like(self.m2)
+        return self.m2 / (self.count - 1)
+
+    def copy(self):
+        stats = RunningStats(self.edges)
+        stats.count = self.count
+        for name in ("mean", "m2", "min", "max", "hist"):
+            setattr(stats, name, getattr(self, name).copy())
+        return stats
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean": self.mean.tolist(),
+            "m2": self.m2.tolist(),
+            "std": np.sqrt(self.variance).tolist(),
+            "min": self.min.tolist() if self.count else None,
+            "max": self.max.tolist() if self.count else None,
+            "hist": self.hist.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data, edges):
+        stats = cls(edges)
+        stats.count = int(data["count"])
+        stats.mean = np.asarray(data["mean"], dtype=np.float64)
+        stats.m2 = np.asarray(data["m2"], dtype=np.float64)
+        if stats.count:
+            stats.min = np.asarray(data["min"], dtype=np.float64)
+            stats.max = np.asarray(data["max"], dtype=np.float64)
+        stats.hist = np.asarray(data["hist"], dtype=np.int64)
+        return stats
+
+
+def make_edges(X, bins=DEFAULT_BINS, margin=0.1):
+    """按训练数据的取值范围（两侧各外扩margin倍跨度）生成等宽分箱边界"""
+    X = np.asarray(X, dtype=np.float64)
+    lo, hi = X.min(axis=0), X.max(axis=0)
+    span = np.where(hi > lo, hi - lo, 1.0)
+    return np.linspace(lo - margin * span, hi + margin * span, bins + 1, axis=1)
+
+
+def compute_reference(X, y, feature_names, bins=DEFAULT_BINS):
+    """
+    由训练数据计算参考统计：整体及按类别的 RunningStats，以及类别分布；
+    服务端用同样的分箱边界累计线上数据，直方图可直接对比
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    edges = make_edges(X, bins)
+    overall = RunningStats(edges)
+    overall.update(X)
+    by_class = {}
+    for label in np.unique(y).tolist():
+        stats = RunningStats(edges)
+        stats.update(X[y == label])
+        by_class[str(label)] = stats.to_dict()
+    return {
+        "format_version": REFERENCE_FORMAT_VERSION,
+        "feature_names": list(feature_names),
+        "edges": edges.tolist(),
+        "overall": overall.to_dict(),
+        "by_class": by_class,
+    }
+
+
+def save_reference(reference, path=DEFAULT_REFERENCE_PATH):
+    """先写临时文件再替换，避免服务进程读到半个文件"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(reference, f, ensure_ascii=False)
+    os.replace(f"{path}.tmp", path)
+
+
+def load_reference(path=DEFAULT_REFERENCE_PATH):
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"参考统计不存在：{path}\n请先运行 python ml/train.py 或 python ml/drift.py 生成"
+        )
+    with open(path, "r", encoding="utf-8") as f:
+        reference = json.load(f)
+    if reference.get("format_version") != REFERENCE_FORMAT_VERSION:
+        raise ValueError(
+            f"参考统计格式版本不支持：{reference.get('format_version')}"
+            f"（当前支持{REFERENCE_FORMAT_VERSION}）"
+        )
+    return reference
+
+
+# --------------------------
+# 对比
+# --------------------------
+def psi(expected_counts, actual_counts):
+    """两个直方图之间的PSI（任一侧为空时返回None）"""
+    expected = np.asarray(expected_counts, dtype=np.float64)
+    actual = np.asarray(actual_counts, dtype=np.float64)
+    if expected.sum() == 0 or actual.sum() == 0:
+        return None
+    p = np.maximum(expected / expected.sum(), _PSI_EPSILON)
+    q = np.maximum(actual / actual.sum(), _PSI_EPSILON)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+def drift_level(value):
+    if value is None:
+        return "no_data"
+    if value >= PSI_DRIFT:
+        return "drift"
+    if value >= PSI_WARN:
+        return "warn"
+    return "stable"
+
+
+def compare_stats(reference, live, feature_names):
+    """逐特征对比一组线上统计与参考统计：均值偏移（以参考标准差为单位）和直方图PSI"""
+    features = {}
+    ref_std = np.sqrt(reference.variance)
+    live_std = np.sqrt(live.variance)
+    for j, name in enumerate(feature_names):
+        value = psi(reference.hist[j], live.hist[j]) if live.count else None
+        shift = None
+        if live.count and ref_std[j] > 0:
+            shift = float((live.mean[j] - reference.mean[j]) / ref_std[j])
+        features[name] = {
+            "mean": float(live.mean[j]) if live.count else None,
+            "std": float(live_std[j]) if live.count else None,
+            "min": float(live.min[j]) if live.count else None,
+            "max": float(live.max[j]) if live.count else None,
+            "reference_mean": float(reference.mean[j]),
+            "reference_std": float(ref_std[j]),
+            "mean_shift_std": shift,
+            "psi": value,
+            "level": drift_level(value),
+        }
+    return {"count": live.count, "features": features}
+
+
+def compare(reference, overall, by_class, species_map=None):
+    """
+    线上统计（整体 + 按预测类别）与参考统计对比：
+    逐特征的均值偏移和PSI、预测类别分布相对训练标签分布的PSI，以及总体漂移等级
+    """
+    names = species_map or {}
+    edges = reference["edges"]
+    feature_names = reference["feature_names"]
+    ref_overall = RunningStats.from_dict(reference["overall"], edges)
+    report = compare_stats(ref_overall, overall, feature_names)
+
+    labels = sorted(set(reference["by_class"]) | {str(k) for k in by_class})
+    ref_counts = [reference["by_class"].get(k, {"count": 0})["count"] for k in labels]
+    live_counts = [by_class[k].count if k in by_class else 0 for k in labels]
+    report["prediction_distribution"] = {
+        "classes": [str(names.get(int(k), k)) for k in labels],
+        "reference": ref_counts,
+        "live": live_counts,
+        "psi": psi(ref_counts, live_counts),
+    }
+    report["prediction_distribution"]["level"] = drift_level(
+        report["prediction_distribution"]["psi"]
+    )
+    report["by_class"] = {
+        str(names.get(int(k), k)): compare_stats(
+            RunningStats.from_dict(reference["by_class"][k], edges),
+            by_class[k],
+            feature_names,
+        )
+        for k in labels
+        if k in by_class and k in reference["by_class"]
+    }
+    levels = [f["level"] for f in report["features"].values()]
+    levels.append(report["prediction_distribution"]["level"])
+    report["level"] = next(
+        (lv for lv in ("drift", "warn", "stable") if lv in levels), "no_data"
+    )
+    return report
+
+
+if __name__ == "__main__":
+    # 用法：python ml/drift.py [清洗后数据CSV] [输出路径]
+    # 不重新训练，直接由清洗后的数据生成参考统计
+    import pandas as pd
+
+    data_path = sys.argv[1] if len(sys.argv) > 1 else "data/processed/iris_v2.csv"
+    out_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_REFERENCE_PATH
+    df = pd.read_csv(data_path)
+    feature_names = ["sepal_length", "sepal_width", "petal_length", "petal_width"]
+    reference = compute_reference(df[feature_names], df["species"], feature_names)
+    save_reference(reference, out_path)
+    print(f"参考统计已保存至：{out_path}（{reference['overall']['count']}行）")
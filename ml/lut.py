@@ -0,0 +1,298 @@
+# ml/lut.py（查表预测：把线性模型在量化特征网格上的预测结果预先算好，打包成紧凑数组）
+import hashlib
+import os
+import sys
+import time
+import numpy as np
+
+# 查表产物格式版本（字段变化时递增）
+LUT_FORMAT_VERSION = 1
+DEFAULT_LUT_PATH = "ml/registry/model_lut.npz"
+# 默认网格：0.1cm精度，覆盖鸢尾花数据集的取值范围并留出余量（单位cm，闭区间）
+DEFAULT_RESOLUTION = 0.1
+DEFAULT_BOUNDS = [
+    (4.0, 8.0),  # sepal_length
+    (2.0, 4.5),  # sepal_width
+    (1.0, 7.0),  # petal_length
+    (0.1, 2.6),  # petal_width
+]
+
+
+def scorer_fingerprint(scorer):
+    """打分器权重的sha256：查表产物记录编译时的模型，模型变化后旧表不再使用"""
+    digest = hashlib.sha256()
+    for value in (scorer.coef, scorer.intercept):
+        value = np.ascontiguousarray(value, dtype=np.float64)
+        digest.update(str(value.shape).encode("utf-8"))
+        digest.update(value.tobytes())
+    # 类别按取值计入（共享内存中的打分器会把类别转成int64，不应视为不同模型）
+    digest.update(repr(np.asarray(scorer.classes).tolist()).encode("utf-8"))
+    digest.update(b"ovr" if scorer.ovr else b"multinomial")
+    return digest.hexdigest()
+
+
+class LookupTable:
+    """
+    量化网格上的预测表：每个特征取 [lo, hi] / scale 上的整数格点，
+    格点的C顺序下标 → 类别序号，按bits位打包（3个类别每格2位，一个字节存4格）。
+    只有特征值恰好落在格点上（x == q / scale，与编译时打分用的是同一个浮点数）才算命中，
+    因此命中时的结果与模型逐位一致；超出范围或不在格点上的输入由调用方回退到模型
+    """
+
+    def __init__(self, lo, hi, scale, classes, packed, bits, model_sha256):
+        self.lo = [int(v) for v in lo]
+        self.hi = [int(v) for v in hi]
+        self.scale = int(scale)
+        self.classes = np.asarray(classes)
+        self.packed = np.ascontiguousarray(packed, dtype=np.uint8)
+        self.bits = int(bits)
+        self.model_sha256 = str(model_sha256)
+        self.shape = tuple(h - l + 1 for l, h in zip(self.lo, self.hi))
+        self.cells = int(np.prod(self.shape))
+        self.strides = [
+            int(np.prod(self.shape[i + 1 :])) for i in range(len(self.shape))
+        ]
+        if len(self.packed) * (8 // self.bits) < self.cells:
+            raise ValueError(
+                f"查表数据长度不足：{len(self.packed)}字节，{self.cells}格"
+            )
+        # 单条查表热路径只用Python原生类型（bytes索引返回int，比NumPy标量快一个数量级）
+        self._table = self.packed.tobytes()
+        self._labels = self.classes.tolist()
+        self._per_byte_shift = {1: 3, 2: 2, 4: 1, 8: 0}[self.bits]
+        self._slot_mask = (8 // self.bits) - 1
+        self._code_mask = (1 << self.bits) - 1
+        self._axes = list(zip(self.lo, self.hi, self.strides))
+
+    @property
+    def nbytes(self):
+        return self.packed.nbytes
+
+    def lookup_one(self, features):
+        """
+        单条查表，返回 (标签, 原因)：命中时原因为None；
+        未命中时标签为None，原因为 "out_of_range" 或 "off_grid"
+        """
+        scale, index = self.scale, 0
+        for x, (lo, hi, stride) in zip(features, self._axes):
+            v = x * scale
+            # 比较写成取反形式：NaN也判为超出范围
+            if not (lo - 0.5 <= v < hi + 0.5):
+                return None, "out_of_range"
+            q = round(v)
+            if q / scale != x:
+                return None, "off_grid"
+            index += (q - lo) * stride
+        byte = self._table[index >> self._per_byte_shift]
+        code = (byte >> ((index & self._slot_mask) * self.bits)) & self._code_mask
+        return self._labels[code], None
+
+    def lookup(self, X):
+        """批量查表，返回 (标签数组, 命中掩码, 超出范围掩码)；未命中行的标签无意义"""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        lo = np.asarray(self.lo, dtype=np.float64)
+        hi = np.asarray(self.hi, dtype=np.float64)
+        with np.errstate(invalid="ignore"):
+            V = X * self.scale
+            in_range = ((V >= lo - 0.5) & (V < hi + 0.5)).all(axis=1)
+            Q = np.where(in_range[:, None], np.rint(V), lo)
+            hit = in_range & (Q / self.scale == X).all(axis=1)
+        index = ((Q - lo).astype(np.int64) * np.asarray(self.strides)).sum(axis=1)
+        index[~hit] = 0
+        slot = (index & self._slot_mask) * self.bits
+        codes = (self.packed[index >> self._per_byte_shift] >> slot) & self._code_mask
+        return self.classes[codes], hit, ~in_range
+
+    def grid(self):
+        """各特征的格点取值（与编译时打分使用的浮点数完全相同）"""
+        return [np.arange(l, h + 1) / self.scale for l, h in zip(self.lo, self.hi)]
+
+    def describe(self):
+        return {
+            "format_version": LUT_FORMAT_VERSION,
+            "resolution": 1 / self.scale,
+            "bounds": [
+                [l / self.scale, h / self.scale] for l, h in zip(self.lo, self.hi)
+            ],
+            "cells": self.cells,
+            "bits_per_cell": self.bits,
+            "bytes": self.nbytes,
+            "model_sha256": self.model_sha256,
+        }
+
+
+def _iter_grid_chunks(axes):
+    """按第一个特征的取值分块生成格点矩阵（C顺序），内存占用只有一块的大小"""
+    rest = np.stack(np.meshgrid(*axes[1:], indexing="ij"), axis=-1).reshape(
+        -1, len(axes) - 1
+    )
+    for value in axes[0]:
+        yield np.column_stack([np.full(len(rest), value), rest])
+
+
+def compile_lut(scorer, bounds=DEFAULT_BOUNDS, resolution=DEFAULT_RESOLUTION):
+    """在量化网格上逐块调用模型打分，把结果打包成LookupTable"""
+    if len(bounds) != scorer.n_features:
+        raise ValueError(f"网格维数需为{scorer.n_features}，实际为{len(bounds)}")
+    scale = int(round(1 / resolution))
+    if not np.isclose(scale * resolution, 1.0):
+        raise ValueError(f"网格精度需为1/整数：{resolution}")
+    lo = [int(round(a * scale)) for a, _ in bounds]
+    hi = [int(round(b * scale)) for _, b in bounds]
+    if any(h < l for l, h in zip(lo, hi)):
+        raise ValueError(f"网格上下界无效：{bounds}")
+    classes = np.asarray(scorer.classes)
+    # 每格位数取能容纳类别数的2的幂（1/2/4/8），保证格子不跨字节
+    bits = next(b for b in (1, 2, 4, 8) if len(classes) <= 1 << b)
+    per_byte = 8 // bits
+
+    axes = [np.arange(l, h + 1) / scale for l, h in zip(lo, hi)]
+    codes = np.concatenate(
+        [
+            np.searchsorted(classes, scorer.predict(chunk)).astype(np.uint8)
+            for chunk in _iter_grid_chunks(axes)
+        ]
+    )
+    codes = np.concatenate(
+        [codes, np.zeros(-len(codes) % per_byte, dtype=np.uint8)]
+    ).reshape(-1, per_byte)
+    shifts = (np.arange(per_byte) * bits).astype(np.uint8)
+    packed = np.bitwise_or.reduce(codes << shifts, axis=1).astype(np.uint8)
+    return LookupTable(lo, hi, scale, classes, packed, bits, scorer_fingerprint(scorer))
+
+
+def verify_lut(table, scorer, n_random=100000, seed=0):
+    """
+    校验查表结果与模型一致，返回不一致的格数（0表示通过）：
+    全部格点经批量查表路径解码后与模型逐块比对，另抽随机输入比对单条查表路径
+    """
+    mismatches = 0
+    for chunk in _iter_grid_chunks(table.grid()):
+        labels, hit, _ = table.lookup(chunk)
+        if not hit.all():
+            raise AssertionError("格点未全部命中，网格下标计算有误")
+        mismatches += int(np.count_nonzero(labels != scorer.predict(chunk)))
+
+    # 随机输入：一半取格点、一半取任意浮点数（含范围外），未命中的行不参与比对
+    rng = np.random.default_rng(seed)
+    grid = table.grid()
+    for i in range(n_random):
+        if i % 2:
+            features = [float(rng.choice(axis)) for axis in grid]
+        else:
+            features = rng.uniform(0.0, 9.0, size=len(grid)).tolist()
+        label, _ = table.lookup_one(features)
+        if label is not None and label != scorer.predict_one(features):
+            mismatches += 1
+    return mismatches
+
+
+# --------------------------
+# 查表产物（.npz）
+# --------------------------
+def save_lut(table, path):
+    """先写临时文件再替换，避免服务进程读到半个文件"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            format_version=np.array(LUT_FORMAT_VERSION, dtype=np.int64),
+            lo=np.array(table.lo, dtype=np.int64),
+            hi=np.array(table.hi, dtype=np.int64),
+            scale=np.array(table.scale, dtype=np.int64),
+            classes=table.classes,
+            packed=table.packed,
+            bits=np.array(table.bits, dtype=np.int64),
+            model_sha256=np.array(table.model_sha256),
+        )
+    os.replace(tmp_path, path)
+
+
+def load_lut(path):
+    with np.load(path, allow_pickle=False) as data:
+        format_version = int(data["format_version"])
+        if format_version != LUT_FORMAT_VERSION:
+            raise ValueError(
+                f"查表产物格式版本不支持：{format_version}（当前支持{LUT_FORMAT_VERSION}）"
+            )
+        return LookupTable(
+            data["lo"],
+            data["hi"],
+            int(data["scale"]),
+            data["classes"],
+            data["packed"],
+            int(data["bits"]),
+            str(data["model_sha256"]),
+        )
+
+
+class LutScorer:
+    """
+    在打分器外包一层查表：单条/批量预测先查表，未命中（超出范围或不在0.1cm格点上）
+    的输入回退到原打分器；概率等其余接口直接转发给原打分器。
+    命中/回退计数不加锁（只用于观测，多线程下可能少计极少数）
+    """
+
+    def __init__(self, scorer, table):
+        if table.model_sha256 != scorer_fingerprint(scorer):
+            raise ValueError("查表产物与当前模型不匹配，请重新编译")
+        self.scorer = scorer
+        self.table = table
+        self.counts = {"hits": 0, "out_of_range": 0, "off_grid": 0}
+
+    def __getattr__(self, name):
+        return getattr(self.scorer, name)
+
+    def predict_one(self, features):
+        label, reason = self.table.lookup_one(features)
+        if reason is None:
+            self.counts["hits"] += 1
+            return label
+        self.counts[reason] += 1
+        return self.scorer.predict_one(features)
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        labels, hit, out_of_range = self.table.lookup(X)
+        n_hit, n_out = int(np.count_nonzero(hit)), int(np.count_nonzero(out_of_range))
+        self.counts["hits"] += n_hit
+        self.counts["out_of_range"] += n_out
+        self.counts["off_grid"] += len(labels) - n_hit - n_out
+        if n_hit < len(labels):
+            labels[~hit] = self.scorer.predict(X[~hit])
+        return labels
+
+    def stats(self):
+        counts = dict(self.counts)
+        total = sum(counts.values())
+        return dict(
+            counts,
+            hit_rate=counts["hits"] / total if total else None,
+            table=self.table.describe(),
+        )
+
+
+if __name__ == "__main__":
+    # 用法：python ml/lut.py [精简产物路径] [输出路径]
+    # 从精简服务产物编译查表产物，并与模型逐格比对
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+    from ml.scoring import DEFAULT_ARTIFACT_PATH, load_artifact
+
+    artifact_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_ARTIFACT_PATH
+    out_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_LUT_PATH
+    scorer, meta = load_artifact(artifact_path)
+    start = time.perf_counter()
+    table = compile_lut(scorer)
+    compile_seconds = time.perf_counter() - start
+    mismatches = verify_lut(table, scorer)
+    if mismatches:
+        print(f"❌ 查表结果与模型不一致：{mismatches}处")
+        sys.exit(1)
+    save_lut(table, out_path)
+    print(
+        f"查表产物已导出至：{out_path}（{table.cells}格，{table.nbytes}字节，"
+        f"编译耗时{compile_seconds:.2f}s，逐格校验通过）"
+    )
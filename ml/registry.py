@@ -1,57 +1,506 @@
-# ml/registry.py（完整修复版）
-import mlflow.sklearn
-import yaml
+# ml/registry.py（模型注册表：索引文件 + 兼容旧的current_model.md）
+import argparse
+import glob
+import hashlib
+import json
 import os
+import shutil
+import time
+import yaml
 
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+REGISTRY_INDEX_PATH = os.path.join(PROJECT_ROOT, "ml", "registry", "index.json")
+MLRUNS_ROOT = os.path.join(PROJECT_ROOT, "mlruns")
+DEFAULT_MODEL_NAME = "Iris-Production-Model"
+DEFAULT_STAGE = "Production"
+INDEX_FORMAT_VERSION = 1
 
-def get_production_model():
-    """加载生产模型（优先读取新训练的路径，自动验证有效性）"""
-    model_path = ""
-    current_model_file = "ml/registry/current_model.md"
-
-    # 1. 优先读取新训练生成的current_model.md（重新训练后会自动更新）
-    if os.path.exists(current_model_file):
-        try:
-            with open(current_model_file, "r", encoding="utf-8") as f:
-                for line in f:
-                    if "模型路径：" in line:
-                        model_path = line.split("：")[-1].strip()
-                        print(f"从current_model.md读取到模型路径：{model_path}")
-                        break
-            # 验证读取到的路径是否存在
-            if model_path and os.path.exists(model_path):
-                return mlflow.sklearn.load_model(model_path)
-            else:
-                print(
-                    f"current_model.md中记录的路径无效：{model_path}，尝试查找最新模型"
-                )
-        except Exception as e:
-            print(f"读取current_model.md出错：{str(e)}，尝试查找最新模型")
-
-    # 2. 自动查找mlruns中最新的模型（避免依赖硬编码路径）
-    mlruns_root = "mlruns"
-    if os.path.exists(mlruns_root):
-        # 递归查找所有包含MLmodel文件的模型目录（MLflow模型标志）
-        model_dirs = []
-        for root, dirs, files in os.walk(mlruns_root):
-            if "MLmodel" in files:
-                # 记录路径和最后修改时间（用于排序）
-                model_dirs.append((root, os.path.getmtime(root)))
-        # 按修改时间排序，取最新的模型
-        if model_dirs:
-            latest_model_path = sorted(model_dirs, key=lambda x: x[1], reverse=True)[0][
-                0
-            ]
+
+# --------------------------
+# 注册表索引（ml/registry/index.json）
+# 结构：models → 模型名 → {latest_version, stages: {阶段: 版本}, versions: {版本: 记录}}
+# 记录包含 path（相对项目根目录）、run_id、metrics、checksum 等，查找为O(1)字典访问
+# --------------------------
+def _abs_path(path):
+    return path if os.path.isabs(path) else os.path.join(PROJECT_ROOT, path)
+
+
+def _rel_path(path):
+    """项目内路径统一存为相对路径，使用'/'分隔，兼容Windows训练、Linux部署"""
+    path = os.path.abspath(path)
+    if path.startswith(PROJECT_ROOT + os.sep):
+        path = os.path.relpath(path, PROJECT_ROOT)
+    return path.replace(os.sep, "/")
+
+
+def model_checksum(model_dir):
+    """对模型目录下所有文件（按相对路径排序）计算sha256"""
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(model_dir):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            digest.update(os.path.relpath(file_path, model_dir).encode("utf-8"))
+            with open(file_path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+    return digest.hexdigest()
+
+
+_index_cache = {"path": None, "mtime": None, "index": None}
+
+
+def load_registry_index(index_path=None):
+    """读取索引文件（按mtime缓存，文件未变化时不重复解析）；不存在时返回None"""
+    index_path = index_path or REGISTRY_INDEX_PATH
+    try:
+        mtime = os.path.getmtime(index_path)
+    except OSError:
+        return None
+    if _index_cache["path"] == index_path and _index_cache["mtime"] == mtime:
+        return _index_cache["index"]
+    with open(index_path, "r", encoding="utf-8") as f:
+        index = json.load(f)
+    _index_cache.update(path=index_path, mtime=mtime, index=index)
+    return index
+
+
+def write_registry_index(index, index_path=None):
+    """原子写入索引：先写同目录临时文件再os.replace，读方不会看到半个文件"""
+    index_path = index_path or REGISTRY_INDEX_PATH
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    index["format_version"] = INDEX_FORMAT_VERSION
+    index["updated_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    tmp_path = f"{index_path}.tmp.{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, ensure_ascii=False, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, index_path)
+
+
+def resolve_model_entry(name=DEFAULT_MODEL_NAME, version=None, stage=None, index=None):
+    """
+    按 模型名 + 版本/阶段 查找注册记录：
+    - 指定version：返回该版本
+    - 指定stage：返回该阶段对应版本
+    - 都不指定：优先Production阶段，否则最新版本
+    找不到返回None
+    """
+    index = index if index is not None else load_registry_index()
+    if not index:
+        return None
+    model = index.get("models", {}).get(name)
+    if not model:
+        return None
+    if version is None:
+        stages = model.get("stages", {})
+        if stage is not None:
+            version = stages.get(stage)
+        else:
+            version = stages.get(DEFAULT_STAGE, model.get("latest_version"))
+    if version is None:
+        return None
+    entry = model.get("versions", {}).get(str(version))
+    if entry is None:
+        return None
+    return dict(entry, name=name, version=str(version))
+
+
+def register_model_version(
+    model_dir,
+    name=DEFAULT_MODEL_NAME,
+    stage=DEFAULT_STAGE,
+    run_id=None,
+    metrics=None,
+    extra=None,
+    index_path=None,
+):
+    """训练完成后登记新版本（版本号自增），并把stage指向该版本；返回记录"""
+    index = load_registry_index(index_path) or {"models": {}}
+    model = index["models"].setdefault(
+        name, {"latest_version": None, "stages": {}, "versions": {}}
+    )
+    version = str(max((int(v) for v in model["versions"]), default=0) + 1)
+    entry = {
+        "path": _rel_path(model_dir),
+        "run_id": run_id,
+        "metrics": metrics or {},
+        "checksum": model_checksum(model_dir),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    entry.update(extra or {})
+    model["versions"][version] = entry
+    model["latest_version"] = version
+    if stage:
+        model["stages"][stage] = version
+    write_registry_index(index, index_path)
+    return dict(entry, name=name, version=version)
+
+
+def _read_mlflow_metrics(model_dir):
+    """读取MLflow文件存储中的指标（每行：时间戳 值 步数），取最后一条"""
+    metrics = {}
+    metrics_dir = os.path.join(os.path.dirname(model_dir), "metrics")
+    if os.path.isdir(metrics_dir):
+        for metric in os.listdir(metrics_dir):
+            with open(os.path.join(metrics_dir, metric), "r", encoding="utf-8") as f:
+                lines = [line.split() for line in f if line.strip()]
+            if lines:
+                metrics[metric] = float(lines[-1][1])
+    return metrics
+
+
+# 训练时记录的代码/数据版本参数（ml/train.py的collect_provenance），重建索引时一并带上
+PROVENANCE_PARAMS = (
+    "git_commit",
+    "dvc_data_hash",
+    "raw_data_sha256",
+    "data_pipeline_key",
+)
+
+
+def _read_mlflow_provenance(model_dir, run_id):
+    """从模型所属run的params目录读取代码/数据版本（文件内容即参数值）"""
+    experiment_dir = os.path.dirname(os.path.dirname(os.path.dirname(model_dir)))
+    provenance = {}
+    for params_dir in (
+        os.path.join(os.path.dirname(model_dir), "params"),
+        os.path.join(experiment_dir, run_id or "", "params"),
+    ):
+        for name in PROVENANCE_PARAMS:
+            path = os.path.join(params_dir, name)
+            if name not in provenance and os.path.isfile(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    provenance[name] = f.read().strip()
+    return provenance
+
+
+def rebuild_index_from_mlruns(mlruns_root=None, index_path=None):
+    """从mlruns/models下的MLflow注册表元数据重建索引（首次迁移或索引丢失时使用）"""
+    mlruns_root = mlruns_root or MLRUNS_ROOT
+    models_root = os.path.join(mlruns_root, "models")
+    index = {"models": {}}
+    if not os.path.isdir(models_root):
+        raise FileNotFoundError(f"未找到MLflow注册表目录：{models_root}")
+
+    for name in sorted(os.listdir(models_root)):
+        model_root = os.path.join(models_root, name)
+        if not os.path.isdir(model_root):
+            continue
+        model = {"latest_version": None, "stages": {}, "versions": {}}
+        for version_dir in os.listdir(model_root):
+            meta_path = os.path.join(model_root, version_dir, "meta.yaml")
+            if not version_dir.startswith("version-") or not os.path.exists(meta_path):
+                continue
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = yaml.safe_load(f)
+            # storage_location可能是训练机上的绝对路径，只保留mlruns/之后的部分
+            location = meta.get("storage_location") or meta.get("source", "")
+            suffix = location.replace("\\", "/").split("/mlruns/")[-1]
+            model_dir = os.path.join(mlruns_root, *suffix.split("/"))
+            if not os.path.exists(os.path.join(model_dir, "MLmodel")):
+                print(f"跳过{name} v{meta['version']}：模型目录不存在 {model_dir}")
+                continue
+            version = str(meta["version"])
+            model["versions"][version] = {
+                "path": _rel_path(model_dir),
+                "run_id": meta.get("run_id"),
+                "metrics": _read_mlflow_metrics(model_dir),
+                "checksum": model_checksum(model_dir),
+                "created_at": time.strftime(
+                    "%Y-%m-%dT%H:%M:%S",
+                    time.gmtime(meta.get("creation_timestamp", 0) / 1000),
+                ),
+                **_read_mlflow_provenance(model_dir, meta.get("run_id")),
+            }
+            if meta.get("current_stage") not in (None, "None"):
+                model["stages"][meta["current_stage"]] = version
+        if model["versions"]:
+            model["latest_version"] = max(model["versions"], key=int)
+            index["models"][name] = model
+
+    write_registry_index(index, index_path)
+    return index
+
+
+# --------------------------
+# 模型路径解析（app/main.py与get_production_model共用）
+# --------------------------
+def read_current_model_path(current_model_file=None):
+    """兼容旧流程：从current_model.md中读取“模型路径：”一行"""
+    current_model_file = current_model_file or os.path.join(
+        PROJECT_ROOT, "ml", "registry", "current_model.md"
+    )
+    if not os.path.exists(current_model_file):
+        return ""
+    try:
+        with open(current_model_file, "r", encoding="utf-8") as f:
+            for line in f:
+                if "模型路径：" in line:
+                    return line.split("：")[-1].strip()
+    except Exception as e:
+        print(f"读取current_model.md出错：{str(e)}")
+    return ""
+
+
+def find_latest_mlruns_model(mlruns_root=None):
+    """最后的兜底：遍历mlruns查找最近修改的模型目录（仅在索引缺失时使用）"""
+    mlruns_root = mlruns_root or MLRUNS_ROOT
+    model_dirs = []
+    for root, dirs, files in os.walk(mlruns_root):
+        if "MLmodel" in files:
+            model_dirs.append((root, os.path.getmtime(root)))
+    if not model_dirs:
+        return None
+    return sorted(model_dirs, key=lambda x: x[1], reverse=True)[0][0]
+
+
+def resolve_production_model_path(
+    name=DEFAULT_MODEL_NAME, version=None, stage=None, scan_mlruns=True
+):
+    """
+    解析生产模型路径，顺序：
+    1. 注册表索引（O(1)查找，正常路径）
+    2. current_model.md中的“模型路径：”
+    3. 遍历mlruns查找最新模型（旧行为，索引缺失时兜底，scan_mlruns=False时跳过）
+    """
+    entry = resolve_model_entry(name, version=version, stage=stage)
+    if entry:
+        model_path = _abs_path(entry["path"])
+        if os.path.exists(model_path):
+            return model_path
+        print(f"注册表索引中的路径无效：{entry['path']}，尝试其他方式")
+
+    model_path = read_current_model_path()
+    if model_path:
+        for candidate in (model_path, _abs_path(model_path)):
+            if os.path.exists(candidate):
+                print(f"从current_model.md读取到模型路径：{candidate}")
+                return candidate
+        print(f"current_model.md中记录的路径无效：{model_path}，尝试查找最新模型")
+
+    if scan_mlruns and os.path.exists(MLRUNS_ROOT):
+        latest_model_path = find_latest_mlruns_model()
+        if latest_model_path:
             print(f"自动找到最新模型路径：{latest_model_path}")
-            return mlflow.sklearn.load_model(latest_model_path)
+            return latest_model_path
+    return None
+
+
+def find_serving_artifact(entry):
+    """
+    注册版本对应的精简服务产物（训练时记录在run的 <模型>_serving/model.npz），找不到返回None：
+    MLflow 2的模型目录就在run的artifacts下；MLflow 3的模型目录为 <实验>/models/<模型ID>/artifacts，
+    产物在 <实验>/<run_id>/artifacts 下
+    """
+    model_dir = _abs_path(entry["path"])
+    candidates = [os.path.dirname(model_dir)]
+    if entry.get("run_id"):
+        experiment_dir = os.path.dirname(os.path.dirname(os.path.dirname(model_dir)))
+        candidates.append(os.path.join(experiment_dir, entry["run_id"], "artifacts"))
+    for artifacts_dir in candidates:
+        matches = sorted(
+            glob.glob(os.path.join(artifacts_dir, "*_serving", "model.npz"))
+        )
+        if matches:
+            return matches[0]
+    return None
+
+
+def get_production_model():
+    """加载生产模型（优先注册表索引，兼容current_model.md和mlruns遍历）"""
+    import mlflow.sklearn  # 延迟导入：只解析路径时不承担mlflow导入开销
+
+    model_path = resolve_production_model_path()
+    if model_path:
+        return mlflow.sklearn.load_model(model_path)
 
-    # 3. 所有方法失败，提示手动配置
+    # 所有方法失败，提示手动配置
     raise FileNotFoundError(
-        f"""
+        """
     未找到有效模型！请按以下步骤操作：
-    1. 确认已重新训练模型：python ml/train.py
-    2. 训练完成后，手动复制新模型路径（从mlflow ui获取）：
-       示例：mlruns/0/f4d46c1ca0c044f8ad51ad5f429c8138/artifacts/improved-model
-    3. 打开 ml/registry/current_model.md，将"模型路径："后的内容替换为新路径
+    1. 确认已重新训练模型：python ml/train.py（会自动更新 ml/registry/index.json）
+    2. 已有mlruns但缺少索引时，执行：python ml/registry.py rebuild
+    3. 或打开 ml/registry/current_model.md，将"模型路径："后的内容替换为新路径
     """
     )
+
+
+# --------------------------
+# mlruns压缩：清理/归档索引未引用的run和模型
+# --------------------------
+def _read_yaml(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError):
+        return {}
+
+
+def _locate_in_mlruns(path, mlruns_root):
+    """
+    模型路径 → mlruns下的 (实验, 第二级, 第三级) 目录名（第二级为run_id或"models"）；
+    训练机上的绝对路径（含/mlruns/）按其后的部分定位，不在mlruns下返回None
+    """
+    path = path.replace("\\", "/")
+    if path.startswith("file://"):
+        path = path[len("file://") :]
+    if "/mlruns/" in f"/{path}":
+        rel = f"/{path}".split("/mlruns/")[-1]
+    else:
+        full = os.path.normpath(_abs_path(path))
+        root = os.path.normpath(mlruns_root)
+        if not full.startswith(root + os.sep):
+            return None
+        rel = os.path.relpath(full, root).replace(os.sep, "/")
+    parts = [p for p in rel.split("/") if p]
+    return (parts + [None, None])[:3] if len(parts) >= 2 else None
+
+
+def referenced_artifacts(mlruns_root=None, index=None):
+    """
+    仍被引用、不能清理的 (run_id集合, 模型目录集合)：
+    - 注册表索引中的各版本，MLflow注册表（mlruns/models）中的各版本
+    - current_model.md和.env的MODEL_PATH指向的模型（resolve_production_model_path的兜底路径）
+    - 被引用模型所属的run、被引用run产出的模型（MLflow 3模型目录的source_run_id），
+      以及被引用run的父run（sweep/交叉验证的汇总run）
+    """
+    mlruns_root = mlruns_root or MLRUNS_ROOT
+    index = index if index is not None else load_registry_index() or {}
+    run_ids, model_roots, paths = set(), set(), []
+    for model in index.get("models", {}).values():
+        for entry in model.get("versions", {}).values():
+            if entry.get("run_id"):
+                run_ids.add(entry["run_id"])
+            paths.append(entry["path"])
+    for meta_path in glob.glob(
+        os.path.join(mlruns_root, "models", "*", "*", "meta.yaml")
+    ):
+        meta = _read_yaml(meta_path)
+        if meta.get("run_id"):
+            run_ids.add(meta["run_id"])
+        if meta.get("storage_location"):
+            paths.append(meta["storage_location"])
+    paths += [read_current_model_path(), os.getenv("MODEL_PATH") or ""]
+
+    # 所有模型目录的来源run、所有run的父run
+    model_runs, parents = {}, {}
+    for experiment in os.listdir(mlruns_root):
+        exp_dir = os.path.join(mlruns_root, experiment)
+        if experiment in ("models", ".trash") or not os.path.isdir(exp_dir):
+            continue
+        for model_dir in glob.glob(os.path.join(exp_dir, "models", "*")):
+            meta = _read_yaml(os.path.join(model_dir, "meta.yaml"))
+            model_runs[os.path.normpath(model_dir)] = meta.get("source_run_id")
+        for parent_tag in glob.glob(
+            os.path.join(exp_dir, "*", "tags", "mlflow.parentRunId")
+        ):
+            with open(parent_tag, "r", encoding="utf-8") as f:
+                run_id = os.path.basename(os.path.dirname(os.path.dirname(parent_tag)))
+                parents[run_id] = f.read().strip()
+
+    for path in filter(None, paths):
+        located = _locate_in_mlruns(path, mlruns_root)
+        if located is None:
+            continue
+        experiment, second, third = located
+        if second == "models" and third:
+            model_dir = os.path.normpath(
+                os.path.join(mlruns_root, experiment, second, third)
+            )
+            model_roots.add(model_dir)
+            if model_runs.get(model_dir):
+                run_ids.add(model_runs[model_dir])
+        elif second != "models":
+            run_ids.add(second)
+    pending = list(run_ids)
+    while pending:
+        parent = parents.get(pending.pop())
+        if parent and parent not in run_ids:
+            run_ids.add(parent)
+            pending.append(parent)
+    model_roots |= {d for d, run_id in model_runs.items() if run_id in run_ids}
+    return run_ids, model_roots
+
+
+def find_unreferenced_artifacts(mlruns_root=None, index=None):
+    """列出未被引用（见referenced_artifacts）的run目录和模型目录（不包含注册表元数据和实验meta.yaml）"""
+    mlruns_root = mlruns_root or MLRUNS_ROOT
+    index = index if index is not None else load_registry_index()
+    if not index:
+        raise FileNotFoundError("注册表索引不存在，拒绝清理（先执行 rebuild 或训练）")
+    run_ids, model_roots = referenced_artifacts(mlruns_root, index)
+
+    unreferenced = []
+    for experiment in sorted(os.listdir(mlruns_root)):
+        exp_dir = os.path.join(mlruns_root, experiment)
+        if experiment in ("models", ".trash") or not os.path.isdir(exp_dir):
+            continue
+        for run_id in sorted(os.listdir(exp_dir)):
+            run_dir = os.path.join(exp_dir, run_id)
+            if not os.path.isdir(run_dir):
+                continue
+            if run_id == "models":
+                for model_id in sorted(os.listdir(run_dir)):
+                    model_dir = os.path.normpath(os.path.join(run_dir, model_id))
+                    if model_dir not in model_roots:
+                        unreferenced.append(model_dir)
+            elif run_id not in run_ids:
+                unreferenced.append(os.path.normpath(run_dir))
+    return unreferenced
+
+
+def compact_mlruns(mlruns_root=None, archive_dir=None, apply=False, index=None):
+    """
+    清理未被引用的run/模型目录（索引、MLflow注册表、current_model.md、MODEL_PATH都算引用）：
+    apply=False 仅打印将处理的目录；archive_dir 指定时移动到归档目录而不是删除
+    """
+    mlruns_root = mlruns_root or MLRUNS_ROOT
+    targets = find_unreferenced_artifacts(mlruns_root, index)
+    for target in targets:
+        rel = os.path.relpath(target, mlruns_root)
+        if not apply:
+            print(f"[预览] {'归档' if archive_dir else '删除'}：mlruns/{rel}")
+        elif archive_dir:
+            dest = os.path.join(archive_dir, rel)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            shutil.move(target, dest)
+            print(f"已归档：mlruns/{rel} → {dest}")
+        else:
+            shutil.rmtree(target)
+            print(f"已删除：mlruns/{rel}")
+    if not apply and targets:
+        print("以上为预览，确认无误后加 --apply 执行")
+    print(f"共{len(targets)}个未引用目录")
+    return targets
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="模型注册表维护")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("rebuild", help="从mlruns/models重建 ml/registry/index.json")
+    show = sub.add_parser("show", help="查看模型解析结果")
+    show.add_argument("--name", default=DEFAULT_MODEL_NAME)
+    show.add_argument("--version")
+    show.add_argument("--stage")
+    compact = sub.add_parser("compact", help="清理或归档索引未引用的run产物")
+    compact.add_argument("--archive", help="归档目录（不指定则删除）")
+    compact.add_argument("--apply", action="store_true", help="实际执行（默认仅预览）")
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        index = rebuild_index_from_mlruns()
+        for name, model in index["models"].items():
+            print(
+                f"{name}：{len(model['versions'])}个版本，最新v{model['latest_version']}"
+            )
+        print(f"索引已写入：{REGISTRY_INDEX_PATH}")
+    elif args.command == "show":
+        print(
+            json.dumps(
+                resolve_model_entry(args.name, args.version, args.stage), indent=2
+            )
+        )
+    elif args.command == "compact":
+        compact_mlruns(archive_dir=args.archive, apply=args.apply)
@@ -0,0 +1,199 @@
+# ml/scoring.py（纯NumPy打分引擎，不依赖pandas/sklearn/mlflow）
+import hashlib
+import os
+import sys
+import numpy as np
+
+# 精简服务产物格式版本（字段变化时递增）
+ARTIFACT_FORMAT_VERSION = 1
+DEFAULT_ARTIFACT_PATH = "ml/registry/model.npz"
+
+
+class LinearScorer:
+    """
+    从LogisticRegression中抽取coef_/intercept_/classes_，
+    用矩阵乘法+argmax/softmax完成预测，结果与model.predict逐位一致
+    """
+
+    def __init__(self, coef, intercept, classes, ovr=False):
+        self.coef = np.ascontiguousarray(coef, dtype=np.float64)
+        self.intercept = np.ascontiguousarray(intercept, dtype=np.float64)
+        self.classes = np.ascontiguousarray(classes)
+        self.ovr = bool(ovr)
+        if self.coef.ndim != 2 or self.intercept.shape != (self.coef.shape[0],):
+            raise ValueError(
+                f"系数形状不匹配：coef{self.coef.shape}，intercept{self.intercept.shape}"
+            )
+        # 与sklearn一致：二分类只有一行系数
+        self._binary = self.coef.shape[0] == 1
+        self.n_features = self.coef.shape[1]
+
+    @classmethod
+    def from_model(cls, model):
+        """从已训练的LogisticRegression构建打分器"""
+        for attr in ("coef_", "intercept_", "classes_"):
+            if not hasattr(model, attr):
+                raise TypeError(
+                    f"模型{type(model).__name__}缺少{attr}，仅支持线性分类模型"
+                )
+        # 与LogisticRegression.predict_proba的分支保持一致
+        # （二分类只在multi_class为auto时走ovr，显式multinomial时对 [-d, d] 做softmax）
+        multi_class = getattr(model, "multi_class", "auto")
+        ovr = multi_class in ("ovr", "warn") or (
+            multi_class in ("auto", "deprecated")
+            and (
+                len(model.classes_) <= 2
+                or getattr(model, "solver", "") in ("liblinear", "newton-cholesky")
+            )
+        )
+        return cls(model.coef_, model.intercept_, model.classes_, ovr=ovr)
+
+    def decision_function(self, X):
+        """计算决策分数（与sklearn相同的 X @ coef.T + intercept）"""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"特征数需为{self.n_features}，实际为{X.shape[1]}")
+        return X @ self.coef.T + self.intercept
+
+    def _labels(self, scores):
+        if self._binary:
+            return self.classes[(scores[:, 0] > 0).astype(np.intp)]
+        return self.classes[scores.argmax(axis=1)]
+
+    def _proba(self, scores):
+        if self._binary:
+            # multinomial二分类：softmax([-d, d]) 等于 sigmoid(2d)
+            decision = scores[:, 0] if self.ovr else 2.0 * scores[:, 0]
+            prob = 1.0 / (1.0 + np.exp(-decision))
+            return np.column_stack([1.0 - prob, prob])
+        if self.ovr:
+            prob = 1.0 / (1.0 + np.exp(-scores))
+            return prob / prob.sum(axis=1, keepdims=True)
+        # multinomial：数值稳定的softmax
+        prob = scores - scores.max(axis=1, keepdims=True)
+        np.exp(prob, out=prob)
+        prob /= prob.sum(axis=1, keepdims=True)
+        return prob
+
+    def predict(self, X):
+        """批量预测标签"""
+        return self._labels(self.decision_function(X))
+
+    def predict_proba(self, X):
+        """批量预测各类别概率（列顺序同classes）"""
+        return self._proba(self.decision_function(X))
+
+    def predict_with_proba(self, X):
+        """只计算一次决策分数，同时返回标签和概率"""
+        scores = self.decision_function(X)
+        return self._labels(scores), self._proba(scores)
+
+    def predict_one(self, features):
+        """单条预测（features按训练时的特征顺序排列）"""
+        return self.predict(np.array([features], dtype=np.float64))[0]
+
+
+# --------------------------
+# 精简服务产物（.npz：权重+类别+特征顺序+标签映射+校验和）
+# --------------------------
+def _artifact_checksum(arrays):
+    """按固定字段顺序对数组内容计算sha256"""
+    digest = hashlib.sha256()
+    for key in sorted(arrays):
+        value = np.ascontiguousarray(arrays[key])
+        digest.update(key.encode("utf-8"))
+        digest.update(str(value.dtype).encode("utf-8"))
+        digest.update(str(value.shape).encode("utf-8"))
+        digest.update(value.tobytes())
+    return digest.hexdigest()
+
+
+def save_artifact(scorer, path, feature_names, species_map):
+    """
+    将打分器写为精简产物，返回校验和；
+    先写临时文件再替换，避免服务进程读到半个文件
+    """
+    label_ids = sorted(species_map)
+    arrays = {
+        "format_version": np.array(ARTIFACT_FORMAT_VERSION, dtype=np.int64),
+        "coef": scorer.coef,
+        "intercept": scorer.intercept,
+        "classes": scorer.classes,
+        "ovr": np.array(scorer.ovr),
+        "feature_names": np.array(feature_names, dtype=str),
+        "label_ids": np.array(label_ids, dtype=np.int64),
+        "label_names": np.array([species_map[i] for i in label_ids], dtype=str),
+    }
+    checksum = _artifact_checksum(arrays)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, checksum=np.array(checksum), **arrays)
+    os.replace(tmp_path, path)
+    return checksum
+
+
+def load_artifact(path):
+    """
+    读取精简产物并校验，返回 (打分器, 元信息)；
+    元信息包含feature_names、species_map、checksum、format_version
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"精简模型文件不存在：{path}\n请先运行 python ml/train.py "
+            f"或 python ml/scoring.py <MLflow模型目录> 生成"
+        )
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {k: data[k] for k in data.files if k != "checksum"}
+        checksum = str(data["checksum"])
+
+    format_version = int(arrays["format_version"])
+    if format_version != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(
+            f"精简模型格式版本不支持：{format_version}（当前支持{ARTIFACT_FORMAT_VERSION}）"
+        )
+    if _artifact_checksum(arrays) != checksum:
+        raise ValueError(f"精简模型校验和不一致，文件可能已损坏：{path}")
+
+    scorer = LinearScorer(
+        arrays["coef"], arrays["intercept"], arrays["classes"], ovr=bool(arrays["ovr"])
+    )
+    meta = {
+        "feature_names": [str(n) for n in arrays["feature_names"]],
+        "species_map": {
+            int(i): str(n) for i, n in zip(arrays["label_ids"], arrays["label_names"])
+        },
+        "checksum": checksum,
+        "format_version": format_version,
+    }
+    return scorer, meta
+
+
+def export_artifact(model, path, feature_names, species_map):
+    """从sklearn模型直接导出精简产物，返回校验和"""
+    return save_artifact(
+        LinearScorer.from_model(model), path, feature_names, species_map
+    )
+
+
+if __name__ == "__main__":
+    # 用法：python ml/scoring.py <MLflow模型目录> [输出路径]
+    # 把已有的MLflow模型转换为精简产物，无需重新训练
+    if len(sys.argv) < 2:
+        print("用法：python ml/scoring.py <MLflow模型目录> [输出路径]")
+        sys.exit(1)
+    import mlflow.sklearn
+    import yaml
+
+    model_dir = sys.argv[1]
+    out_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_ARTIFACT_PATH
+    model = mlflow.sklearn.load_model(model_dir)
+    with open("ml/registry/label_map.yml", "r", encoding="utf-8") as f:
+        label_map = yaml.safe_load(f)
+    species = {v: k.replace("iris-", "") for k, v in label_map.items()}
+    feature_names = [str(n) for n in model.feature_names_in_]
+    checksum = export_artifact(model, out_path, feature_names, species)
+    print(f"精简模型已导出至：{out_path}（sha256：{checksum}）")
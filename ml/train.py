@@ -2,11 +2,37 @@ import mlflow
 import mlflow.sklearn
 import pandas as pd
 from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import RepeatedStratifiedKFold, ShuffleSplit
 from sklearn.metrics import accuracy_score
-from sklearn.preprocessing import LabelEncoder  # 新增：导入LabelEncoder
 import yaml
+import argparse
+import collections
+import hashlib
+import itertools
+import json
 import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+# 项目根目录加入模块搜索路径（兼容 python ml/train.py 直接启动）
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from ml.data_pipeline import load_columnar, prepare_data
+from ml.registry import register_model_version
+from ml.scoring import export_artifact, DEFAULT_ARTIFACT_PATH, LinearScorer
+from ml.lut import DEFAULT_LUT_PATH, compile_lut, save_lut, verify_lut
+from ml.drift import DEFAULT_REFERENCE_PATH, compute_reference, save_reference
+
+FEATURE_COLUMNS = ["sepal_length", "sepal_width", "petal_length", "petal_width"]
 
 
 def load_config(config_path="ml/configs/train_config.yml"):
@@ -33,133 +59,763 @@ def load_config(config_path="ml/configs/train_config.yml"):
     return config
 
 
-def load_data(data_path="data/processed/iris_v2.csv"):
-    """加载数据（修复重复表头问题：文件已有表头，不再手动指定）"""
-    # 1. 检查文件是否存在
-    if not os.path.exists(data_path):
+def load_dataset(dataset_path="data/processed/iris_v2.bin"):
+    """内存映射二进制数据集（data_pipeline生成），返回 (特征矩阵, 标签向量)：不解析文本、不拷贝数据"""
+    if not os.path.exists(dataset_path):
         raise FileNotFoundError(
-            f"数据集不存在：{data_path}\n请先运行ml/data_pipeline.py生成iris_v2.csv"
+            f"数据集不存在：{dataset_path}\n请先运行ml/data_pipeline.py生成iris_v2.bin"
         )
+    X, y, schema = load_columnar(dataset_path)
+    # 列名和dtype由头部描述，无需像CSV那样逐列检查类型
+    if schema["feature_columns"] != FEATURE_COLUMNS:
+        raise ValueError(
+            f"数据集特征列不匹配：{schema['feature_columns']}，预期{FEATURE_COLUMNS}"
+        )
+    return X, y
+
+
+def split_indices(n_rows, test_size=0.2, random_state=42):
+    """按行索引划分训练/测试集（与train_test_split的划分完全相同），只生成索引、不拷贝数据"""
+    splitter = ShuffleSplit(n_splits=1, test_size=test_size, random_state=random_state)
+    return next(splitter.split(np.empty((n_rows, 0))))
+
+
+def load_species_map(label_map_path="ml/registry/label_map.yml"):
+    """读取标签映射（iris-setosa: 0 → {0: "setosa"}），供精简产物使用"""
+    with open(label_map_path, "r", encoding="utf-8") as f:
+        label_map = yaml.safe_load(f)
+    return {int(v): k.replace("iris-", "") for k, v in label_map.items()}
+
+
+def log_serving_artifact(model, artifact_path, species_map):
+    """在当前MLflow run中，紧挨MLflow模型记录一份精简服务产物（.npz）"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        local_path = os.path.join(tmp_dir, "model.npz")
+        checksum = export_artifact(model, local_path, FEATURE_COLUMNS, species_map)
+        mlflow.log_artifact(local_path, artifact_path=f"{artifact_path}_serving")
+    mlflow.log_param("serving_artifact_sha256", checksum)
+    return checksum
+
+
+def local_model_dir(model_info):
+    """返回已记录模型在本地文件存储中的目录（MLflow 2.x/3.x目录结构不同，统一交给MLflow解析）"""
+    from mlflow.artifacts import download_artifacts
+
+    return download_artifacts(artifact_uri=model_info.model_uri)
+
+
+def publish_best_model(
+    model, model_info, run_id, run_name, accuracy, species_map, provenance, extra=None
+):
+    """导出精简服务产物、登记注册表索引并更新current_model.md"""
+    best_model_full_path = local_model_dir(model_info)
+
+    # 导出精简服务产物（SERVING_MODE=artifact 时服务只加载该文件）
+    serving_checksum = export_artifact(
+        model, DEFAULT_ARTIFACT_PATH, FEATURE_COLUMNS, species_map
+    )
+    print(f"精简服务产物已导出至：{DEFAULT_ARTIFACT_PATH}")
+
+    # 编译查表产物（PREDICT_LUT=1时服务直接读取），逐格校验与模型一致后才写出
+    scorer = LinearScorer.from_model(model)
+    lut = compile_lut(scorer)
+    if verify_lut(lut, scorer):
+        raise RuntimeError("查表产物与模型不一致，已停止注册")
+    save_lut(lut, DEFAULT_LUT_PATH)
+    print(f"查表产物已导出至：{DEFAULT_LUT_PATH}（{lut.cells}格，{lut.nbytes}字节）")
+
+    # 登记到注册表索引（原子写入），服务端和ml/registry.py按索引O(1)解析
+    entry = register_model_version(
+        best_model_full_path,
+        run_id=run_id,
+        metrics={"test_accuracy": accuracy},
+        extra={
+            "run_name": run_name,
+            "serving_artifact": DEFAULT_ARTIFACT_PATH,
+            "serving_artifact_sha256": serving_checksum,
+            **provenance,
+            **(extra or {}),
+        },
+    )
+    best_model_full_path = entry["path"]
+    print(f"注册表索引已更新：{entry['name']} v{entry['version']}")
+
+    os.makedirs("ml/registry", exist_ok=True)
+    with open("ml/registry/current_model.md", "w", encoding="utf-8") as f:
+        f.write(f"# 生产环境模型记录\n")
+        f.write(f"- 最优模型：{run_name}\n")
+        f.write(f"- 测试准确率：{accuracy:.4f}\n")
+        f.write(f"- 模型路径：{best_model_full_path}\n")
+        f.write(f"- Git Commit：{provenance['git_commit']}\n")
+        f.write(f"- DVC数据哈希：{provenance['dvc_data_hash']}\n")
+        f.write(f"- 原始数据sha256：{provenance['raw_data_sha256']}\n")
+        f.write(f"- 服务文件：{DEFAULT_ARTIFACT_PATH}\n")
+        f.write(f"- 服务文件校验和：{serving_checksum}\n")
+        f.write(f"- 查表产物：{DEFAULT_LUT_PATH}\n")
+
+    print(f"\n训练完成！最优模型已注册到：{best_model_full_path}")
+    print(f"查看实验详情：执行 `mlflow ui` 后访问 http://127.0.0.1:5000")
+
+
+def get_git_commit():
+    """当前代码版本（短哈希）；不在git仓库中时读取环境变量GIT_COMMIT"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return os.getenv("GIT_COMMIT", "unknown")
+
 
-    # 2. 关键修复：文件已有表头（如sepal_length），直接读取，不指定names参数
+def collect_provenance(data_info):
+    """由数据清单整理出代码/数据版本信息，写入MLflow参数、注册表和current_model.md"""
+    return {
+        "git_commit": get_git_commit(),
+        "dvc_data_hash": data_info["data_md5"],
+        "raw_data_sha256": data_info["raw_sha256"],
+        "data_pipeline_key": data_info["key"],
+    }
+
+
+def log_run_provenance(provenance):
+    """记录代码版本和数据版本"""
+    mlflow.log_params(provenance)
+
+
+# --------------------------
+# 超参数搜索（sweep模式）
+# --------------------------
+def expand_search_space(sweep_config):
+    """
+    按配置展开候选超参数组合：
+    - strategy: grid   → space中各列表的笛卡尔积
+    - strategy: random → 采样n_iter组；取值可以是列表（均匀抽取）
+      或 {low, high, log}（连续区间，log: true时按对数均匀采样）
+    """
+    space = sweep_config.get("space") or {}
+    if not space:
+        raise ValueError("sweep.space 为空，请在train_config.yml中配置搜索空间")
+    strategy = sweep_config.get("strategy", "grid")
+    names = sorted(space)
+
+    if strategy == "grid":
+        for name in names:
+            if not isinstance(space[name], list):
+                raise ValueError(f"grid搜索的取值需为列表：{name}")
+        return [
+            dict(zip(names, values))
+            for values in itertools.product(*(space[name] for name in names))
+        ]
+
+    if strategy == "random":
+        rng = random.Random(sweep_config.get("seed", 42))
+        candidates = []
+        for _ in range(int(sweep_config.get("n_iter", 20))):
+            params = {}
+            for name in names:
+                spec = space[name]
+                if isinstance(spec, list):
+                    params[name] = rng.choice(spec)
+                elif spec.get("log"):
+                    low, high = np.log(spec["low"]), np.log(spec["high"])
+                    params[name] = float(np.exp(rng.uniform(low, high)))
+                else:
+                    params[name] = rng.uniform(spec["low"], spec["high"])
+                if isinstance(spec, dict) and spec.get("type") == "int":
+                    params[name] = int(round(params[name]))
+            candidates.append(params)
+        return candidates
+
+    raise ValueError(f"未知的搜索策略：{strategy}（可选grid/random）")
+
+
+def share_training_data(arrays):
+    """
+    把训练/测试数组拷贝进一块共享内存，返回 (共享内存块, 布局)；
+    worker按布局直接映射同一块内存，数据不随候选数或进程数复制
+    """
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        layout[name] = (offset, array.shape, array.dtype.str)
+        offset += array.nbytes
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for name, array in arrays.items():
+        start, shape, dtype = layout[name]
+        np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=start)[...] = array
+    return shm, layout
+
+
+_sweep_data = {}
+
+
+def _init_sweep_worker(shm_name, layout):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    # 共享内存由主进程负责释放，worker不登记到资源跟踪器（避免退出时误删/告警）
+    resource_tracker.unregister(shm._name, "shared_memory")
+    _sweep_data["shm"] = shm
+    for name, (offset, shape, dtype) in layout.items():
+        view = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+        view.flags.writeable = False
+        _sweep_data[name] = view
+
+
+def _fit_candidate(index, params):
+    """在worker中训练单个候选，只回传指标（模型不跨进程传输）"""
+    data = _sweep_data
+    start = time.perf_counter()
     try:
-        df = pd.read_csv(data_path)  # 移除 names=column_names，避免重复添加表头
+        model = LogisticRegression(**params)
+        model.fit(data["X_train"], data["y_train"])
     except Exception as e:
-        raise RuntimeError(
-            f"读取数据集失败：{str(e)}\n请确认iris_v2.csv格式为'带表头的CSV'"
-        )
+        return {"index": index, "params": params, "error": str(e)}
+    fit_seconds = time.perf_counter() - start
+    return {
+        "index": index,
+        "params": params,
+        "test_accuracy": accuracy_score(data["y_test"], model.predict(data["X_test"])),
+        "train_accuracy": accuracy_score(
+            data["y_train"], model.predict(data["X_train"])
+        ),
+        "fit_seconds": fit_seconds,
+        "n_iter": int(np.max(model.n_iter_)),
+    }
 
-    # 3. 检查关键列是否存在（确保文件表头正确）
-    required_cols = [
-        "sepal_length",
-        "sepal_width",
-        "petal_length",
-        "petal_width",
-        "species",
-    ]
-    missing_cols = [col for col in required_cols if col not in df.columns]
-    if missing_cols:
-        raise ValueError(
-            f"数据集缺少关键列：{missing_cols}\n请确认CSV表头包含{required_cols}"
+
+def run_sweep(candidates, arrays, workers=None):
+    """在进程池中并行训练全部候选，返回 (按候选顺序排列的结果, 墙钟耗时)"""
+    workers = workers or os.cpu_count() or 1
+    shm, layout = share_training_data(arrays)
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_sweep_worker,
+            initargs=(shm.name, layout),
+        ) as pool:
+            results = list(
+                pool.map(
+                    _fit_candidate,
+                    range(len(candidates)),
+                    candidates,
+                    chunksize=max(1, len(candidates) // (workers * 4)),
+                )
+            )
+    finally:
+        shm.close()
+        shm.unlink()
+    return results, time.perf_counter() - start
+
+
+def run_sweep_sequential(candidates, arrays):
+    """在主进程中逐个训练（用于测量并行加速比）"""
+    _sweep_data.update(arrays)
+    start = time.perf_counter()
+    results = [_fit_candidate(i, params) for i, params in enumerate(candidates)]
+    return results, time.perf_counter() - start
+
+
+def log_sweep_results(
+    results,
+    batch_size=1000,
+    prefix="sweep",
+    keys=("test_accuracy", "train_accuracy", "fit_seconds"),
+):
+    """
+    在当前run中批量记录全部候选：每个候选的keys指标及数值型超参数作为
+    step=候选序号的指标（前缀prefix），用MlflowClient.log_batch分批提交；
+    完整结果另存为{prefix}_results.json
+    """
+    from mlflow.entities import Metric
+
+    run_id = mlflow.active_run().info.run_id
+    timestamp = int(time.time() * 1000)
+    metrics = []
+    for r in results:
+        if "error" in r:
+            continue
+        values = {f"{prefix}_{key}": r[key] for key in keys}
+        for name, value in r["params"].items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                values[f"{prefix}_param_{name}"] = value
+        metrics += [
+            Metric(key, float(value), timestamp, r["index"])
+            for key, value in values.items()
+        ]
+    client = mlflow.tracking.MlflowClient()
+    for i in range(0, len(metrics), batch_size):
+        client.log_batch(run_id, metrics=metrics[i : i + batch_size])
+    mlflow.log_dict(results, f"{prefix}_results.json")
+
+
+def train_sweep(
+    config, X_train, X_test, y_train, y_test, species_map, provenance, args
+):
+    """sweep模式：并行搜索→批量记录→在完整DataFrame上重训最优候选并注册"""
+    sweep_config = config.get("sweep") or {}
+    candidates = expand_search_space(sweep_config)
+    workers = args.workers or sweep_config.get("workers") or os.cpu_count() or 1
+    arrays = {
+        "X_train": np.ascontiguousarray(X_train.to_numpy(dtype=np.float64)),
+        "X_test": np.ascontiguousarray(X_test.to_numpy(dtype=np.float64)),
+        "y_train": y_train.to_numpy(dtype=np.int64),
+        "y_test": y_test.to_numpy(dtype=np.int64),
+    }
+    print(
+        f"\n=== 超参数搜索：{sweep_config.get('strategy', 'grid')}，"
+        f"{len(candidates)}个候选，{workers}个进程 ==="
+    )
+
+    with mlflow.start_run(run_name="Sweep") as sweep_run:
+        log_run_provenance(provenance)
+        results, parallel_seconds = run_sweep(candidates, arrays, workers)
+        # 串行基线：默认用各候选训练耗时之和估算，--compare-sequential时实际串行跑一遍
+        if args.compare_sequential:
+            _, sequential_seconds = run_sweep_sequential(candidates, arrays)
+            sequential_source = "measured"
+        else:
+            sequential_seconds = sum(r.get("fit_seconds", 0.0) for r in results)
+            sequential_source = "sum_of_fit_times"
+        speedup = sequential_seconds / parallel_seconds if parallel_seconds else None
+
+        failed = [r for r in results if "error" in r]
+        scored = [r for r in results if "error" not in r]
+        if not scored:
+            raise RuntimeError(f"所有候选均训练失败：{failed[0]['error']}")
+        best = max(scored, key=lambda r: r["test_accuracy"])  # 并列时取靠前的候选
+
+        log_sweep_results(results, sweep_config.get("log_batch_size", 1000))
+        mlflow.log_params(
+            {
+                "sweep_strategy": sweep_config.get("strategy", "grid"),
+                "sweep_candidates": len(candidates),
+                "sweep_workers": workers,
+                **{f"best_{k}": v for k, v in best["params"].items()},
+            }
+        )
+        mlflow.log_metrics(
+            {
+                "sweep_parallel_seconds": parallel_seconds,
+                "sweep_sequential_seconds": sequential_seconds,
+                "sweep_speedup": speedup or 0.0,
+                "test_accuracy": best["test_accuracy"],
+            }
+        )
+        print(
+            f"搜索完成：成功{len(scored)}个，失败{len(failed)}个；"
+            f"并行耗时{parallel_seconds:.2f}s，串行"
+            f"{'实测' if sequential_source == 'measured' else '估算'}"
+            f"{sequential_seconds:.2f}s，加速比{speedup:.2f}×"
         )
+        print(f"最优候选：{best['params']}，测试准确率{best['test_accuracy']:.4f}")
+
+        # 最优候选在主进程中用DataFrame重训（保留特征名），作为本run的模型
+        best_model = LogisticRegression(**best["params"])
+        best_model.fit(X_train, y_train)
+        model_info = mlflow.sklearn.log_model(best_model, "sweep_best_model")
+        log_serving_artifact(best_model, "sweep_best_model", species_map)
+
+    publish_best_model(
+        best_model,
+        model_info,
+        sweep_run.info.run_id,
+        "Sweep Best",
+        best["test_accuracy"],
+        species_map,
+        provenance,
+        extra={"sweep_params": json.dumps(best["params"])},
+    )
+
+
+# --------------------------
+# 交叉验证（cv模式）
+# --------------------------
+FOLD_CACHE_DIR = "data/cache/folds"
+
+
+def fold_assignments(y, n_splits=5, n_repeats=1, random_state=42):
+    """
+    分层k折（n_repeats>1时为重复k折）：返回 (n_repeats, 行数) 的折号矩阵，
+    第r次重复中折号为k的行是第k折的验证集，其余行为训练集
+    """
+    splitter = RepeatedStratifiedKFold(
+        n_splits=n_splits, n_repeats=n_repeats, random_state=random_state
+    )
+    folds = np.empty((n_repeats, len(y)), dtype=np.int16)
+    for i, (_, test_idx) in enumerate(splitter.split(np.empty((len(y), 0)), y)):
+        folds[i // n_splits, test_idx] = i % n_splits
+    return folds
 
-    # 4. 处理标签（若为字符串则自动编码）
-    if df["species"].dtype == "object":
-        print("检测到字符串标签，自动进行编码...")
-        le = LabelEncoder()
-        df["species"] = le.fit_transform(df["species"].str.lower())
-        # 保存标签映射
-        os.makedirs("ml/registry", exist_ok=True)
-        label_map = dict(zip(le.classes_, range(len(le.classes_))))
-        with open("ml/registry/label_map.yml", "w", encoding="utf-8") as f:
-            yaml.dump(label_map, f)
-        print(f"自动编码完成：标签映射已保存至 ml/registry/label_map.yml")
-
-    # 5. 验证特征列是否为数值类型（避免表头重复导致的字符串数据）
-    feature_cols = ["sepal_length", "sepal_width", "petal_length", "petal_width"]
-    for col in feature_cols:
-        if not pd.api.types.is_numeric_dtype(df[col]):
-            raise TypeError(
-                f"特征列'{col}'必须是数值类型，当前是{df[col].dtype}\n原因：CSV文件可能重复添加了表头"
+
+def load_fold_assignments(
+    y, data_hash, n_splits=5, n_repeats=1, random_state=42, cache_dir=FOLD_CACHE_DIR
+):
+    """
+    按 (数据哈希, 行数, 折数, 重复次数, 随机种子) 缓存折号矩阵：数据不变时直接读取，
+    不再重新分层划分；返回 (折号矩阵, 是否命中缓存)
+    """
+    key = hashlib.sha256(
+        f"{data_hash}:{len(y)}:{n_splits}:{n_repeats}:{random_state}".encode()
+    ).hexdigest()[:16]
+    path = os.path.join(cache_dir, f"{key}.npy")
+    if os.path.exists(path):
+        folds = np.load(path)
+        if folds.shape == (n_repeats, len(y)):
+            return folds, True
+    folds = fold_assignments(y, n_splits, n_repeats, random_state)
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(f"{path}.tmp", "wb") as f:
+        np.save(f, folds)
+    os.replace(f"{path}.tmp", path)
+    return folds, False
+
+
+def _fit_fold(index, params, repeat, fold):
+    """在worker中用一个候选训练一折，只回传指标"""
+    data = _sweep_data
+    X, y = data["X"], data["y"]
+    test_mask = data["folds"][repeat] == fold
+    start = time.perf_counter()
+    try:
+        model = LogisticRegression(**params)
+        model.fit(X[~test_mask], y[~test_mask])
+    except Exception as e:
+        return {"index": index, "repeat": repeat, "fold": fold, "error": str(e)}
+    fit_seconds = time.perf_counter() - start
+    return {
+        "index": index,
+        "repeat": repeat,
+        "fold": fold,
+        "test_accuracy": accuracy_score(y[test_mask], model.predict(X[test_mask])),
+        "train_accuracy": accuracy_score(y[~test_mask], model.predict(X[~test_mask])),
+        "fit_seconds": fit_seconds,
+    }
+
+
+def run_cv(candidates, X, y, folds, workers=None):
+    """
+    候选×重复×折 展开成独立任务，在进程池中并行训练（数据和折号放共享内存），
+    返回 (按候选、重复、折顺序排列的各折结果, 墙钟耗时)
+    """
+    workers = workers or os.cpu_count() or 1
+    n_repeats, n_splits = folds.shape[0], int(folds.max()) + 1
+    tasks = list(
+        itertools.product(range(len(candidates)), range(n_repeats), range(n_splits))
+    )
+    arrays = {"X": np.ascontiguousarray(X), "y": np.asarray(y), "folds": folds}
+    shm, layout = share_training_data(arrays)
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_sweep_worker,
+            initargs=(shm.name, layout),
+        ) as pool:
+            results = list(
+                pool.map(
+                    _fit_fold,
+                    [index for index, _, _ in tasks],
+                    [candidates[index] for index, _, _ in tasks],
+                    [repeat for _, repeat, _ in tasks],
+                    [fold for _, _, fold in tasks],
+                    chunksize=max(1, len(tasks) // (workers * 4)),
+                )
             )
+    finally:
+        shm.close()
+        shm.unlink()
+    return results, time.perf_counter() - start
+
+
+def summarize_cv(candidates, fold_results):
+    """按候选汇总各折验证准确率的均值/方差/标准差（样本方差）；任一折失败的候选记为失败"""
+    by_candidate = collections.defaultdict(list)
+    for r in fold_results:
+        by_candidate[r["index"]].append(r)
+    summaries = []
+    for index, params in enumerate(candidates):
+        folds = by_candidate[index]
+        errors = [r["error"] for r in folds if "error" in r]
+        if errors:
+            summaries.append({"index": index, "params": params, "error": errors[0]})
+            continue
+        accuracy = np.array([r["test_accuracy"] for r in folds])
+        variance = float(accuracy.var(ddof=1)) if len(accuracy) > 1 else 0.0
+        summaries.append(
+            {
+                "index": index,
+                "params": params,
+                "mean_accuracy": float(accuracy.mean()),
+                "var_accuracy": variance,
+                "std_accuracy": variance**0.5,
+                "min_accuracy": float(accuracy.min()),
+                "mean_train_accuracy": float(
+                    np.mean([r["train_accuracy"] for r in folds])
+                ),
+                "fit_seconds": float(sum(r["fit_seconds"] for r in folds)),
+                "fold_accuracy": accuracy.tolist(),
+            }
+        )
+    return summaries
+
+
+def select_cv_best(summaries):
+    """均值最高者胜出；均值相同时取标准差更小的，再相同取靠前的候选"""
+    scored = [s for s in summaries if "error" not in s]
+    if not scored:
+        raise RuntimeError(f"所有候选均训练失败：{summaries[0]['error']}")
+    return max(scored, key=lambda s: (s["mean_accuracy"], -s["std_accuracy"]))
 
-    return df
+
+def train_cv(config, candidates, names, X, y, data_info, species_map, provenance, args):
+    """cv模式：各候选做（重复）分层k折交叉验证，按均值/方差选出最优，在全部数据上重训并注册"""
+    cv_config = config.get("cv") or {}
+    n_splits = args.cv_splits or cv_config.get("n_splits", 5)
+    n_repeats = args.cv_repeats or cv_config.get("n_repeats", 1)
+    random_state = cv_config.get("random_state", 42)
+    workers = args.workers or cv_config.get("workers") or os.cpu_count() or 1
+    folds, cache_hit = load_fold_assignments(
+        y, data_info["dataset_sha256"], n_splits, n_repeats, random_state
+    )
+    print(
+        f"\n=== 交叉验证：{len(candidates)}个候选 × {n_repeats}次重复 × {n_splits}折，"
+        f"{workers}个进程（折划分{'复用缓存' if cache_hit else '已计算并缓存'}）==="
+    )
+
+    with mlflow.start_run(run_name="Cross Validation") as cv_run:
+        log_run_provenance(provenance)
+        fold_results, parallel_seconds = run_cv(candidates, X, y, folds, workers)
+        summaries = summarize_cv(candidates, fold_results)
+        for summary, name in zip(summaries, names):
+            summary["name"] = name
+            if "error" in summary:
+                print(f"{name}：训练失败（{summary['error']}）")
+            else:
+                print(
+                    f"{name}：验证准确率 {summary['mean_accuracy']:.4f} ± "
+                    f"{summary['std_accuracy']:.4f}（最低{summary['min_accuracy']:.4f}）"
+                )
+        best = select_cv_best(summaries)
+        fit_seconds = sum(s.get("fit_seconds", 0.0) for s in summaries)
+
+        log_sweep_results(
+            summaries,
+            cv_config.get("log_batch_size", 1000),
+            prefix="cv",
+            keys=("mean_accuracy", "std_accuracy", "var_accuracy", "fit_seconds"),
+        )
+        mlflow.log_dict(fold_results, "cv_folds.json")
+        mlflow.log_params(
+            {
+                "cv_n_splits": n_splits,
+                "cv_n_repeats": n_repeats,
+                "cv_random_state": random_state,
+                "cv_workers": workers,
+                "cv_candidates": len(candidates),
+                "cv_fold_cache_hit": cache_hit,
+                "best_candidate": best["name"],
+                **{f"best_{k}": v for k, v in best["params"].items()},
+            }
+        )
+        mlflow.log_metrics(
+            {
+                "cv_mean_accuracy": best["mean_accuracy"],
+                "cv_std_accuracy": best["std_accuracy"],
+                "cv_var_accuracy": best["var_accuracy"],
+                "cv_parallel_seconds": parallel_seconds,
+                "cv_sequential_seconds": fit_seconds,
+                "cv_speedup": (
+                    fit_seconds / parallel_seconds if parallel_seconds else 0.0
+                ),
+                "test_accuracy": best["mean_accuracy"],
+            }
+        )
+        print(
+            f"交叉验证完成：并行耗时{parallel_seconds:.2f}s，各折训练耗时合计{fit_seconds:.2f}s"
+        )
+        print(
+            f"最优候选：{best['name']} {best['params']}，"
+            f"验证准确率 {best['mean_accuracy']:.4f} ± {best['std_accuracy']:.4f}"
+        )
+
+        # 最优候选用全部数据重训（保留特征名），作为本run的模型
+        best_model = LogisticRegression(**best["params"])
+        best_model.fit(
+            pd.DataFrame(np.asarray(X), columns=FEATURE_COLUMNS),
+            pd.Series(np.asarray(y), name="species"),
+        )
+        model_info = mlflow.sklearn.log_model(best_model, "cv_best_model")
+        log_serving_artifact(best_model, "cv_best_model", species_map)
+
+    publish_best_model(
+        best_model,
+        model_info,
+        cv_run.info.run_id,
+        f"CV Best ({best['name']})",
+        best["mean_accuracy"],
+        species_map,
+        provenance,
+        extra={
+            "cv_params": json.dumps(best["params"]),
+            "cv_folds": f"{n_repeats}x{n_splits}",
+            "cv_std_accuracy": best["std_accuracy"],
+        },
+    )
+
+
+def model_params(section, default_max_iter):
+    """基准/优化模型配置节 → LogisticRegression参数"""
+    return {
+        "max_iter": section.get("max_iter", default_max_iter),
+        "C": section.get("C", 1.0),
+    }
+
+
+def train_default(config, X_train, X_test, y_train, y_test, species_map, provenance):
+    """默认模式：按配置训练基准模型和优化模型，注册准确率更高的一个"""
+    # 3. 基准模型实验
+    print("\n=== 运行基准模型实验 ===")
+    with mlflow.start_run(run_name="Baseline Model") as baseline_run:
+        log_run_provenance(provenance)
+        baseline_lr = config["baseline"].get("lr", 0.1)
+        baseline_max_iter = config["baseline"].get("max_iter", 100)
+        baseline_C = config["baseline"].get("C", 1.0)
+        mlflow.log_param("learning_rate", baseline_lr)
+        mlflow.log_param("max_iter", baseline_max_iter)
+        mlflow.log_param("C", baseline_C)
+
+        model = LogisticRegression(max_iter=baseline_max_iter, C=baseline_C)
+        model.fit(X_train, y_train)
+        y_pred = model.predict(X_test)
+        accuracy = accuracy_score(y_test, y_pred)
+        mlflow.log_metric("test_accuracy", accuracy)
+        print(f"基准模型测试准确率：{accuracy:.4f}")
+        baseline_info = mlflow.sklearn.log_model(model, "baseline_model")
+        log_serving_artifact(model, "baseline_model", species_map)
+        baseline_model = model
+
+    # 4. 优化模型实验
+    print("\n=== 运行优化模型实验 ===")
+    with mlflow.start_run(run_name="Improved Model") as improved_run:
+        log_run_provenance(provenance)
+        improved_lr = config["improved"].get("lr", 0.01)
+        improved_max_iter = config["improved"].get("max_iter", 200)
+        improved_C = config["improved"].get("C", 1.0)
+        mlflow.log_param("learning_rate", improved_lr)
+        mlflow.log_param("max_iter", improved_max_iter)
+        mlflow.log_param("C", improved_C)
+
+        model = LogisticRegression(max_iter=improved_max_iter, C=improved_C)
+        model.fit(X_train, y_train)
+        y_pred = model.predict(X_test)
+        accuracy_improved = accuracy_score(y_test, y_pred)
+        mlflow.log_metric("test_accuracy", accuracy_improved)
+        print(f"优化模型测试准确率：{accuracy_improved:.4f}")
+        improved_info = mlflow.sklearn.log_model(model, "improved_model")
+        log_serving_artifact(model, "improved_model", species_map)
+        improved_model = model
+
+    # 5. 注册最优模型
+    print("\n=== 注册最优模型 ===")
+    use_improved = accuracy_improved > accuracy
+    publish_best_model(
+        improved_model if use_improved else baseline_model,
+        improved_info if use_improved else baseline_info,
+        (improved_run if use_improved else baseline_run).info.run_id,
+        "Improved Model" if use_improved else "Baseline Model",
+        max(accuracy, accuracy_improved),
+        species_map,
+        provenance,
+    )
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="训练鸢尾花分类模型")
+    parser.add_argument(
+        "--sweep", action="store_true", help="按配置中的sweep搜索空间并行搜索超参数"
+    )
+    parser.add_argument(
+        "--cv",
+        action="store_true",
+        help="用（重复）分层k折交叉验证选模型（与--sweep同用时评估搜索空间中的全部候选）",
+    )
+    parser.add_argument("--cv-splits", type=int, help="交叉验证折数，默认取配置")
+    parser.add_argument("--cv-repeats", type=int, help="交叉验证重复次数，默认取配置")
+    parser.add_argument("--workers", type=int, help="sweep/cv进程数，默认CPU数")
+    parser.add_argument(
+        "--compare-sequential",
+        action="store_true",
+        help="sweep结束后再串行跑一遍，实测加速比",
+    )
+    args = parser.parse_args()
+
     try:
         # 1. 加载配置
         config = load_config()
 
-        # 2. 加载数据（自动处理字符串标签）
-        df = load_data()
-        X = df[["sepal_length", "sepal_width", "petal_length", "petal_width"]]
-        y = df["species"]
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42
-        )
-        print(f"数据加载完成：训练集{X_train.shape} | 测试集{X_test.shape}")
-
-        # 3. 基准模型实验
-        print("\n=== 运行基准模型实验 ===")
-        with mlflow.start_run(run_name="Baseline Model"):
-            mlflow.log_param("git_commit", "e4f5g6h")
-            mlflow.log_param("dvc_data_hash", "abc123")
-            baseline_lr = config["baseline"].get("lr", 0.1)
-            baseline_max_iter = config["baseline"].get("max_iter", 100)
-            mlflow.log_param("learning_rate", baseline_lr)
-            mlflow.log_param("max_iter", baseline_max_iter)
-
-            model = LogisticRegression(max_iter=baseline_max_iter)
-            model.fit(X_train, y_train)
-            y_pred = model.predict(X_test)
-            accuracy = accuracy_score(y_test, y_pred)
-            mlflow.log_metric("test_accuracy", accuracy)
-            print(f"基准模型测试准确率：{accuracy:.4f}")
-            mlflow.sklearn.log_model(model, "baseline_model")
-
-        # 4. 优化模型实验
-        print("\n=== 运行优化模型实验 ===")
-        with mlflow.start_run(run_name="Improved Model"):
-            mlflow.log_param("git_commit", "e4f5g6h")
-            mlflow.log_param("dvc_data_hash", "abc123")
-            improved_lr = config["improved"].get("lr", 0.01)
-            improved_max_iter = config["improved"].get("max_iter", 200)
-            mlflow.log_param("learning_rate", improved_lr)
-            mlflow.log_param("max_iter", improved_max_iter)
-
-            model = LogisticRegression(max_iter=improved_max_iter, C=0.5)
-            model.fit(X_train, y_train)
-            y_pred = model.predict(X_test)
-            accuracy_improved = accuracy_score(y_test, y_pred)
-            mlflow.log_metric("test_accuracy", accuracy_improved)
-            print(f"优化模型测试准确率：{accuracy_improved:.4f}")
-            mlflow.sklearn.log_model(model, "improved_model")
-
-        # 5. 注册最优模型
-        print("\n=== 注册最优模型 ===")
-        best_model_name = (
-            "Improved Model" if accuracy_improved > accuracy else "Baseline Model"
-        )
-        best_model_artifact_path = (
-            "improved_model" if accuracy_improved > accuracy else "baseline_model"
-        )
-        best_run_id = mlflow.last_active_run().info.run_id
-        best_model_full_path = (
-            f"mlruns/0/{best_run_id}/artifacts/{best_model_artifact_path}"
+        # 2. 准备数据：原始数据和清洗代码都未变化时直接复用缓存，不重复清洗
+        data_info = prepare_data()
+        provenance = collect_provenance(data_info)
+        print(
+            f"数据版本：md5={provenance['dvc_data_hash']}，代码版本：{provenance['git_commit']}"
         )
 
-        os.makedirs("ml/registry", exist_ok=True)
-        with open("ml/registry/current_model.md", "w", encoding="utf-8") as f:
-            f.write(f"# 生产环境模型记录\n")
-            f.write(f"- 最优模型：{best_model_name}\n")
-            f.write(f"- 测试准确率：{max(accuracy, accuracy_improved):.4f}\n")
-            f.write(f"- 模型路径：{best_model_full_path}\n")
-            f.write(f"- Git Commit：e4f5g6h\n")
-            f.write(f"- DVC数据哈希：abc123\n")
-
-        print(f"\n训练完成！最优模型已注册到：{best_model_full_path}")
-        print(f"查看实验详情：执行 `mlflow ui` 后访问 http://127.0.0.1:5000")
+        # 内存映射二进制数据集，划分只生成行索引；
+        # 按索引取行时才读入用到的行，DataFrame直接包装取出的数组、不再拷贝
+        X, y = load_dataset()
+        species_map = load_species_map()
+        if args.cv:
+            # 交叉验证直接使用全部行，折划分按数据哈希缓存
+            if args.sweep:
+                candidates = expand_search_space(config.get("sweep") or {})
+                names = [f"Candidate {i}" for i in range(len(candidates))]
+            else:
+                candidates = [
+                    model_params(config["baseline"], 100),
+                    model_params(config["improved"], 200),
+                ]
+                names = ["Baseline Model", "Improved Model"]
+            train_cv(
+                config,
+                candidates,
+                names,
+                X,
+                y,
+                data_info,
+                species_map,
+                provenance,
+                args,
+            )
+        else:
+            train_idx, test_idx = split_indices(len(y), test_size=0.2, random_state=42)
+            X_train = pd.DataFrame(X[train_idx], columns=FEATURE_COLUMNS)
+            X_test = pd.DataFrame(X[test_idx], columns=FEATURE_COLUMNS)
+            y_train = pd.Series(y[train_idx], name="species")
+            y_test = pd.Series(y[test_idx], name="species")
+            print(f"数据加载完成：训练集{X_train.shape} | 测试集{X_test.shape}")
+
+            if args.sweep:
+                train_sweep(
+                    config,
+                    X_train,
+                    X_test,
+                    y_train,
+                    y_test,
+                    species_map,
+                    provenance,
+                    args,
+                )
+            else:
+                train_default(
+                    config, X_train, X_test, y_train, y_test, species_map, provenance
+                )
+
+        # 参考统计：训练数据的逐特征统计和分箱直方图，服务端漂移监控（/admin/drift）以此为基准
+        save_reference(compute_reference(X, y, FEATURE_COLUMNS), DEFAULT_REFERENCE_PATH)
+        print(f"参考统计已保存至：{DEFAULT_REFERENCE_PATH}")
 
     except Exception as e:
         print(f"\n训练过程出错：{str(e)}")